@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+作业检查基准测试
+
+生成合成花名册与作业文件夹 / ZIP 包，分别计时：
+花名册解析、文件夹扫描（首次 / 增量）、ZIP 扫描、报告与结果 ZIP 生成，
+并测量一个会话中保存的检查结果占用的内存（普通结果 / 紧凑结果）。
+结果写成 JSON，可用 --compare 与之前版本的结果对比。
+
+示例:
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 -o bench.json
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 -o new.json --compare bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_roster, make_student_ids, make_submission_tree, make_submission_zip  # noqa: E402
+from hwcheck import (  # noqa: E402
+    ReportBuilder,
+    RosterIndex,
+    SnapshotCache,
+    StudentIdMatcher,
+    check_homework_in_folder,
+    clear_roster_cache,
+    compact_results,
+    process_roster_file,
+)
+
+EXTENSIONS = ['.py', '.docx', '.zip']
+
+
+def _quiet(level, message):
+    pass
+
+
+def _time(func, repeat, setup=None):
+    """运行 repeat 次，返回 (每次耗时列表, 最后一次的返回值)"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def _record(name, params, times, **extra):
+    record = {
+        "name": name,
+        "params": params,
+        "times": [round(t, 6) for t in times],
+        "min": round(min(times), 6),
+        "median": round(statistics.median(times), 6),
+    }
+    record.update(extra)
+    print(f"{name:<22} {json.dumps(params, ensure_ascii=False):<60} min {record['min']:.4f}s  "
+          f"median {record['median']:.4f}s")
+    return record
+
+
+def bench_roster(workdir, n_students, repeat, fmt, header_row):
+    path = os.path.join(workdir, f"roster_{n_students}_{header_row}.{fmt}")
+    params = {"students": n_students, "format": fmt, "header_row": header_row}
+    try:
+        make_roster(path, n_students, fmt=fmt, header_row=header_row)
+    except (ImportError, ValueError) as e:
+        print(f"roster_{fmt:<16} 跳过: {e}")
+        return {"name": f"roster_{fmt}", "params": params, "skipped": str(e)}
+    times, roster = _time(lambda: process_roster_file(path, notify=_quiet), repeat, setup=clear_roster_cache)
+    return _record(f"roster_{fmt}", params, times, rows=roster['rows_parsed'] if roster else 0)
+
+
+def bench_scan(workdir, student_ids, n_files, layout, repeat):
+    records = []
+    roster_ids = set(student_ids)
+    matcher = StudentIdMatcher(roster_ids)
+    recursive = layout == 'nested'
+    params = {"files": n_files, "layout": layout, "students": len(student_ids)}
+
+    folder = make_submission_tree(os.path.join(workdir, f"hw_{layout}_{n_files}"), student_ids, n_files, layout)
+    times, res = _time(lambda: check_homework_in_folder(folder, roster_ids, EXTENSIONS, recursive=recursive,
+                                                        notify=_quiet, matcher=matcher), repeat)
+    records.append(_record("scan_folder", params, times, submitted=res['submitted_count']))
+
+    cache = SnapshotCache()
+    check_homework_in_folder(folder, roster_ids, EXTENSIONS, recursive=recursive, notify=_quiet,
+                             matcher=matcher, cache=cache)
+    times, res = _time(lambda: check_homework_in_folder(folder, roster_ids, EXTENSIONS, recursive=recursive,
+                                                        notify=_quiet, matcher=matcher, cache=cache), repeat)
+    records.append(_record("scan_folder_cached", params, times, submitted=res['submitted_count']))
+
+    zip_path = make_submission_zip(os.path.join(workdir, f"hw_{layout}_{n_files}.zip"), student_ids, n_files, layout)
+    times, res = _time(lambda: check_homework_in_folder(zip_path, roster_ids, EXTENSIONS, recursive=recursive,
+                                                        notify=_quiet, matcher=matcher), repeat)
+    records.append(_record("scan_zip", params, times, submitted=res['submitted_count'],
+                           zip_bytes=os.path.getsize(zip_path)))
+    return records, res
+
+
+def bench_report(student_ids, folder_result, n_folders, repeat):
+    id_map = {sid: f"学生{i}" for i, sid in enumerate(student_ids)}
+    folder_results = {f"作业{k + 1}": folder_result for k in range(n_folders)}
+    params = {"folders": n_folders, "students": len(student_ids)}
+
+    def build():
+        report = ReportBuilder(folder_results, id_map)
+        with report.open_zip() as f:
+            return f.seek(0, os.SEEK_END)
+
+    times, size = _time(build, repeat)
+    return _record("report_zip", params, times, zip_bytes=size)
+
+
+def bench_session_memory(workdir, student_ids, n_files, layout, n_folders):
+    """n_folders 个文件夹的 run_check 结果在会话中占用的内存：普通结果 vs 紧凑结果（tracemalloc 统计）"""
+    roster_ids = set(student_ids)
+    roster = {'student_id_to_name': {sid: f"学生{i}" for i, sid in enumerate(student_ids)},
+              'roster_hash': f"bench_{len(student_ids)}"}
+    matcher = StudentIdMatcher(roster_ids)
+    recursive = layout == 'nested'
+    folder = os.path.join(workdir, f"hw_{layout}_{n_files}")
+    if not os.path.isdir(folder):
+        make_submission_tree(folder, student_ids, n_files, layout)
+    params = {"files": n_files, "layout": layout, "students": len(student_ids), "folders": n_folders}
+
+    def scan():
+        return {f"作业{k + 1}": check_homework_in_folder(folder, roster_ids, EXTENSIONS, recursive=recursive,
+                                                       notify=_quiet, matcher=matcher)
+                for k in range(n_folders)}
+
+    scan()  # 预热匹配器等缓存，避免计入结果
+    RosterIndex.for_roster(roster)  # 学号表按花名册共用，不计入单个会话
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        results = scan()
+        plain_bytes = tracemalloc.get_traced_memory()[0] - base
+        results = compact_results(results, roster)
+        compact_bytes = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    record = {"name": "session_memory", "params": params, "plain_bytes": plain_bytes,
+              "compact_bytes": compact_bytes, "ratio": round(compact_bytes / plain_bytes, 4)}
+    print(f"{'session_memory':<22} {json.dumps(params, ensure_ascii=False):<60} "
+          f"{plain_bytes / 1024:.0f} KiB -> {compact_bytes / 1024:.0f} KiB  x{record['ratio']:.2f}")
+    return record
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _record_key(record):
+    return record["name"], json.dumps(record["params"], sort_keys=True)
+
+
+def compare(current, baseline_path):
+    """打印与基准结果的对比（按 min 耗时），返回比值字典"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {_record_key(r): r for r in json.load(f)["results"] if "min" in r}
+    print(f"\n与 {baseline_path} 对比（比值 < 1 表示更快）:")
+    ratios = {}
+    for record in current:
+        old = baseline.get(_record_key(record))
+        if "min" not in record or old is None or not old["min"]:
+            continue
+        ratio = record["min"] / old["min"]
+        ratios[_record_key(record)] = ratio
+        print(f"{record['name']:<22} {json.dumps(record['params'], ensure_ascii=False):<60} "
+              f"{old['min']:.4f}s -> {record['min']:.4f}s  x{ratio:.2f}")
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="作业检查基准测试")
+    parser.add_argument("--sizes", default="1000,10000", help="作业文件数，逗号分隔 (默认: 1000,10000)")
+    parser.add_argument("--students", type=int, default=2000, help="花名册学生数 (默认: 2000)")
+    parser.add_argument("--layouts", default="flat,nested", help="作业文件夹结构: flat / nested (默认: 两种都测)")
+    parser.add_argument("--header-rows", default="0,3", help="花名册表头前的标题行数，逗号分隔 (默认: 0,3)")
+    parser.add_argument("--roster-formats", default="xlsx,xls", help="花名册格式 (默认: xlsx,xls)")
+    parser.add_argument("--report-folders", type=int, default=20, help="报告生成测试的文件夹数 (默认: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数 (默认: 3)")
+    parser.add_argument("--workdir", help="合成数据目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    layouts = [s.strip() for s in args.layouts.split(",") if s.strip()]
+    header_rows = [int(s) for s in args.header_rows.split(",") if s.strip()]
+    formats = [s.strip() for s in args.roster_formats.split(",") if s.strip()]
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="hwcheck_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        for fmt in formats:
+            for header_row in header_rows:
+                results.append(bench_roster(workdir, args.students, args.repeat, fmt, header_row))
+
+        student_ids = make_student_ids(args.students)
+        last_result = None
+        for layout in layouts:
+            for n_files in sizes:
+                records, last_result = bench_scan(workdir, student_ids, n_files, layout, args.repeat)
+                results.extend(records)
+        if last_result is not None:
+            results.append(bench_report(student_ids, last_result, args.report_folders, args.repeat))
+            results.append(bench_session_memory(workdir, student_ids, sizes[-1], layouts[-1], args.report_folders))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入: {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+生成基准测试用的合成数据：花名册 (.xlsx / .xls) 与作业文件夹 / ZIP 包
+
+所有生成函数都接受 seed，同样的参数总是生成同样的数据，便于不同版本之间对比。
+"""
+import os
+import random
+import zipfile
+
+import pandas as pd
+
+FIRST_ID = 202400001
+_SURNAMES = "赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜"
+_GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英"
+
+
+def make_student_ids(n_students):
+    return [str(FIRST_ID + i) for i in range(n_students)]
+
+
+def make_names(n_students, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(_SURNAMES) + "".join(rng.choice(_GIVEN) for _ in range(rng.randint(1, 2)))
+            for _ in range(n_students)]
+
+
+def make_roster(path, n_students, fmt='xlsx', header_row=0, seed=0):
+    """生成花名册，表头前插入 header_row 行标题/空行，用于测试表头检测
+
+    .xls 需要安装 xlwt，未安装时抛出 ImportError。返回 (路径, 学号列表)。
+    """
+    student_ids = make_student_ids(n_students)
+    names = make_names(n_students, seed)
+    rows = []
+    for i in range(header_row):
+        rows.append(["2024级 作业花名册" if i == 0 else None, None, None, None])
+    rows.append(["序号", "学号", "姓名", "班级"])
+    for i, (sid, name) in enumerate(zip(student_ids, names)):
+        rows.append([i + 1, int(sid), name, f"{i // 40 + 1}班"])
+
+    if fmt == 'xls':
+        import xlwt
+        if len(rows) > 65536:
+            raise ValueError(".xls 单个工作表最多 65536 行")
+        wb = xlwt.Workbook()
+        ws = wb.add_sheet("花名册")
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                if value is not None:
+                    ws.write(r, c, value)
+        wb.save(path)
+    else:
+        pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path, student_ids
+
+
+def _iter_submissions(student_ids, n_files, submit_ratio, seed):
+    """产出 (学号, 文件名)，总数为 n_files；部分学生不交，其余学生可能交多个文件"""
+    rng = random.Random(seed)
+    submitters = [sid for sid in student_ids if rng.random() < submit_ratio] or list(student_ids[:1])
+    exts = ['.py', '.py', '.py', '.docx', '.zip', '.txt']
+    for k in range(n_files):
+        sid = submitters[k % len(submitters)]
+        prefix = rng.choice(["", "20240315_", "作业_", "v2_"])
+        yield sid, f"{prefix}{sid}_实验{k // len(submitters) + 1}{rng.choice(exts)}"
+
+
+def make_submission_tree(root, student_ids, n_files, layout='flat', submit_ratio=0.9, seed=0):
+    """生成作业文件夹；layout='nested' 时每个学生一个子文件夹。文件内容为空，只关心文件名"""
+    os.makedirs(root, exist_ok=True)
+    for sid, filename in _iter_submissions(student_ids, n_files, submit_ratio, seed):
+        folder = os.path.join(root, sid) if layout == 'nested' else root
+        if layout == 'nested':
+            os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, filename), 'wb'):
+            pass
+    return root
+
+
+def make_submission_zip(path, student_ids, n_files, layout='flat', submit_ratio=0.9, seed=0, member_size=0):
+    """生成作业 ZIP 包；layout='nested' 时外面多包一层文件夹，且每个学生一个子文件夹"""
+    payload = os.urandom(member_size) if member_size else b""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as zf:
+        for sid, filename in _iter_submissions(student_ids, n_files, submit_ratio, seed):
+            name = f"作业/{sid}/{filename}" if layout == 'nested' else filename
+            zf.writestr(name, payload)
+    return path
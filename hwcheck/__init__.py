@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""作业提交检查引擎：可被 Streamlit 页面 (web_check.py) 和命令行共同使用"""
+from .archives import ARCHIVE_EXTENSIONS, DEFAULT_ARCHIVE_DEPTH, ArchiveInspector
+from .batch import BATCH_REPORT_FILENAME, BatchReport, load_manifest, run_batch
+from .cache import DEFAULT_MAX_CACHE_ENTRIES, SnapshotCache
+from .engine import (
+    DEFAULT_EXTENSIONS,
+    DEFAULT_SCAN_WORKERS,
+    RESULTS_ZIP_FILENAME,
+    ReportBuilder,
+    check_homework_in_folder,
+    clear_roster_cache,
+    cleanup_temp_dir,
+    extract_student_id_from_filename,
+    is_temp_dir,
+    parse_extensions,
+    process_roster_file,
+    run_check,
+    save_upload_to_temp,
+    unique_display_names,
+    write_report_files,
+)
+from .compact import CompactResult, RosterIndex, compact_results
+from .deadlines import LATE_FILENAME, late_analysis, parse_deadline, submission_frame
+from .duplicates import DEFAULT_HASH_WORKERS, HashCache, find_duplicate_submissions, find_duplicates
+from .export import EXPORT_FORMATS, write_report_dir, write_report_zip
+from .history import DEFAULT_HISTORY_PATH, HistoryStore, roster_key
+from .matcher import NameMatcher, StudentIdMatcher
+from .matrix import SubmissionMatrix
+from .metrics import CheckMetrics, enable_json_logging, log_event, profile_call
+from .server import CheckService, make_server, serve
+from .sources import (
+    DEFAULT_IGNORE_PATTERNS,
+    extract_zip_member,
+    is_zip_source,
+    LocalFile,
+    iter_folder_files,
+    iter_source_files,
+    iter_zip_files,
+    parse_ignore_patterns,
+)
+from .tables import DEFAULT_PAGE_SIZE, PAGE_SIZES, MissingTable
+from .watch import DEFAULT_POLL_INTERVAL, FolderWatcher
+from .workspace import (
+    DEFAULT_SESSION_TTL,
+    DEFAULT_WORKSPACE_DIR,
+    DEFAULT_WORKSPACE_QUOTA,
+    Workspace,
+    cleanup_stale_temp_dirs,
+)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""支持 python -m hwcheck 调用命令行"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
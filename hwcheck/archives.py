@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+检查学生提交的压缩包里装的是什么
+
+默认后缀里有 .zip，学生常把真正的 .py / .docx 打包后再交，以前只要是 .zip 就算交了。
+ArchiveInspector 在内存中列出压缩包（以及里面再套的压缩包）的成员，不解压到磁盘，
+再按"至少包含一个 .py"这类要求决定这个压缩包算不算有效提交。
+
+- max_depth: 最多向下打开几层嵌套压缩包（外层压缩包本身为第 0 层）
+- max_nested_bytes: 嵌套压缩包（或 ZIP 来源中的压缩包成员）需要读进内存才能打开，超过此大小的不打开
+- max_members: 一个提交最多列出的成员数，防止压缩炸弹
+- .rar 需要安装可选依赖 rarfile（读取嵌套在 .rar 中的压缩包还需要 unrar 命令），未安装时不检查
+
+成员列表按 (路径, 大小, 修改时间) 缓存，同一个压缩包在重复检查时不会再打开。
+"""
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from .sources import _decode_zip_name
+
+ARCHIVE_EXTENSIONS = ('.zip', '.rar')
+DEFAULT_ARCHIVE_DEPTH = 2
+DEFAULT_MAX_NESTED_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_MEMBERS = 10_000
+# 默认最多缓存的压缩包数
+DEFAULT_MAX_LISTINGS = 10_000
+
+
+class _ListingLimit(Exception):
+    pass
+
+
+class ArchiveInspector:
+    """按压缩包内容判断提交是否有效，线程安全（run_check 会在多个线程中使用）"""
+
+    def __init__(self, required_extensions, max_depth=DEFAULT_ARCHIVE_DEPTH,
+                 max_nested_bytes=DEFAULT_MAX_NESTED_BYTES, max_members=DEFAULT_MAX_MEMBERS,
+                 max_listings=DEFAULT_MAX_LISTINGS):
+        self.required_extensions = frozenset(required_extensions)
+        self.max_depth = max_depth
+        self.max_nested_bytes = max_nested_bytes
+        self.max_members = max_members
+        self.max_listings = max_listings
+        self._listings = OrderedDict()  # (路径, 大小, 修改时间) -> (成员元组, 说明, 是否损坏)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._listings)
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+    @staticmethod
+    def is_archive(filename):
+        return os.path.splitext(filename)[1].lower() in ARCHIVE_EXTENSIONS
+
+    def list_members(self, source_file):
+        """列出压缩包中的所有文件（嵌套压缩包里的写成 "inner.zip/x.py"）
+
+        source_file 是 sources 中的文件对象（需要 name / path / size / mtime / open()）。
+        返回 (成员路径元组, 说明, 是否损坏)；说明不为 None 时表示列表不完整或无法打开。
+        """
+        key = (source_file.path, source_file.size, source_file.mtime)
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is not None:
+                self._listings.move_to_end(key)
+                return listing
+
+        members = []
+        note = None
+        corrupt = False
+        ext = os.path.splitext(source_file.name)[1].lower()
+        try:
+            with source_file.open() as f:
+                if isinstance(f, zipfile.ZipExtFile) or not f.seekable():
+                    # ZIP 来源中的成员是解压流（向回跳转要从头解压），读进内存后才能随机访问
+                    if source_file.size > self.max_nested_bytes:
+                        raise _ListingLimit(f"压缩包超过 {self.max_nested_bytes // (1024 * 1024)} MB，未检查内容")
+                    f = io.BytesIO(f.read())
+                self._walk(f, ext, '', 0, members)
+        except _ListingLimit as e:
+            note = str(e)
+        except zipfile.BadZipFile as e:
+            note, corrupt = f"不是有效的压缩包: {e}", True
+        except Exception as e:
+            note = f"无法打开压缩包: {e}"
+
+        listing = (tuple(members), note, corrupt)
+        with self._lock:
+            self._listings[key] = listing
+            while len(self._listings) > self.max_listings:
+                self._listings.popitem(last=False)
+        return listing
+
+    def _walk(self, fileobj, ext, prefix, depth, members):
+        """列出一个已打开的压缩包，遇到嵌套压缩包时在内存中打开继续列出"""
+        for name, size, read in _iter_archive(fileobj, ext):
+            if len(members) >= self.max_members:
+                raise _ListingLimit(f"成员超过 {self.max_members} 个，只检查了前一部分")
+            members.append(prefix + name)
+            inner_ext = os.path.splitext(name)[1].lower()
+            if inner_ext in ARCHIVE_EXTENSIONS and depth < self.max_depth and size <= self.max_nested_bytes:
+                try:
+                    self._walk(io.BytesIO(read()), inner_ext, prefix + name + '/', depth + 1, members)
+                except _ListingLimit:
+                    raise
+                except Exception:
+                    continue  # 内层压缩包损坏时只记录它本身
+
+    def inspect(self, source_file):
+        """判断压缩包提交是否有效，返回 (是否算作提交, 原因)
+
+        压缩包内（含嵌套）有 required_extensions 中的文件时有效；
+        文件损坏时不算作提交；因超出限制、缺少 rarfile 等原因无法完整检查时不作判断，
+        仍算作提交，原因中给出说明。
+        """
+        members, note, corrupt = self.list_members(source_file)
+        if any(os.path.splitext(m)[1].lower() in self.required_extensions for m in members):
+            return True, None
+        if note is not None:
+            return not corrupt, note
+        wanted = "、".join(sorted(self.required_extensions))
+        if not members:
+            return False, "压缩包是空的"
+        return False, f"压缩包中没有 {wanted} 文件（共 {len(members)} 个文件）"
+
+
+def _iter_archive(fileobj, ext):
+    """产出压缩包中的文件 (名称, 大小, 读取内容的函数)，不包括目录"""
+    if ext == '.rar':
+        try:
+            import rarfile
+        except ImportError:
+            raise _ListingLimit("未安装 rarfile，无法检查 .rar 压缩包内容")
+        with rarfile.RarFile(fileobj) as rf:
+            for info in rf.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: rf.read(info)
+        return
+    with zipfile.ZipFile(fileobj) as zf:
+        for info in zf.infolist():
+            if not info.is_dir():
+                yield _decode_zip_name(info), info.file_size, lambda info=info: zf.read(info)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+批量模式：一次检查多个班级
+
+清单 (JSON) 中每个班级指定自己的花名册、作业来源和后缀，例如:
+
+    {
+        "defaults": {"extensions": ".py, .zip", "recursive": false},
+        "classes": [
+            {"name": "1班", "roster": "花名册/1班.xlsx", "sources": ["作业/1班/第3周", "第3周.zip"]},
+            {"name": "2班", "roster": "花名册/2班.xlsx", "sources": ["第3周.zip"], "extensions": ".py"}
+        ]
+    }
+
+相对路径相对于清单文件所在目录。班级的设置项（extensions / all_types / recursive / max_depth /
+ignore / all_sheets）未写时使用 defaults，再没有时使用单班检查的默认值。
+
+run_batch 用进程池分两步处理：
+1. 解析花名册，同一个文件（且 all_sheets 相同）只解析一次；
+2. 扫描作业来源，同一个来源（且扫描深度、忽略规则相同）只列一次目录，
+   再在同一个进程里分别按各班的花名册匹配。
+结果汇总到 BatchReport，输出一个包含所有班级的工作簿。
+"""
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .engine import (
+    DEFAULT_EXTENSIONS,
+    _print_notify,
+    check_homework_in_folder,
+    parse_extensions,
+    process_roster_file,
+    unique_display_names,
+)
+from .export import write_xlsx
+from .sources import DEFAULT_IGNORE_PATTERNS, iter_source_files, parse_ignore_patterns
+
+BATCH_REPORT_FILENAME = "批量检查汇总.xlsx"
+_MISSING_COLUMNS = ["班级", "作业", "学号", "姓名"]
+# 默认的进程数
+DEFAULT_BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
+_CLASS_DEFAULTS = {
+    'extensions': DEFAULT_EXTENSIONS,
+    'all_types': False,
+    'recursive': False,
+    'max_depth': None,
+    'ignore': ", ".join(DEFAULT_IGNORE_PATTERNS),
+    'all_sheets': False,
+}
+
+
+def load_manifest(path):
+    """读取批量清单，返回规范化后的班级列表
+
+    每个班级为 {'name', 'roster', 'sources', 'target_extensions', 'check_all_types',
+    'depth', 'ignore_patterns', 'all_sheets'}，路径都已转为绝对路径。
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = dict(_CLASS_DEFAULTS, **manifest.get('defaults', {}))
+
+    classes = []
+    for i, entry in enumerate(manifest.get('classes', [])):
+        name = entry.get('name') or f"班级{i + 1}"
+        if 'roster' not in entry or not entry.get('sources'):
+            raise ValueError(f"清单中的 {name} 缺少 roster 或 sources")
+        options = dict(defaults, **entry)
+        sources = options['sources']
+        if isinstance(sources, str):
+            sources = [sources]
+        ignore = options['ignore']
+        if isinstance(ignore, str):
+            ignore = parse_ignore_patterns(ignore)
+        all_types = bool(options['all_types'])
+        classes.append({
+            'name': name,
+            'roster': os.path.join(base_dir, options['roster']),
+            'sources': [os.path.join(base_dir, s) for s in sources],
+            'target_extensions': [] if all_types else parse_extensions(options['extensions']),
+            'check_all_types': all_types,
+            'depth': options['max_depth'] if options['recursive'] else 0,
+            'ignore_patterns': tuple(ignore),
+            'all_sheets': bool(options['all_sheets']),
+        })
+    names = [c['name'] for c in classes]
+    if len(set(names)) != len(names):
+        raise ValueError("清单中的班级名称不能重复")
+    return classes
+
+
+def _parse_roster(path, all_sheets):
+    """（进程池中运行）解析一个花名册，返回 (花名册数据, 消息列表)"""
+    messages = []
+    roster_data = process_roster_file(path, notify=lambda level, message: messages.append((level, message)),
+                                      all_sheets=all_sheets)
+    return roster_data, messages
+
+
+def _scan_source(source, depth, ignore_patterns, jobs):
+    """（进程池中运行）列一次目录，再按每个任务的花名册匹配
+
+    jobs 为 [(任务键, 学号集合, 后缀列表, 是否所有类型)]，任务键为 (班级名, 来源)；
+    返回 ({任务键: 检查结果}, 消息列表)，消息前面加上 "[班级名]"。
+    """
+    messages = []
+
+    def notifier(class_names):
+        prefix = f"[{'、'.join(class_names)}] "
+        return lambda level, message: messages.append((level, prefix + message))
+
+    try:
+        files = list(iter_source_files(source, max_depth=depth, ignore_patterns=ignore_patterns))
+    except Exception as e:
+        # 列目录失败影响共用这个来源的所有班级
+        notifier(list(dict.fromkeys(job[0][0] for job in jobs)))('error', f"检查文件夹 {source} 时出错: {e}")
+        return {}, messages
+    results = {}
+    for job_key, student_ids, target_extensions, check_all_types in jobs:
+        result = check_homework_in_folder(source, student_ids, target_extensions=target_extensions,
+                                          check_all_types=check_all_types, notify=notifier([job_key[0]]),
+                                          recursive=True, max_depth=depth, ignore_patterns=ignore_patterns,
+                                          files=files)
+        if result:
+            results[job_key] = result
+    return results, messages
+
+
+def _map(func, arg_lists, max_workers):
+    """max_workers 为 1 或只有一个任务时在当前进程中依次执行，否则用进程池"""
+    if max_workers <= 1 or len(arg_lists) <= 1:
+        return [func(*args) for args in arg_lists]
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(arg_lists))) as executor:
+        futures = [executor.submit(func, *args) for args in arg_lists]
+        return [future.result() for future in futures]
+
+
+def run_batch(classes, max_workers=None, notify=None):
+    """按 load_manifest 得到的班级列表批量检查，返回 BatchReport
+
+    各班的消息前面加上 "[班级名]" 后交给 notify。花名册读取失败的班级会被跳过。
+    """
+    notify = notify or _print_notify
+    if max_workers is None:
+        max_workers = DEFAULT_BATCH_WORKERS
+
+    # 1. 花名册：同一个文件只解析一次
+    roster_keys = list(dict.fromkeys((c['roster'], c['all_sheets']) for c in classes))
+    parsed = _map(_parse_roster, roster_keys, max_workers)
+    rosters = {}
+    for key, (roster_data, messages) in zip(roster_keys, parsed):
+        for level, message in messages:
+            notify(level, f"[{os.path.basename(key[0])}] {message}")
+        rosters[key] = roster_data
+
+    # 2. 作业来源：同一个来源（扫描参数相同）只列一次目录
+    scans = {}  # (来源, 深度, 忽略规则) -> [任务]
+    for c in classes:
+        roster_data = rosters[(c['roster'], c['all_sheets'])]
+        if not roster_data:
+            notify('error', f"[{c['name']}] 花名册读取失败，跳过该班级")
+            continue
+        for source in c['sources']:
+            if not os.path.exists(source):
+                notify('error', f"[{c['name']}] 路径无效: {source}")
+                continue
+            scans.setdefault((source, c['depth'], c['ignore_patterns']), []).append(
+                ((c['name'], source), roster_data['student_ids'], c['target_extensions'], c['check_all_types']))
+    scan_keys = list(scans)
+    scanned = _map(_scan_source, [key + (scans[key],) for key in scan_keys], max_workers)
+    job_results = {}
+    for (source, _, _), (results, messages) in zip(scan_keys, scanned):
+        for level, message in messages:
+            notify(level, message)
+        job_results.update(results)
+
+    # 3. 按班级、按清单中的来源顺序整理结果
+    class_results = {}
+    for c in classes:
+        roster_data = rosters[(c['roster'], c['all_sheets'])]
+        if not roster_data:
+            continue
+        folder_results = {}
+        names = unique_display_names(c['sources'])
+        for source in c['sources']:
+            result = job_results.get((c['name'], source))
+            if result:
+                folder_results[names[source]] = result
+        class_results[c['name']] = (roster_data, folder_results)
+    stats = {'classes': len(classes), 'rosters_parsed': len(roster_keys), 'sources_scanned': len(scan_keys),
+             'checks': sum(len(jobs) for jobs in scans.values())}
+    return BatchReport(class_results, stats)
+
+
+class BatchReport:
+    """批量检查结果：{班级名: (花名册数据, {作业名: 检查结果})}，以及汇总表格"""
+
+    def __init__(self, class_results, stats=None):
+        self.class_results = class_results
+        self.stats = stats or {}
+
+    def summary_frame(self):
+        """每个班级每份作业一行：已提交、未提交、提交率"""
+        rows = []
+        for class_name, (roster_data, folder_results) in self.class_results.items():
+            for folder_name, res in folder_results.items():
+                total = roster_data['total_students']
+                rows.append({
+                    "班级": class_name,
+                    "作业": folder_name,
+                    "已提交": res['submitted_count'],
+                    "未提交": res['missing_count'],
+                    "提交率": round(res['submitted_count'] / total, 4) if total else 0.0,
+                })
+        return pd.DataFrame(rows, columns=["班级", "作业", "已提交", "未提交", "提交率"])
+
+    def missing_frame(self):
+        """所有班级的未交名单"""
+        return pd.DataFrame(list(self._missing_rows()), columns=_MISSING_COLUMNS)
+
+    def sheets(self):
+        """汇总工作簿的表格 [(表名, 表头, 行迭代器)]，与 summary_frame / missing_frame 内容相同，行在迭代时才生成"""
+        summary = self.summary_frame()
+        return [
+            ("各班提交情况", list(summary.columns), (list(row) for row in summary.itertuples(index=False))),
+            ("未交名单", _MISSING_COLUMNS, self._missing_rows()),
+        ]
+
+    def _missing_rows(self):
+        for class_name, (roster_data, folder_results) in self.class_results.items():
+            id_map = roster_data['student_id_to_name']
+            for folder_name, res in folder_results.items():
+                for sid in sorted(res['missing_ids']):
+                    yield [class_name, folder_name, sid, id_map.get(sid, "未知")]
+
+    def to_excel_bytes(self):
+        """汇总工作簿：各班提交情况 + 全部未交名单（逐行写入，见 export.write_xlsx）"""
+        excel_buffer = io.BytesIO()
+        write_xlsx(excel_buffer, self.sheets())
+        return excel_buffer.getvalue()
+
+    def write(self, output_dir):
+        """把汇总工作簿直接逐行写入 output_dir，返回文件路径"""
+        os.makedirs(output_dir, exist_ok=True)
+        out_path = os.path.join(output_dir, BATCH_REPORT_FILENAME)
+        with open(out_path, 'wb') as f:
+            write_xlsx(f, self.sheets())
+        return out_path
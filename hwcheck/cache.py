@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+目录快照缓存：重复检查同一批文件夹时只处理新增 / 删除 / 改动过的文件
+
+每个来源（按 路径 + 扫描参数 区分）保存一份快照 {相对路径: (大小, 修改时间, 后缀, 解析结果)}。
+再次检查时仍会遍历目录，但大小和修改时间都没变的文件直接复用上次的解析结果；
+ZIP 包本身没有变化时连目录都不用再读。
+
+缓存按文件条目总数限制大小，超出时淘汰最久未使用的来源。
+对象本身不依赖 Streamlit，放进 st.session_state 即可在页面重跑之间保留。
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from .sources import is_zip_source
+
+# 默认最多缓存的文件条目数（所有来源合计）
+DEFAULT_MAX_CACHE_ENTRIES = 500_000
+
+
+class SnapshotCache:
+    """按来源保存目录快照，线程安全（run_check 会在多个线程中同时使用）"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._snapshots = OrderedDict()  # key -> (来源自身的 (大小, 修改时间) 或 None, {relpath: 条目})
+        self._total_entries = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    @property
+    def total_entries(self):
+        return self._total_entries
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._total_entries = 0
+
+    def discard(self, source):
+        """删除某个来源的所有快照（不论扫描参数）"""
+        with self._lock:
+            for key in [k for k in self._snapshots if k[0] == source]:
+                _, entries = self._snapshots.pop(key)
+                self._total_entries -= len(entries)
+
+    def _get(self, key):
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+            return snapshot
+
+    def _put(self, key, source_sig, entries):
+        with self._lock:
+            old = self._snapshots.pop(key, None)
+            if old is not None:
+                self._total_entries -= len(old[1])
+            self._snapshots[key] = (source_sig, entries)
+            self._total_entries += len(entries)
+            # 超出上限时淘汰最久未使用的来源（至少保留刚写入的这一个）
+            while self._total_entries > self.max_entries and len(self._snapshots) > 1:
+                _, (_, evicted) = self._snapshots.popitem(last=False)
+                self._total_entries -= len(evicted)
+
+    def refresh(self, source, files, parse, key_extra=()):
+        """用当前目录内容更新来源的快照，返回 (快照条目, 统计)
+
+        - files: 无参函数，返回来源中文件对象的迭代器（见 sources.iter_source_files）
+        - parse: 对文件名的解析函数（例如提取学号），结果会被缓存
+        - key_extra: 影响扫描结果的参数（扫描深度、忽略规则、解析方式等），参与区分快照
+
+        快照条目为 {相对路径: (大小, 修改时间, 后缀, 解析结果)}，调用方不应修改它。
+        统计为 {'files': 文件数, 'reused': 复用数, 'parsed': 重新解析数, 'removed': 删除数}。
+        """
+        key = (source,) + tuple(key_extra)
+        previous = self._get(key)
+
+        # ZIP 包整体没变时直接复用快照
+        source_sig = None
+        if is_zip_source(source):
+            st = os.stat(source)
+            source_sig = (st.st_size, st.st_mtime_ns)
+            if previous is not None and previous[0] == source_sig:
+                entries = previous[1]
+                return entries, {'files': len(entries), 'reused': len(entries), 'parsed': 0, 'removed': 0}
+
+        old_entries = previous[1] if previous is not None else {}
+        entries = {}
+        reused = 0
+        for source_file in files():
+            size, mtime = source_file.size, source_file.mtime
+            old = old_entries.get(source_file.relpath)
+            if old is not None and old[0] == size and old[1] == mtime:
+                entries[source_file.relpath] = old
+                reused += 1
+            else:
+                entries[source_file.relpath] = (size, mtime, source_file.ext, parse(source_file.name))
+
+        removed = sum(1 for rel in old_entries if rel not in entries)
+        self._put(key, source_sig, entries)
+        return entries, {'files': len(entries), 'reused': reused, 'parsed': len(entries) - reused,
+                         'removed': removed}
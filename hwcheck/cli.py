@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+命令行入口，便于用 cron 等工具在无 Streamlit 服务的情况下批量检查作业
+
+示例:
+    python -m hwcheck check -r 花名册.xlsx -s D:/作业1 -s 作业2.zip -e ".py,.docx" -o 结果 --history
+    python -m hwcheck history --student 202400001
+    python -m hwcheck batch 本周清单.json -o 结果
+    python -m hwcheck serve --port 8765
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+
+from .engine import (
+    DEFAULT_EXTENSIONS,
+    DEFAULT_SCAN_WORKERS,
+    ReportBuilder,
+    parse_extensions,
+    process_roster_file,
+    run_check,
+    unique_display_names,
+    write_report_files,
+)
+from .archives import ARCHIVE_EXTENSIONS, DEFAULT_ARCHIVE_DEPTH, ArchiveInspector
+from .batch import DEFAULT_BATCH_WORKERS, load_manifest, run_batch
+from .deadlines import STATUS_LATE, STATUS_ON_TIME, parse_deadline
+from .duplicates import DEFAULT_HASH_WORKERS, find_duplicate_submissions
+from .export import EXPORT_FORMATS
+from .history import DEFAULT_HISTORY_PATH, HistoryStore
+from .matcher import NameMatcher
+from .metrics import CheckMetrics, enable_json_logging, profile_call
+from .server import DEFAULT_HOST, DEFAULT_PORT, CheckService, serve
+from .sources import DEFAULT_IGNORE_PATTERNS, parse_ignore_patterns
+from .watch import FolderWatcher
+
+
+def _add_check_parser(subparsers):
+    p = subparsers.add_parser("check", help="检查一个花名册对应的若干作业文件夹/压缩包")
+    p.add_argument("-r", "--roster", required=True, help="花名册 Excel 文件 (.xlsx/.xls)")
+    p.add_argument("--all-sheets", action="store_true", help="合并花名册中所有能找到学号列的工作表")
+    p.add_argument("-s", "--source", action="append", required=True, dest="sources",
+                   help="作业文件夹或 .zip 压缩包，可重复指定")
+    p.add_argument("-e", "--ext", default=DEFAULT_EXTENSIONS,
+                   help=f"要查找的文件后缀，逗号分隔 (默认: {DEFAULT_EXTENSIONS})")
+    p.add_argument("-a", "--all-types", action="store_true", help="查找所有类型文件（无视后缀）")
+    p.add_argument("-R", "--recursive", action="store_true", help="同时查找子文件夹")
+    p.add_argument("--max-depth", type=int, default=None, help="递归查找的最大层数 (默认: 不限)")
+    p.add_argument("--ignore", default=",".join(DEFAULT_IGNORE_PATTERNS),
+                   help=f"忽略的文件/文件夹名称，逗号分隔，支持通配符 (默认: {','.join(DEFAULT_IGNORE_PATTERNS)})")
+    p.add_argument("-o", "--output", default=".", help="名单文件输出目录 (默认: 当前目录)")
+    p.add_argument("--zip", action="store_true", help="把所有名单打包成一个 ZIP 输出")
+    p.add_argument("--format", choices=EXPORT_FORMATS, default='xlsx',
+                   help="名单表格的格式，parquet 需要安装 pyarrow (默认: xlsx)")
+    p.add_argument("-j", "--workers", type=int, default=DEFAULT_SCAN_WORKERS,
+                   help=f"并行扫描的线程数 (默认: {DEFAULT_SCAN_WORKERS})")
+    p.add_argument("--metrics-log", action="store_true", help="把各阶段耗时以每行一条 JSON 的形式输出到 stderr")
+    p.add_argument("--metrics-json", help="把本次检查的耗时与计数汇总写入该 JSON 文件")
+    p.add_argument("--profile", help="用 cProfile 分析文件夹扫描（此时逐个扫描），原始数据写入该文件")
+    p.add_argument("--history", nargs="?", const=DEFAULT_HISTORY_PATH,
+                   help=f"把花名册和检查结果保存到 SQLite 历史数据库 (默认: {DEFAULT_HISTORY_PATH})")
+    p.add_argument("--roster-name", help="保存到历史数据库时的花名册名称（如课程名）")
+    p.add_argument("--inspect-archives", action="store_true",
+                   help="打开匹配到学号的 .zip/.rar 检查内容，不含 --require-inner 中文件的不算提交")
+    p.add_argument("--require-inner",
+                   help="压缩包中至少要有一个的文件后缀，逗号分隔 (默认: -e 中除压缩包以外的后缀)")
+    p.add_argument("--archive-depth", type=int, default=DEFAULT_ARCHIVE_DEPTH,
+                   help=f"最多打开几层嵌套压缩包 (默认: {DEFAULT_ARCHIVE_DEPTH})")
+    p.add_argument("--deadline", action="append", default=[], metavar="[作业名=]时间",
+                   help="截止时间，如 \"第3周=2024-10-01 23:59\"；不写作业名时用于所有作业，可重复指定。"
+                        "设置后统计按时 / 迟交并输出迟交统计表")
+    p.add_argument("--match-names", action="store_true",
+                   help="文件名中没有学号时按花名册姓名匹配（安装 pypinyin 后也匹配拼音），有歧义的不算提交")
+    p.add_argument("--duplicates", action="store_true", help="比较已匹配文件的内容，列出不同学生提交的相同文件")
+    p.add_argument("--hash-workers", type=int, default=DEFAULT_HASH_WORKERS,
+                   help=f"计算文件哈希的进程数 (默认: {DEFAULT_HASH_WORKERS})")
+    p.add_argument("--watch", action="store_true",
+                   help="检查后继续监视本地文件夹，有新文件时更新名单文件，按 Ctrl+C 退出")
+    p.set_defaults(func=cmd_check)
+
+
+def _add_batch_parser(subparsers):
+    p = subparsers.add_parser("batch", help="按 JSON 清单一次检查多个班级，输出一个汇总工作簿")
+    p.add_argument("manifest", help="批量清单 JSON 文件（格式见 hwcheck/batch.py）")
+    p.add_argument("-o", "--output", default=".", help="汇总工作簿输出目录 (默认: 当前目录)")
+    p.add_argument("-j", "--workers", type=int, default=DEFAULT_BATCH_WORKERS,
+                   help=f"并行进程数 (默认: {DEFAULT_BATCH_WORKERS})")
+    p.set_defaults(func=cmd_batch)
+
+
+def _add_history_parser(subparsers):
+    p = subparsers.add_parser("history", help="查询保存在历史数据库中的检查结果")
+    p.add_argument("--db", default=DEFAULT_HISTORY_PATH, help=f"历史数据库路径 (默认: {DEFAULT_HISTORY_PATH})")
+    p.add_argument("--roster", help="花名册键（列表第一列，可只写开头几位），默认最近保存的花名册")
+    p.add_argument("--student", help="列出该学号所有缺交的作业")
+    p.set_defaults(func=cmd_history)
+
+
+def _add_serve_parser(subparsers):
+    p = subparsers.add_parser("serve", help="启动本地 HTTP JSON 接口（接口说明见 hwcheck/server.py）")
+    p.add_argument("--host", default=DEFAULT_HOST, help=f"监听地址 (默认: {DEFAULT_HOST}，不要监听公网地址)")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口 (默认: {DEFAULT_PORT})")
+    p.add_argument("--token", default=os.environ.get("HWCHECK_API_TOKEN"),
+                   help="访问令牌，设置后请求需带 \"Authorization: Bearer <令牌>\" (默认: 环境变量 HWCHECK_API_TOKEN)")
+    p.add_argument("-j", "--workers", type=int, default=DEFAULT_SCAN_WORKERS,
+                   help=f"每次检查并行扫描的线程数 (默认: {DEFAULT_SCAN_WORKERS})")
+    p.add_argument("--metrics-log", action="store_true", help="把每个请求的耗时以每行一条 JSON 的形式输出到 stderr")
+    p.set_defaults(func=cmd_serve)
+
+
+def cmd_check(args):
+    if args.metrics_log:
+        enable_json_logging()
+    metrics = CheckMetrics()
+
+    roster_data = process_roster_file(args.roster, all_sheets=args.all_sheets, metrics=metrics)
+    if not roster_data:
+        return 1
+    print(f"花名册处理完成！共读取 {roster_data['total_students']} 名学生")
+
+    target_exts = [] if args.all_types else parse_extensions(args.ext)
+
+    # 文件夹和 .zip 压缩包都直接作为来源，ZIP 包不解压
+    folder_paths = []
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"[error] 路径无效: {source}", file=sys.stderr)
+            continue
+        folder_paths.append(os.path.abspath(source))
+
+    if not folder_paths:
+        print("[error] 没有可检查的作业来源", file=sys.stderr)
+        return 1
+
+    # 显示名称（重名的来源加序号区分）
+    display_names = unique_display_names(folder_paths)
+    try:
+        deadlines = _parse_deadlines(args.deadline, list(display_names.values()))
+    except ValueError as e:
+        print(f"[error] {e}", file=sys.stderr)
+        return 1
+
+    inspector = None
+    if args.inspect_archives:
+        required_inner = (parse_extensions(args.require_inner) if args.require_inner
+                          else [ext for ext in target_exts if ext not in ARCHIVE_EXTENSIONS] or ['.py'])
+        inspector = ArchiveInspector(required_inner, max_depth=args.archive_depth)
+
+    name_matcher = NameMatcher(roster_data['student_id_to_name']) if args.match_names else None
+    check_kwargs = dict(target_extensions=target_exts, inspector=inspector, name_matcher=name_matcher,
+                        display_names=display_names,
+                        check_all_types=args.all_types, max_workers=args.workers, recursive=args.recursive,
+                        max_depth=args.max_depth, ignore_patterns=parse_ignore_patterns(args.ignore), metrics=metrics,
+                        progress=lambda done, total, name: print(f"[{done}/{total}] 已扫描: {name}"))
+    if args.profile:
+        # cProfile 只统计调用线程，分析时改为在当前线程逐个扫描
+        check_kwargs['max_workers'] = 1
+        folder_results, stats_text = profile_call(run_check, roster_data, folder_paths, output=args.profile,
+                                                  **check_kwargs)
+        print(stats_text, file=sys.stderr)
+    else:
+        folder_results = run_check(roster_data, folder_paths, **check_kwargs)
+    # 显示名称 -> 来源路径
+    sources = {name: path for path, name in display_names.items()}
+
+    for folder_name, res in folder_results.items():
+        print(f"{folder_name}: 已提交 {res['submitted_count']}，未提交 {res['missing_count']}")
+        if res['unmatched_files']:
+            print(f"  {len(res['unmatched_files'])} 个文件未匹配到花名册中的学号，例如: {res['unmatched_files'][0]}")
+        for relpath, reason in res['rejected_files'].items():
+            print(f"  不算提交: {relpath}（{reason}）")
+        for relpath, sid in res['name_matched_files'].items():
+            print(f"  按姓名匹配: {relpath} -> {sid} {roster_data['student_id_to_name'].get(sid, '')}")
+        for relpath, candidates in res['ambiguous_files'].items():
+            print(f"  姓名有歧义，未算提交: {relpath}（可能是 {', '.join(candidates)}）")
+
+    if args.duplicates:
+        duplicates = find_duplicate_submissions(folder_results, sources,
+                                                notify=_print_error, max_workers=args.hash_workers, metrics=metrics)
+        for folder_name, found in duplicates.items():
+            for group in found['groups']:
+                print(f"{folder_name}: 内容相同 ({', '.join(group['student_ids'])}): {', '.join(group['files'])}")
+
+    report = ReportBuilder(folder_results, roster_data['student_id_to_name'], metrics=metrics, deadlines=deadlines)
+    if deadlines:
+        for row in report.late_analysis['summary'].to_dict('records'):
+            if row['作业文件夹'] in deadlines:
+                print(f"{row['作业文件夹']}: 按时 {row[STATUS_ON_TIME]}，迟交 {row[STATUS_LATE]}"
+                      f"（截止 {row['截止时间']:%Y-%m-%d %H:%M}）")
+    written = write_report_files(report, args.output, as_zip=args.zip, fmt=args.format)
+    for path in written:
+        print(f"已写出: {path}")
+
+    if args.history:
+        store = HistoryStore(args.history)
+        try:
+            store.save_roster(roster_data, name=args.roster_name)
+            store.save_results(roster_data, folder_results,
+                               sources=sources)
+        finally:
+            store.close()
+        print(f"检查结果已保存到: {args.history}")
+
+    if args.metrics_json:
+        with open(args.metrics_json, 'w', encoding='utf-8') as f:
+            json.dump(metrics.as_dict(), f, ensure_ascii=False, indent=2)
+
+    if args.watch:
+        return _watch(args, roster_data, sources, folder_results, target_exts, written, deadlines,
+                      inspector=inspector, name_matcher=name_matcher)
+    return 0
+
+
+def _parse_deadlines(values, folder_names):
+    """把 --deadline 的值转成 {作业名: 截止时间戳}，不带作业名的值用于所有作业（带作业名的优先）"""
+    deadlines = {}
+    default = None
+    for value in values:
+        name, sep, text = value.rpartition('=')
+        if not sep:
+            default = parse_deadline(text)
+        elif name not in folder_names:
+            raise ValueError(f"--deadline 中的作业 {name} 不在检查的来源中")
+        else:
+            deadlines[name] = parse_deadline(text)
+    if default is not None:
+        deadlines = {**dict.fromkeys(folder_names, default), **deadlines}
+    return deadlines
+
+
+def _watch(args, roster_data, sources, folder_results, target_exts, written, deadlines=None, inspector=None,
+           name_matcher=None):
+    """监视本地文件夹，结果有变化时打印并重新写出名单文件"""
+    changed = threading.Event()
+    watcher = FolderWatcher(roster_data['student_ids'], target_extensions=target_exts,
+                            check_all_types=args.all_types, recursive=args.recursive, max_depth=args.max_depth,
+                            ignore_patterns=parse_ignore_patterns(args.ignore), inspector=inspector,
+                            name_matcher=name_matcher, on_change=lambda name: changed.set())
+    for folder_name, path in sources.items():
+        if folder_name in folder_results:
+            watcher.add(path, folder_name, folder_results[folder_name])
+    if not watcher.folder_names:
+        print("[error] 没有可监视的本地文件夹（压缩包不监视）", file=sys.stderr)
+        return 1
+    watcher.start()
+    print(f"正在监视 {len(watcher.folder_names)} 个文件夹（{watcher.backend}），按 Ctrl+C 退出")
+    try:
+        while True:
+            # 带超时等待，Ctrl+C 才能及时生效
+            if not changed.wait(1.0):
+                continue
+            changed.clear()
+            folder_results = {**folder_results, **watcher.results()}
+            for folder_name in watcher.folder_names:
+                res = folder_results[folder_name]
+                print(f"{folder_name}: 已提交 {res['submitted_count']}，未提交 {res['missing_count']}")
+            report = ReportBuilder(folder_results, roster_data['student_id_to_name'], deadlines=deadlines)
+            new_written = write_report_files(report, args.output, as_zip=args.zip, fmt=args.format)
+            # 已经收齐的文件夹不再有未交名单，删掉上次写出的旧文件
+            for path in set(written) - set(new_written):
+                if os.path.exists(path):
+                    os.remove(path)
+            written = new_written
+    except KeyboardInterrupt:
+        print("已停止监视")
+    finally:
+        watcher.stop()
+    return 0
+
+
+def cmd_batch(args):
+    try:
+        classes = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"[error] 读取清单失败: {e}", file=sys.stderr)
+        return 1
+    report = run_batch(classes, max_workers=args.workers, notify=_print_error)
+    for class_name, (roster_data, folder_results) in report.class_results.items():
+        print(f"{class_name}（{roster_data['total_students']} 人）")
+        for folder_name, res in folder_results.items():
+            print(f"  {folder_name}: 已提交 {res['submitted_count']}，未提交 {res['missing_count']}")
+    stats = report.stats
+    print(f"共 {stats['classes']} 个班级：解析花名册 {stats['rosters_parsed']} 次，"
+          f"扫描来源 {stats['sources_scanned']} 次，匹配 {stats['checks']} 次")
+    print(f"已写出: {report.write(args.output)}")
+    return 0 if report.class_results else 1
+
+
+def _print_error(level, message):
+    print(f"[{level}] {message}", file=sys.stderr)
+
+
+def _format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def cmd_history(args):
+    if not os.path.exists(args.db):
+        print(f"[error] 历史数据库不存在: {args.db}", file=sys.stderr)
+        return 1
+    store = HistoryStore(args.db)
+    try:
+        rosters = store.list_rosters()
+        key = None
+        if args.roster:
+            matches = [r for r in rosters if r['roster_key'].startswith(args.roster)]
+            if len(matches) != 1:
+                print(f"[error] 找到 {len(matches)} 个花名册与 {args.roster} 匹配", file=sys.stderr)
+                return 1
+            key = matches[0]['roster_key']
+
+        if args.student:
+            missing = store.missing_for_student(args.student, roster_key=key)
+            print(f"{args.student} 共缺交 {len(missing)} 份作业")
+            for item in missing:
+                print(f"  {_format_time(item['checked_at'])}  {item['folder_name']}  "
+                      f"({item['roster_name'] or item['roster_key'][:8]})")
+            return 0
+
+        if key is None:
+            for r in rosters:
+                sheets = "  (合并所有工作表)" if r['all_sheets'] else ""
+                print(f"{r['roster_key'][:12]}  {r['name'] or '(未命名)'}{sheets}  {r['total_students']} 名学生  "
+                      f"{r['assignments']} 份作业  保存于 {_format_time(r['saved_at'])}")
+            return 0
+        for item in store.list_assignments(key):
+            print(f"{_format_time(item['checked_at'])}  {item['folder_name']}: 已提交 {item['submitted_count']}，"
+                  f"未提交 {item['missing_count']}")
+        return 0
+    finally:
+        store.close()
+
+
+def cmd_serve(args):
+    if args.metrics_log:
+        enable_json_logging()
+    serve(args.host, args.port, service=CheckService(max_workers=args.workers), token=args.token)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="hwcheck", description="作业提交检查（命令行版）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _add_check_parser(subparsers)
+    _add_batch_parser(subparsers)
+    _add_history_parser(subparsers)
+    _add_serve_parser(subparsers)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+会话中保存的紧凑检查结果：用位图代替学号集合
+
+run_check 的每个文件夹结果里都有 submitted_ids / missing_ids 两个学号字符串集合，两者合起来正好是整个花名册。
+Streamlit 的每个会话都在 st.session_state 中保存一份，学生多、作业多、同时使用的人多时，
+这些集合（每个学号一个 str 对象，再加上集合的哈希表）占了会话内存的大头。这里：
+
+- RosterIndex：每个花名册（按 roster_hash）只建一份学号表，学号字符串只保存一次，所有会话共用；
+- CompactResult：一个文件夹的结果，已交学生存为按花名册顺序的位图（np.packbits，每个学生 1 bit）；
+- 文件数多时每个文件一条的 matched_files / file_stats 比学号集合还大（每个相对路径一个 str、每条一个元组，
+  再加上 dict 的哈希表），这两项按列存放：相对路径按顺序拼成一个字符串 + 结束位置数组（两项的路径相同时共用一份），
+  学号存为学号表中的行号，大小 / 修改时间存为 NumPy 数组（MatchedFiles / FileStats，只读 Mapping，
+  按路径排序、二分查找）；name_matched_files 等其余记录里的学号换成学号表中的同一个 str 对象；
+- CompactResult 是只读的 Mapping，result['submitted_ids'] / result['missing_ids'] 在取用时才由位图生成集合，
+  页面、报告、导出和历史记录的代码不用修改；提交矩阵和名单导出直接使用位图。
+
+不在花名册里的学号（正常情况下不会出现）在压缩时被忽略，与 SubmissionMatrix 相同。
+"""
+import threading
+from collections import OrderedDict
+from collections.abc import ItemsView, Mapping, ValuesView
+
+import numpy as np
+
+# 最多同时保留多少个花名册的学号表
+_INDEX_CACHE_SIZE = 16
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+# 由位图生成、不单独保存的键
+_ID_KEYS = ('submitted_ids', 'missing_ids')
+
+
+class RosterIndex:
+    """花名册学号表：学号 <-> 行号（花名册顺序）"""
+
+    def __init__(self, student_ids):
+        self.student_ids = tuple(student_ids)
+        self.position = {sid: i for i, sid in enumerate(self.student_ids)}
+        self._ids = np.array(self.student_ids, dtype=object)
+        self._sort_order = None
+
+    @classmethod
+    def for_roster(cls, roster_data):
+        """取出（或建立）roster_data 对应的共用学号表，学号顺序与 student_id_to_name 相同"""
+        student_ids = list(roster_data['student_id_to_name'])
+        key = roster_data.get('roster_hash')
+        if key is None:
+            return cls(student_ids)
+        with _INDEX_CACHE_LOCK:
+            index = _INDEX_CACHE.get(key)
+            if index is not None:
+                _INDEX_CACHE.move_to_end(key)
+        # 同一个文件合并 / 不合并工作表时哈希相同但学号不同，核对一遍
+        if index is None or list(index.student_ids) != student_ids:
+            index = cls(student_ids)
+            with _INDEX_CACHE_LOCK:
+                _INDEX_CACHE[key] = index
+                while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+                    _INDEX_CACHE.popitem(last=False)
+        return index
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def canonical(self, sid):
+        """学号表中与 sid 相等的那个 str 对象（不在花名册中时原样返回）"""
+        i = self.position.get(sid)
+        return sid if i is None else self.student_ids[i]
+
+    def pack(self, ids):
+        """学号集合 -> 位图（uint8 数组）"""
+        mask = np.zeros(len(self.student_ids), dtype=bool)
+        rows = np.fromiter((self.position[sid] for sid in ids if sid in self.position), dtype=np.intp)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def unpack(self, bits):
+        """位图 -> 按花名册顺序的布尔数组"""
+        return np.unpackbits(bits, count=len(self.student_ids)).astype(bool)
+
+    def ids(self, mask):
+        """布尔数组中为 True 的学号集合（元素是学号表中的 str 对象，不复制字符串）"""
+        return set(self._ids[mask].tolist())
+
+    def sorted_ids(self, mask):
+        """布尔数组中为 True 的学号，按学号排序"""
+        if self._sort_order is None:
+            self._sort_order = np.argsort(self._ids, kind='stable')
+        order = self._sort_order
+        return self._ids[order][mask[order]].tolist()
+
+
+class CompactResult(Mapping):
+    """一个文件夹的检查结果，键与 check_homework_in_folder 的结果相同，已交学生存为位图"""
+
+    __slots__ = ('index', 'bits', '_fields')
+
+    def __init__(self, index, bits, fields):
+        self.index = index
+        self.bits = bits
+        self._fields = fields
+
+    @classmethod
+    def from_result(cls, result, index):
+        """由 run_check / 历史记录 / 监视模式的结果字典压缩"""
+        if isinstance(result, CompactResult) and result.index is index:
+            return result
+        bits = index.pack(result['submitted_ids'])
+        canonical = index.canonical
+        fields = {key: value for key, value in result.items() if key not in _ID_KEYS}
+        submitted_count = int(np.unpackbits(bits).sum())
+        fields['submitted_count'] = submitted_count
+        fields['missing_count'] = len(index) - submitted_count
+        keys = None
+        if fields.get('matched_files'):
+            fields['matched_files'] = MatchedFiles.from_dict(fields['matched_files'], index)
+            keys = getattr(fields['matched_files'], 'keys_table', None)
+        if fields.get('file_stats'):
+            fields['file_stats'] = FileStats.from_dict(fields['file_stats'], keys)
+        if fields.get('name_matched_files'):
+            fields['name_matched_files'] = {relpath: canonical(sid)
+                                            for relpath, sid in fields['name_matched_files'].items()}
+        if fields.get('ambiguous_files'):
+            fields['ambiguous_files'] = {relpath: [canonical(sid) for sid in ids]
+                                         for relpath, ids in fields['ambiguous_files'].items()}
+        return cls(index, bits, fields)
+
+    def __getitem__(self, key):
+        if key == 'submitted_ids':
+            return self.index.ids(self.mask())
+        if key == 'missing_ids':
+            return self.index.ids(~self.mask())
+        return self._fields[key]
+
+    def __contains__(self, key):
+        return key in _ID_KEYS or key in self._fields
+
+    def __iter__(self):
+        yield from _ID_KEYS
+        yield from self._fields
+
+    def __len__(self):
+        return len(_ID_KEYS) + len(self._fields)
+
+    def mask(self):
+        """按花名册顺序的已交布尔数组"""
+        return self.index.unpack(self.bits)
+
+    def missing_list(self):
+        """未交学号，按学号排序"""
+        return self.index.sorted_ids(~self.mask())
+
+
+class _PathKeys:
+    """排好序的相对路径：拼成一个字符串，按结束位置切出，二分查找"""
+
+    __slots__ = ('_text', '_ends')
+
+    def __init__(self, paths):
+        self._text = ''.join(paths)
+        self._ends = np.cumsum(np.fromiter(map(len, paths), dtype=np.int64, count=len(paths)))
+
+    def __len__(self):
+        return len(self._ends)
+
+    def key(self, i):
+        return self._text[self._ends[i - 1] if i else 0:self._ends[i]]
+
+    def find(self, key):
+        """key 的序号，不存在时为 -1"""
+        lo, hi = 0, len(self._ends)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self._ends) and self.key(lo) == key else -1
+
+    def matches(self, paths):
+        """是否与已排序的 paths 完全相同"""
+        return (len(paths) == len(self) and self._text == ''.join(paths)
+                and np.array_equal(self._ends, np.cumsum([len(path) for path in paths])))
+
+
+class _PathMap(Mapping):
+    """相对路径 -> 值 的只读 Mapping，键存放在 _PathKeys 中，值由子类按序号取出"""
+
+    __slots__ = ('keys_table',)
+
+    def __init__(self, keys_table):
+        self.keys_table = keys_table
+
+    def _key(self, i):
+        return self.keys_table.key(i)
+
+    def _value(self, i):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        i = self.keys_table.find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        return self._value(i)
+
+    def __iter__(self):
+        return map(self.keys_table.key, range(len(self.keys_table)))
+
+    def __len__(self):
+        return len(self.keys_table)
+
+    def items(self):
+        return _PathItems(self)
+
+    def values(self):
+        return _PathValues(self)
+
+
+class _PathItems(ItemsView):
+    def __iter__(self):
+        path_map = self._mapping
+        for i in range(len(path_map)):
+            yield path_map._key(i), path_map._value(i)
+
+
+class _PathValues(ValuesView):
+    def __iter__(self):
+        return map(self._mapping._value, range(len(self._mapping)))
+
+
+class MatchedFiles(_PathMap):
+    """matched_files：相对路径 -> 学号元组，学号存为学号表中的行号"""
+
+    __slots__ = ('index', '_rows', '_row_ends')
+
+    def __init__(self, keys_table, index, rows, row_ends):
+        super().__init__(keys_table)
+        self.index = index
+        self._rows = rows
+        self._row_ends = row_ends
+
+    @classmethod
+    def from_dict(cls, matched_files, index):
+        """由 {相对路径: 学号元组} 生成；有不在花名册中的学号时（正常情况下不会出现）保留为普通 dict"""
+        if isinstance(matched_files, MatchedFiles) and matched_files.index is index:
+            return matched_files
+        paths = sorted(matched_files)
+        position = index.position
+        try:
+            rows = [position[sid] for relpath in paths for sid in matched_files[relpath]]
+        except KeyError:
+            return {relpath: tuple(map(index.canonical, ids)) for relpath, ids in matched_files.items()}
+        row_ends = np.cumsum([len(matched_files[relpath]) for relpath in paths], dtype=np.int64)
+        return cls(_PathKeys(paths), index, np.array(rows, dtype=np.int32), row_ends)
+
+    def _value(self, i):
+        start = self._row_ends[i - 1] if i else 0
+        student_ids = self.index.student_ids
+        return tuple(student_ids[row] for row in self._rows[start:self._row_ends[i]].tolist())
+
+
+class FileStats(_PathMap):
+    """file_stats：相对路径 -> (大小, 修改时间)，两列分别存为 NumPy 数组"""
+
+    __slots__ = ('_sizes', '_mtimes')
+
+    def __init__(self, keys_table, sizes, mtimes):
+        super().__init__(keys_table)
+        self._sizes = sizes
+        self._mtimes = mtimes
+
+    @classmethod
+    def from_dict(cls, file_stats, keys_table=None):
+        """由 {相对路径: (大小, 修改时间)} 生成；路径与 keys_table（通常来自 matched_files）相同时共用它"""
+        if isinstance(file_stats, FileStats):
+            return file_stats
+        paths = sorted(file_stats)
+        if keys_table is None or not keys_table.matches(paths):
+            keys_table = _PathKeys(paths)
+        sizes = np.fromiter((file_stats[relpath][0] for relpath in paths), dtype=np.int64, count=len(paths))
+        mtimes = np.fromiter((file_stats[relpath][1] for relpath in paths), dtype=np.float64, count=len(paths))
+        return cls(keys_table, sizes, mtimes)
+
+    def _value(self, i):
+        return int(self._sizes[i]), float(self._mtimes[i])
+
+
+def compact_results(folder_results, roster_data):
+    """把 {显示名称: 检查结果} 中的每个结果换成 CompactResult（已经是同一花名册的保持不变）"""
+    index = RosterIndex.for_roster(roster_data)
+    return {name: CompactResult.from_result(res, index) for name, res in folder_results.items()}
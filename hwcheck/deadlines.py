@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+按时 / 迟交统计
+
+check_homework_in_folder 在扫描时顺便记下每个匹配到学号的文件的 (大小, 修改时间)（结果中的 file_stats），
+这里不再访问文件系统，只把这些记录展开成一张表，再用 pandas 的向量运算和每份作业的截止时间比较：
+
+- 一个学生在一份作业中有多个文件时，提交时间取最早的那个文件（有一个按时交了就算按时）；
+- 没有设置截止时间的作业，已交的学生记为"已交"，不区分按时 / 迟交；
+- 从历史记录载入的结果没有文件时间，同样记为"已交"。
+
+时间都是本地时间的时间戳（与 os.stat 的 st_mtime 相同）。
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil import tz  # pandas 的依赖
+
+LATE_FILENAME = "迟交统计.xlsx"
+STATUS_ON_TIME = "按时"
+STATUS_LATE = "迟交"
+STATUS_SUBMITTED = "已交"
+STATUS_MISSING = "未交"
+
+_DETAIL_COLUMNS = ["文件夹", "学号", "姓名", "状态", "提交时间", "最后修改", "迟交(小时)", "文件数", "总大小(字节)"]
+
+
+def parse_deadline(text):
+    """把 "2024-10-01 23:59"、"2024-10-01T23:59:00" 或 "2024-10-01"（当天 23:59:59）转成时间戳"""
+    text = str(text).strip()
+    try:
+        if len(text) <= 10:
+            dt = datetime.datetime.strptime(text, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        else:
+            dt = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"无法识别的截止时间: {text}（格式如 2024-10-01 23:59）")
+    return dt.timestamp()
+
+
+def to_local_datetime(seconds):
+    """时间戳（Series）-> 不带时区的本地时间，NaN 变成 NaT
+
+    本地时区每次调用时取当前的（tzlocal），并按每个时间戳各自的 UTC 偏移换算，
+    跨夏令时切换或进程运行期间时区设置改变时也与 datetime.fromtimestamp 一致。
+    """
+    return pd.to_datetime(seconds, unit='s', utc=True).dt.tz_convert(tz.tzlocal()).dt.tz_localize(None)
+
+
+def submission_frame(folder_results):
+    """每个 (文件夹, 学号) 一行：最早提交、最晚提交（时间戳）、文件数、总大小
+
+    小组提交的文件会展开给组里的每个学生。
+    """
+    folders, student_ids, sizes, mtimes = [], [], [], []
+    for folder_name, res in folder_results.items():
+        stats = res.get('file_stats') or {}
+        for relpath, ids in res['matched_files'].items():
+            size, mtime = stats.get(relpath, (np.nan, np.nan))
+            folders.append(folder_name)
+            student_ids.append(ids)
+            sizes.append(size)
+            mtimes.append(mtime)
+    frame = pd.DataFrame({"文件夹": folders, "学号": student_ids,
+                          "大小": np.asarray(sizes, dtype=float), "修改时间": np.asarray(mtimes, dtype=float)})
+    frame = frame.explode("学号")
+    return frame.groupby(["文件夹", "学号"], sort=False).agg(
+        最早提交=("修改时间", "min"), 最晚提交=("修改时间", "max"),
+        文件数=("修改时间", "size"), 总大小=("大小", "sum"),
+    ).reset_index()
+
+
+def late_analysis(folder_results, deadlines=None, id_map=None):
+    """按截止时间统计每份作业的按时 / 迟交 / 未交情况
+
+    - deadlines: {作业名: 截止时间戳}，没有的作业不区分按时 / 迟交
+    - id_map: 学号 -> 姓名
+
+    返回 {'summary': 每份作业一行（截止时间、按时、迟交、已交、未交），
+          'detail': 每个已交的 (作业, 学生) 一行，迟交的排在前面}。
+    """
+    deadlines = deadlines or {}
+    id_map = id_map or {}
+    folder_names = list(folder_results)
+    sub = submission_frame(folder_results)
+
+    deadline = sub["文件夹"].map(deadlines).astype(float)
+    lateness = sub["最早提交"] - deadline
+    status = np.select([deadline.isna() | lateness.isna(), lateness <= 0],
+                       [STATUS_SUBMITTED, STATUS_ON_TIME], STATUS_LATE)
+    detail = pd.DataFrame({
+        "文件夹": sub["文件夹"],
+        "学号": sub["学号"],
+        "姓名": sub["学号"].map(id_map).fillna("未知"),
+        "状态": status,
+        "提交时间": to_local_datetime(sub["最早提交"]),
+        "最后修改": to_local_datetime(sub["最晚提交"]),
+        "迟交(小时)": (lateness / 3600).where(status == STATUS_LATE).round(1),
+        "文件数": sub["文件数"],
+        "总大小(字节)": sub["总大小"].astype('int64'),
+    }, columns=_DETAIL_COLUMNS)
+    detail = detail.sort_values("迟交(小时)", ascending=False, kind='stable', na_position='last')
+    detail = detail.reset_index(drop=True)
+
+    counts = pd.crosstab(sub["文件夹"], status).reindex(
+        index=folder_names, columns=[STATUS_ON_TIME, STATUS_LATE, STATUS_SUBMITTED], fill_value=0)
+    summary = pd.DataFrame({
+        "作业文件夹": folder_names,
+        "截止时间": to_local_datetime(pd.Series([deadlines.get(name, np.nan) for name in folder_names],
+                                            dtype=float)),
+        STATUS_ON_TIME: counts[STATUS_ON_TIME].to_numpy(),
+        STATUS_LATE: counts[STATUS_LATE].to_numpy(),
+        STATUS_SUBMITTED: counts[STATUS_SUBMITTED].to_numpy(),
+        STATUS_MISSING: [folder_results[name]['missing_count'] for name in folder_names],
+    })
+    return {'summary': summary, 'detail': detail}
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+内容相同的提交检测（可选步骤）
+
+check_homework_in_folder 只看文件名，发现不了两个学生交了一模一样的文件，
+或者同一个文件改了名字再交。这里对已匹配到学号的文件按内容分组：
+
+1. 先按文件大小分组（ZIP 成员再加上中央目录里现成的 CRC32），
+   只有大小相同、且来自不同学生的文件才可能重复，绝大多数文件根本不用读；
+2. 剩下的候选文件分块读取计算哈希，数据量大时放到进程池里并行计算；
+3. 哈希按 (路径, 大小, 修改时间) 缓存在 HashCache 中，重复检查时只计算变化过的文件。
+
+结果中每一组是内容完全相同、但属于不同学生的文件。
+"""
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import maybe_stage
+from .sources import COPY_CHUNK_SIZE, is_zip_source, iter_zip_files
+
+# 默认的哈希进程数
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+# 候选文件总量小于该值时直接在当前进程计算，启动进程池反而更慢
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+# 每个进程池任务大约处理的数据量，太小时进程间通信开销占比高
+_BATCH_BYTES = 64 * 1024 * 1024
+# 默认最多缓存的哈希条数
+DEFAULT_MAX_HASH_ENTRIES = 200_000
+
+
+class HashCache:
+    """文件内容哈希缓存，键为 (路径, 大小, 修改时间)，线程安全，超出上限时淘汰最久未用的条目"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_HASH_ENTRIES):
+        self.max_entries = max_entries
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._digests)
+
+    def get(self, key):
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+            return digest
+
+    def put(self, key, digest):
+        with self._lock:
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._digests.clear()
+
+
+def _hash_stream(stream):
+    digest = hashlib.blake2b(digest_size=20)
+    for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_batch(batch):
+    """计算一批文件的哈希（在进程池中运行，必须是模块级函数）
+
+    batch 为 [(文件路径 或 ZIP 路径, ZIP 成员名 或 None)]，读取失败的文件结果为 None。
+    """
+    digests = []
+    archives = {}
+    try:
+        for path, member_name in batch:
+            try:
+                if member_name is None:
+                    with open(path, 'rb') as f:
+                        digests.append(_hash_stream(f))
+                else:
+                    if path not in archives:
+                        archives[path] = zipfile.ZipFile(path, 'r')
+                    with archives[path].open(member_name, 'r') as f:
+                        digests.append(_hash_stream(f))
+            except (OSError, KeyError, zipfile.BadZipFile):
+                digests.append(None)
+    finally:
+        for archive in archives.values():
+            archive.close()
+    return digests
+
+
+def _list_candidates(source, matched_files, min_size):
+    """(相对路径, 学号元组, 大小, 修改时间, 缓存/读取路径, ZIP 成员名, 分组键) 列表"""
+    candidates = []
+    if is_zip_source(source):
+        for member in iter_zip_files(source, max_depth=None, ignore_patterns=()):
+            student_ids = matched_files.get(member.relpath)
+            if student_ids and member.size >= min_size:
+                candidates.append((member.relpath, student_ids, member.size, member.mtime, member.path,
+                                   member.info.filename, (member.size, member.info.CRC)))
+        return candidates
+    for relpath, student_ids in matched_files.items():
+        path = os.path.join(source, *relpath.split('/'))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size >= min_size:
+            candidates.append((relpath, student_ids, stat.st_size, stat.st_mtime, path, None, (stat.st_size,)))
+    return candidates
+
+
+def _from_different_students(items):
+    return len({item[1] for item in items}) > 1
+
+
+def find_duplicates(source, matched_files, max_workers=None, cache=None, min_size=1, metrics=None):
+    """找出来源中内容相同、属于不同学生的已匹配文件
+
+    - source: 作业文件夹或 ZIP 包；matched_files: 检查结果中的 {相对路径: 学号元组}
+    - max_workers: 哈希进程数，默认 DEFAULT_HASH_WORKERS；为 1 或数据量小时在当前进程计算
+    - cache: HashCache，跨多次检查复用哈希
+    - min_size: 小于该字节数的文件不参与比较（默认跳过空文件）
+
+    返回 {'groups': [{'digest', 'size', 'files', 'student_ids'}], 'stats': {...}}，
+    groups 按文件数从多到少排列。
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_HASH_WORKERS
+    with maybe_stage(metrics, 'duplicates', source=os.path.basename(source)):
+        candidates = _list_candidates(source, matched_files, min_size)
+
+        # 1. 大小（+CRC）预筛选：只有同组里有其他学生的文件才需要算哈希
+        by_size = defaultdict(list)
+        for item in candidates:
+            by_size[item[6]].append(item)
+        to_check = [item for group in by_size.values() if len(group) > 1 and _from_different_students(group)
+                    for item in group]
+
+        # 2. 查缓存，剩下的计算哈希
+        digests = {}
+        pending = []
+        for item in to_check:
+            digest = cache.get((item[4], item[2], item[3])) if cache is not None else None
+            if digest is None:
+                pending.append(item)
+            else:
+                digests[item[0]] = digest
+        cache_hits = len(to_check) - len(pending)
+
+        pending_bytes = sum(item[2] for item in pending)
+        if max_workers <= 1 or len(pending) < 2 or pending_bytes < PARALLEL_MIN_BYTES:
+            results = _hash_batch([(item[4] if item[5] is None else source, item[5]) for item in pending])
+        else:
+            batches, batch, batch_bytes = [], [], 0
+            for item in pending:
+                batch.append(item)
+                batch_bytes += item[2]
+                if batch_bytes >= min(_BATCH_BYTES, pending_bytes // max_workers + 1):
+                    batches.append(batch)
+                    batch, batch_bytes = [], 0
+            if batch:
+                batches.append(batch)
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+                batch_results = executor.map(
+                    _hash_batch, [[(item[4] if item[5] is None else source, item[5]) for item in b] for b in batches])
+                pending = [item for b in batches for item in b]
+                results = [digest for r in batch_results for digest in r]
+        for item, digest in zip(pending, results):
+            if digest is None:
+                continue
+            digests[item[0]] = digest
+            if cache is not None:
+                cache.put((item[4], item[2], item[3]), digest)
+
+        # 3. 按哈希分组
+        by_digest = defaultdict(list)
+        for item in to_check:
+            if item[0] in digests:
+                by_digest[digests[item[0]]].append(item)
+        groups = []
+        for digest, items in by_digest.items():
+            if len(items) > 1 and _from_different_students(items):
+                groups.append({
+                    'digest': digest,
+                    'size': items[0][2],
+                    'files': sorted(item[0] for item in items),
+                    'student_ids': sorted({sid for item in items for sid in item[1]})
+                })
+        groups.sort(key=lambda g: (-len(g['files']), g['files'][0]))
+
+    stats = {'files': len(candidates), 'size_candidates': len(to_check), 'hashed': len(pending),
+             'cache_hits': cache_hits, 'bytes_hashed': pending_bytes}
+    if metrics is not None:
+        metrics.add('duplicate_files_hashed', len(pending))
+        metrics.add('duplicate_bytes_hashed', pending_bytes)
+    return {'groups': groups, 'stats': stats}
+
+
+def find_duplicate_submissions(folder_results, sources, notify=None, **kwargs):
+    """对 run_check 的每个结果做重复检测，sources 为 {显示名称: 来源路径}，返回 {显示名称: 检测结果}
+
+    其余参数见 find_duplicates。某个来源出错时通过 notify 报告并跳过。
+    """
+    duplicates = {}
+    for folder_name, res in folder_results.items():
+        source = sources.get(folder_name)
+        if source is None or not os.path.exists(source):
+            continue
+        try:
+            duplicates[folder_name] = find_duplicates(source, res['matched_files'], **kwargs)
+        except Exception as e:
+            if notify:
+                notify('error', f"检测 {folder_name} 中的重复提交时出错: {e}")
+    return duplicates
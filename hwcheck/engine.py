@@ -0,0 +1,789 @@
+# -*- coding: utf-8 -*-
+"""
+作业检查核心逻辑（不依赖 Streamlit）
+
+web_check.py 与命令行入口 (python -m hwcheck) 共用这里的函数。
+需要向用户反馈的信息统一通过 notify(level, message) 回调输出，
+level 取值为 'info' / 'success' / 'warning' / 'error'；
+未提供回调时直接 print 到控制台。
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from .compact import CompactResult
+from .deadlines import LATE_FILENAME, late_analysis
+from .export import report_sheets, write_report_dir, write_report_zip, write_txt, write_xlsx
+from .matcher import StudentIdMatcher
+from .matrix import SubmissionMatrix
+from .metrics import maybe_stage
+from .tables import MissingTable
+from .sources import COPY_CHUNK_SIZE, DEFAULT_IGNORE_PATTERNS, LocalFile, is_zip_source, iter_source_files, iter_zip_files
+
+# 临时目录前缀，清理时据此判断是否为本工具创建的目录（防止误删）
+TEMP_DIR_PREFIX = "my_temporary_file_"
+# 默认查找的文件后缀
+DEFAULT_EXTENSIONS = ".py, .zip, .docx"
+# 花名册学号：单元格中至少 MIN_STUDENT_ID_LENGTH 位的连续数字，整串保留（不再截成 9 位）
+MIN_STUDENT_ID_LENGTH = 6
+_ROSTER_ID_RE = re.compile(rf'\d{{{MIN_STUDENT_ID_LENGTH},}}')
+# 默认并行扫描的文件夹数（扫描主要在等待磁盘/网络 I/O，线程即可）
+DEFAULT_SCAN_WORKERS = 8
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+TXT_MIME = "text/plain"
+SUMMARY_FILENAME = "未交作业名单_汇总.xlsx"
+MATRIX_FILENAME = "作业提交矩阵.xlsx"
+RESULTS_ZIP_FILENAME = "作业检查结果_总和.zip"
+# open_zip 在内存中最多保留多少字节的 ZIP，超过后转存到临时文件
+ZIP_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def _print_notify(level, message):
+    """默认的消息输出：打印到控制台"""
+    print(f"[{level}] {message}")
+
+
+# =======================================
+# 1. 学号与后缀解析
+# ========================================
+def extract_student_id_from_filename(filename):
+    """从文件名中提取前9位数字作为学号"""
+    match = re.search(r'\d{9}', filename)
+    if match:
+        return match.group()
+    return None
+
+
+def parse_extensions(ext_input):
+    """处理用户输入的后缀：分割、去空格、转小写、确保有点号"""
+    target_exts = []
+    if ext_input:
+        raw_exts = ext_input.replace('，', ',').split(',')
+        for ext in raw_exts:
+            clean_ext = ext.strip().lower()
+            if clean_ext:
+                if not clean_ext.startswith('.'):
+                    clean_ext = '.' + clean_ext
+                target_exts.append(clean_ext)
+    return target_exts
+
+
+# =======================================
+# 2. 花名册
+# ========================================
+def _read_roster_bytes(roster_file):
+    """读取花名册的原始字节（路径或文件对象均可）"""
+    if isinstance(roster_file, (str, os.PathLike)):
+        with open(roster_file, 'rb') as f:
+            return f.read()
+    if hasattr(roster_file, 'seek'):
+        roster_file.seek(0)
+    return roster_file.read()
+
+
+def _iter_sheet_rows(data):
+    """以流式只读方式逐个产出工作表 (表名, 行迭代器)，每行是单元格值的元组
+
+    .xlsx 使用 openpyxl 只读模式，.xls 使用 xlrd；按文件头判断格式，与文件名无关。
+    """
+    if data[:4] == b'PK\x03\x04':
+        from openpyxl import load_workbook
+        wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                # 只读模式按 <dimension> 标记决定读取范围，很多导出的文件这个标记不对（如只写了 A1），
+                # 与 pandas 一样先清掉，按实际内容读取
+                ws.reset_dimensions()
+                yield ws.title, ws.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    else:
+        import xlrd
+        book = xlrd.open_workbook(file_contents=data, on_demand=True)
+        try:
+            for sheet_index in range(book.nsheets):
+                sheet = book.sheet_by_index(sheet_index)
+                # xlrd 用空字符串表示空单元格，统一成 None
+                yield sheet.name, (tuple(None if v == '' else v for v in sheet.row_values(r))
+                                   for r in range(sheet.nrows))
+                book.unload_sheet(sheet_index)
+        finally:
+            book.release_resources()
+
+
+def _detect_header_row(rows):
+    """在已读取的前5行中查找包含'学号'或'姓名'的表头行，找不到返回 0"""
+    for i, row in enumerate(rows[:5]):
+        row_str = " ".join(str(v) for v in row if v is not None)
+        if '学号' in row_str or '姓名' in row_str:
+            print(f"在 Excel 第 {i + 1} 行检测到表头关键字，将以此行作为表头读取。")
+            return i
+    print("在前5行未检测到'学号'或'姓名'关键字，将默认使用第1行作为表头。")
+    return 0
+
+
+def _rows_to_frame(rows, header_index):
+    """把已读取的行转换为 DataFrame，列名规则与 pandas.read_excel 一致"""
+    width = max((len(row) for row in rows), default=0)
+    header = list(rows[header_index]) + [None] * (width - len(rows[header_index]))
+    columns = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    body = [row + (None,) * (width - len(row)) for row in rows[header_index + 1:]]
+    return pd.DataFrame(body, columns=columns, dtype=object)
+
+
+def _find_roster_columns(df):
+    """查找学号列和姓名列，返回 (学号列, 姓名列, 学号列是否为兜底的第一列)"""
+    # 查找学号列
+    student_id_col = None
+    for col in df.columns:
+        if '学号' in str(col):
+            student_id_col = col
+            break
+    if student_id_col is None:
+        # 备用策略：找包含学号样式数字串的列（规则与 _extract_roster 相同）
+        for col in df.columns:
+            sample_values = df[col].dropna().head(5)
+            if len(sample_values) > 0:
+                has_id = any(_ROSTER_ID_RE.search(_cell_to_text(v)) for v in sample_values)
+                if has_id:
+                    student_id_col = col
+                    break
+    fallback = student_id_col is None
+    if fallback:
+        student_id_col = df.columns[0]
+
+    # 查找姓名列
+    name_col = None
+    for col in df.columns:
+        if '姓名' in str(col):
+            name_col = col
+            break
+    if name_col is None:
+        if student_id_col == df.columns[0] and len(df.columns) > 1:
+            name_col = df.columns[1]
+        else:
+            col_index = list(df.columns).index(student_id_col)
+            if col_index + 1 < len(df.columns):
+                name_col = df.columns[col_index + 1]
+    return student_id_col, name_col, fallback
+
+
+def _cell_to_text(value):
+    """单元格值转文本；xlrd 会把整数读成浮点数（202400001.0），这里还原成整数"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _column_to_text(series):
+    """向量化版本的 _cell_to_text：整数值的数字转成不带小数点的文本，其余直接转字符串"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    is_integer = numbers.notna() & (numbers % 1 == 0)
+    text = series.astype(str)
+    if is_integer.any():
+        text = text.where(~is_integer, numbers[is_integer].astype('int64').astype(str))
+    return text.str.strip()
+
+
+def _extract_roster(df, student_id_col, name_col):
+    """向量化提取 学号 -> 姓名；重复学号以最后一行为准"""
+    ids_raw = df[student_id_col]
+    valid = ids_raw.notna()
+    # 学号取单元格中第一个完整的数字串（不截断，12 位学号也原样保留），短于 MIN_STUDENT_ID_LENGTH 的不算
+    ids = _column_to_text(ids_raw[valid]).str.extract(f'({_ROSTER_ID_RE.pattern})', expand=False)
+    if name_col is not None:
+        names_raw = df.loc[valid, name_col]
+        names = names_raw.astype(str).str.strip().where(names_raw.notna(), "未知")
+    else:
+        names = pd.Series("未知", index=ids.index, dtype=object)
+    matched = ids.notna()
+    return dict(zip(ids[matched].tolist(), names[matched].tolist()))
+
+
+# 按文件内容哈希缓存解析结果：同一个花名册再次处理时不需要重新解析
+_ROSTER_CACHE = OrderedDict()
+_ROSTER_CACHE_SIZE = 16
+_ROSTER_CACHE_LOCK = threading.Lock()
+
+
+def clear_roster_cache():
+    """清空花名册解析缓存"""
+    with _ROSTER_CACHE_LOCK:
+        _ROSTER_CACHE.clear()
+
+
+def _parse_roster_bytes(data, all_sheets):
+    """解析花名册字节内容，返回 (学号->姓名, 使用的列信息列表, 读取的数据行数)"""
+    student_id_to_name = {}
+    columns_used = []
+    rows_parsed = 0
+    for sheet_name, row_iter in _iter_sheet_rows(data):
+        # 只遍历一次：读出的行既用于识别表头，也用于构建数据
+        rows = list(row_iter)
+        if not rows:
+            continue
+        header_index = _detect_header_row(rows)
+        df = _rows_to_frame(rows, header_index)
+        rows_parsed += len(df)
+        if df.columns.empty:
+            continue
+        student_id_col, name_col, fallback = _find_roster_columns(df)
+        if all_sheets and fallback:
+            # 多表模式下跳过找不到学号列的工作表（如说明页）
+            print(f"工作表 {sheet_name} 中未找到学号列，已跳过。")
+            continue
+        columns_used.append((sheet_name, student_id_col, name_col, fallback))
+        student_id_to_name.update(_extract_roster(df, student_id_col, name_col))
+        if not all_sheets:
+            break
+    return student_id_to_name, columns_used, rows_parsed
+
+
+def process_roster_file(roster_file, notify=None, all_sheets=False, metrics=None):
+    """处理花名册文件，返回结构化数据
+
+    roster_file 可以是文件路径，也可以是已打开的文件对象（如 Streamlit 的 UploadedFile）。
+    默认只读取第一个工作表；all_sheets=True 时合并所有能找到学号列的工作表。
+    工作簿只以流式只读方式读取一遍，解析结果按文件内容的哈希缓存。
+    metrics (CheckMetrics) 不为空时记录解析耗时与读取的行数。
+    """
+    notify = notify or _print_notify
+    try:
+        with maybe_stage(metrics, 'roster_read'):
+            data = _read_roster_bytes(roster_file)
+        roster_hash = hashlib.sha256(data).hexdigest()
+        cache_key = (roster_hash, all_sheets)
+        with _ROSTER_CACHE_LOCK:
+            cached = _ROSTER_CACHE.get(cache_key)
+            if cached is not None:
+                _ROSTER_CACHE.move_to_end(cache_key)
+        if cached is None:
+            with maybe_stage(metrics, 'roster_parse', bytes=len(data)):
+                cached = _parse_roster_bytes(data, all_sheets)
+            with _ROSTER_CACHE_LOCK:
+                _ROSTER_CACHE[cache_key] = cached
+                while len(_ROSTER_CACHE) > _ROSTER_CACHE_SIZE:
+                    _ROSTER_CACHE.popitem(last=False)
+        else:
+            print("花名册内容未变化，使用缓存的解析结果。")
+            if metrics is not None:
+                metrics.add('roster_cache_hits')
+
+        student_id_to_name, columns_used, rows_parsed = cached
+        if metrics is not None:
+            metrics.add('roster_rows_parsed', rows_parsed)
+            metrics.add('roster_students', len(student_id_to_name))
+        if not columns_used:
+            raise ValueError("花名册中没有可读取的数据")
+        if not student_id_to_name:
+            raise ValueError(f"花名册中没有找到任何学号（至少 {MIN_STUDENT_ID_LENGTH} 位数字）")
+        for sheet_name, student_id_col, name_col, fallback in columns_used:
+            prefix = f"[{sheet_name}] " if all_sheets else ""
+            if fallback:
+                notify('warning', f"{prefix}未找到明确的'学号'列，使用第一列: {student_id_col}")
+            else:
+                notify('success', f"{prefix}使用学号列: {student_id_col}")
+            if name_col is not None:
+                notify('success', f"{prefix}使用姓名列: {name_col}")
+            else:
+                notify('warning', f"{prefix}未找到姓名列，将只显示学号")
+
+        # 返回副本，调用方修改结果不会影响缓存
+        return {
+            'student_ids': set(student_id_to_name),
+            'student_id_to_name': dict(student_id_to_name),
+            'total_students': len(student_id_to_name),
+            'roster_hash': roster_hash,
+            'all_sheets': bool(all_sheets),
+            'rows_parsed': rows_parsed
+        }
+    except Exception as e:
+        notify('error', f"读取花名册时出错: {e}")
+        return None
+
+
+# =======================================
+# 3. 作业文件夹 / 压缩包
+# ========================================
+def save_upload_to_temp(file_obj, filename, metrics=None):
+    """把上传的文件（如 ZIP 包）原样保存到新建的临时目录中，返回保存后的文件路径
+
+    ZIP 包不再解压，检查时直接读取其目录。按块复制，几 GB 的压缩包也不会整个读进内存。
+    调用方负责在用完后用 cleanup_temp_dir 删除。
+    """
+    temp_dir = tempfile.mkdtemp(prefix=TEMP_DIR_PREFIX)
+    out_path = os.path.join(temp_dir, os.path.basename(filename))
+    try:
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)  # Streamlit 的 UploadedFile 重跑后读取位置可能不在开头
+        with maybe_stage(metrics, 'upload_save', file=os.path.basename(filename)):
+            with open(out_path, 'wb') as f:
+                shutil.copyfileobj(file_obj, f, COPY_CHUNK_SIZE)
+                if metrics is not None:
+                    metrics.add('bytes_saved', f.tell())
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return out_path
+
+
+def is_temp_dir(path):
+    """判断路径是否是本工具创建的临时目录"""
+    return os.path.isdir(path) and os.path.basename(os.path.normpath(path)).startswith(TEMP_DIR_PREFIX)
+
+
+def cleanup_temp_dir(path, notify=None):
+    """删除本工具创建的临时目录，其它路径一律不动。成功返回 True
+
+    path 也可以是临时目录中保存的上传文件，此时删除其所在的临时目录。
+    """
+    notify = notify or _print_notify
+    if os.path.isfile(path):
+        path = os.path.dirname(path)
+    if not is_temp_dir(path):
+        return False
+    try:
+        shutil.rmtree(path)  # 删除文件夹及其内容
+        print(f"已清理临时目录: {path}")  # 后台打印日志
+        return True
+    except Exception as e:
+        notify('error', f"清理目录 {path} 失败: {e}")
+        return False
+
+
+def check_homework_in_folder(folder_path, roster_student_ids, target_extensions=None, check_all_types=False,
+                             notify=None, recursive=False, max_depth=None,
+                             ignore_patterns=DEFAULT_IGNORE_PATTERNS, cache=None, matcher=None,
+                             metrics=None, folder_name=None, inspector=None, files=None, name_matcher=None):
+    """
+    检查指定文件夹（或 ZIP 压缩包）中的作业文件，支持自定义后缀筛选
+
+    文件名中的学号由 matcher (StudentIdMatcher) 按花名册匹配，未提供时用 roster_student_ids 构建；
+    一个文件可以记给多个学生（小组提交），符合后缀要求却匹配不到学号的文件放在 unmatched_files 中。
+
+    ZIP 包只读取其中央目录里的文件名，不解压。
+    recursive=True 时同时查找子文件夹（max_depth 为 None 表示不限层数），
+    名称匹配 ignore_patterns 的文件/文件夹会被跳过。
+    传入 cache (SnapshotCache) 时做增量检查：只重新解析新增或改动过的文件。
+    传入 metrics (CheckMetrics) 时记录该文件夹的扫描耗时与文件数，folder_name 为记录中的名称。
+    传入 inspector (ArchiveInspector) 时打开匹配到学号的压缩包检查内容，不符合要求的
+    不算作提交，放在 rejected_files {相对路径: 原因} 中；无法检查的压缩包仍算作提交，
+    说明放在 archive_notes 中。
+    files 为预先列出的文件对象列表时不再遍历目录（批量模式下多个班级共用一次扫描）。
+    传入 name_matcher (NameMatcher) 时，文件名中没有学号的文件再按姓名查找：唯一匹配的算作提交，
+    记在 name_matched_files {相对路径: 学号} 中；有歧义的不算，候选学号放在 ambiguous_files 中。
+
+    匹配到学号的文件的 (大小, 修改时间) 放在 file_stats 中（用于迟交统计，见 deadlines.py）：
+    使用快照缓存时直接取自快照（快照刷新时本来就要 stat），ZIP 成员取自中央目录；
+    不使用快照缓存时，本地文件夹中每个匹配到的文件要多一次 stat（DirEntry.stat()，Windows 上通常不需要）。
+    """
+    notify = notify or _print_notify
+    start = time.perf_counter()
+    try:
+        files_seen = 0
+        submitted_ids = set()
+        file_type_stats = {}  # 用于统计提交的文件类型：{'.py': 10, '.docx': 2}
+        matched_files = {}  # 相对路径 -> 学号元组
+        file_stats = {}  # 相对路径 -> (大小, 修改时间)，只记录匹配到学号的文件
+        unmatched_files = []
+        rejected_files = {}  # 内容不符合要求的压缩包：相对路径 -> 原因
+        archive_notes = {}
+        name_matched_files = {}  # 按姓名匹配到的文件：相对路径 -> 学号
+        ambiguous_files = {}  # 姓名匹配有歧义的文件：相对路径 -> 候选学号列表
+        if matcher is None:
+            matcher = StudentIdMatcher(roster_student_ids)
+
+        # 1. 列出文件并匹配学号，得到 (相对路径, 小写后缀, 学号元组) 序列
+        depth = max_depth if recursive else 0
+        ignore_patterns = tuple(ignore_patterns or ())
+
+        def list_files():
+            if files is not None:
+                return iter(files)
+            return iter_source_files(folder_path, max_depth=depth, ignore_patterns=ignore_patterns)
+
+        cache_stats = None
+        if cache is not None:
+            entries, cache_stats = cache.refresh(folder_path, list_files, matcher.match,
+                                                 key_extra=(depth, ignore_patterns, matcher.token))
+            parsed_files = ((relpath, entry[2], entry[3], None, entry[:2]) for relpath, entry in entries.items())
+        else:
+            parsed_files = ((f.relpath, f.ext, matcher.match(f.name), f, None) for f in list_files())
+
+        zip_members = None
+
+        def source_file(relpath):
+            # 快照缓存中没有文件对象，需要检查压缩包内容时再按相对路径找回
+            nonlocal zip_members
+            if not is_zip_source(folder_path):
+                return LocalFile(folder_path, relpath)
+            if zip_members is None:
+                zip_members = {m.relpath: m for m in iter_zip_files(folder_path, max_depth=None, ignore_patterns=())}
+            return zip_members[relpath]
+
+        for relpath, file_ext, student_ids, file_obj, stat in parsed_files:
+            files_seen += 1
+            # 2. 判断是否符合文件类型要求
+            is_valid_type = False
+            if check_all_types:
+                is_valid_type = True
+            elif target_extensions and file_ext in target_extensions:
+                is_valid_type = True
+            if not is_valid_type:
+                continue
+
+            # 文件名中没有学号时按姓名查找（可选），有歧义时不猜测
+            if not student_ids and name_matcher is not None:
+                student_ids, candidates = name_matcher.match(relpath.rsplit('/', 1)[-1])
+                if student_ids:
+                    name_matched_files[relpath] = student_ids[0]
+                elif candidates:
+                    ambiguous_files[relpath] = list(candidates)
+
+            # 3. 压缩包提交：按里面的内容决定是否算数
+            if student_ids and inspector is not None and inspector.is_archive(relpath):
+                accepted, reason = inspector.inspect(file_obj or source_file(relpath))
+                if not accepted:
+                    rejected_files[relpath] = reason
+                    continue
+                if reason:
+                    archive_notes[relpath] = reason
+
+            # 4. 如果符合要求，计入提交名单并统计类型
+            if student_ids:
+                submitted_ids.update(student_ids)
+                matched_files[relpath] = student_ids
+                file_stats[relpath] = stat if stat is not None else (file_obj.size, file_obj.mtime)
+                # 统计该类型文件的数量
+                if file_ext in file_type_stats:
+                    file_type_stats[file_ext] += 1
+                else:
+                    file_type_stats[file_ext] = 1
+            else:
+                unmatched_files.append(relpath)
+
+        missing_ids = roster_student_ids - submitted_ids
+
+        if metrics is not None:
+            metrics.record_folder(folder_name or folder_path, time.perf_counter() - start,
+                                  files_seen=files_seen, files_matched=len(matched_files),
+                                  files_unmatched=len(unmatched_files),
+                                  files_rejected=len(rejected_files),
+                                  files_name_matched=len(name_matched_files),
+                                  files_reused=cache_stats['reused'] if cache_stats else 0)
+        return {
+            'submitted_ids': submitted_ids,
+            'missing_ids': missing_ids,
+            'submitted_count': len(submitted_ids),
+            'missing_count': len(missing_ids),
+            'file_type_stats': file_type_stats,  # 新增：返回类型统计
+            'matched_files': matched_files,
+            'file_stats': file_stats,
+            'unmatched_files': unmatched_files,
+            'rejected_files': rejected_files,
+            'archive_notes': archive_notes,
+            'name_matched_files': name_matched_files,
+            'ambiguous_files': ambiguous_files,
+            'cache_stats': cache_stats  # 增量检查时的复用情况，未使用缓存时为 None
+        }
+    except Exception as e:
+        notify('error', f"检查文件夹 {folder_path} 时出错: {e}")
+        return None
+
+
+def unique_display_names(paths):
+    """{来源路径: 显示名称}：显示名称为文件夹 / 压缩包名，重名时依次加上 " (2)"、" (3)"…
+
+    检查结果按显示名称区分，不同目录下的同名来源（a/hw1 与 b/hw1）不能互相覆盖。
+    """
+    names = {}
+    used = set()
+    for path in paths:
+        if path in names:
+            continue
+        base = os.path.basename(os.path.normpath(path))
+        name, n = base, 1
+        while name in used:
+            n += 1
+            name = f"{base} ({n})"
+        names[path] = name
+        used.add(name)
+    return names
+
+
+def run_check(roster_data, folder_paths, target_extensions=None, check_all_types=False, display_names=None,
+              notify=None, max_workers=None, progress=None, recursive=False, max_depth=None,
+              ignore_patterns=DEFAULT_IGNORE_PATTERNS, cache=None, matcher=None, metrics=None, inspector=None,
+              name_matcher=None):
+    """并行检查每个文件夹，返回 {显示名称: 检查结果}（按 folder_paths 顺序）
+
+    - max_workers: 扫描线程数，默认 DEFAULT_SCAN_WORKERS；为 1 时在调用线程中逐个扫描
+    - progress: 每完成一个文件夹回调一次 progress(已完成数, 总数, 显示名称)，在调用线程中执行
+    - recursive / max_depth / ignore_patterns / cache / matcher / inspector / name_matcher:
+      见 check_homework_in_folder；matcher 未提供时按花名册构建一次，所有文件夹共用
+    - metrics: CheckMetrics，记录总扫描耗时和每个文件夹的扫描情况
+
+    扫描在工作线程中进行，期间产生的消息先缓存，结束后再按文件夹顺序交给 notify，
+    这样 notify（例如 st.error）始终在调用线程中执行。
+    """
+    notify = notify or _print_notify
+    display_names = display_names or {}
+    if matcher is None:
+        matcher = StudentIdMatcher(roster_data['student_ids'])
+    if max_workers is None:
+        max_workers = DEFAULT_SCAN_WORKERS
+    max_workers = max(1, min(max_workers, len(folder_paths) or 1))
+
+    # 优先使用记录的名字（如 "📦 作业1.zip"），找不到才用文件夹名
+    folder_names = [display_names.get(path, os.path.basename(path)) for path in folder_paths]
+    messages = [[] for _ in folder_paths]
+    results = [None] * len(folder_paths)
+
+    def scan(index):
+        return check_homework_in_folder(
+            folder_paths[index],
+            roster_data['student_ids'],
+            target_extensions=target_extensions,
+            check_all_types=check_all_types,
+            notify=lambda level, message: messages[index].append((level, message)),
+            recursive=recursive,
+            max_depth=max_depth,
+            ignore_patterns=ignore_patterns,
+            cache=cache,
+            matcher=matcher,
+            metrics=metrics,
+            folder_name=folder_names[index],
+            inspector=inspector,
+            name_matcher=name_matcher
+        )
+
+    with maybe_stage(metrics, 'scan', folders=len(folder_paths), workers=max_workers):
+        if max_workers == 1:
+            # 单线程时不开线程池，便于 cProfile 等只统计调用线程的工具分析
+            for index in range(len(folder_paths)):
+                results[index] = scan(index)
+                if progress:
+                    progress(index + 1, len(folder_paths), folder_names[index])
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hwcheck-scan") as executor:
+                futures = {executor.submit(scan, i): i for i in range(len(folder_paths))}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    index = futures[future]
+                    results[index] = future.result()
+                    if progress:
+                        progress(done, len(folder_paths), folder_names[index])
+
+    # 按添加顺序合并结果
+    folder_results = {}
+    for folder_name, result, folder_messages in zip(folder_names, results, messages):
+        for level, message in folder_messages:
+            notify(level, message)
+        if result:
+            folder_results[folder_name] = result
+    return folder_results
+
+
+# =======================================
+# 4. 报告生成
+# ========================================
+class ReportBuilder:
+    """按需生成报告文件
+
+    图表数据和汇总名单在第一次访问时计算；每个下载文件（xlsx / txt / 汇总 / ZIP）
+    只在真正请求时才生成，生成后缓存在对象内。把对象和检查结果一起保存（例如放进
+    st.session_state），页面重跑时就不会重复生成。
+
+    结果 ZIP 逐个文件写入临时目录中的 ZIP 文件（zip_path），不在内存里保留整个压缩包；
+    不再需要时调用 cleanup() 删除。传入 workspace (Workspace) 和 session_id 时 ZIP 放在共享工作区中，
+    由该会话引用，受工作区配额和会话过期清理的约束（会话每次运行时要把 generated_paths() 报告给 touch()）。
+    """
+
+    def __init__(self, folder_results, id_map, metrics=None, deadlines=None, workspace=None, session_id=None):
+        self.folder_results = folder_results
+        self.id_map = id_map
+        self.metrics = metrics
+        self.workspace = workspace
+        self.session_id = session_id
+        self.deadlines = dict(deadlines or {})  # 作业名 -> 截止时间戳，用于迟交统计
+        self._late = None
+        self._summary = None
+        self._matrix = None
+        self._missing_table = None
+        self._missing_lists = {}
+        self._data = {}
+        self._zip_paths = {}  # 导出格式 -> 临时 ZIP 路径
+
+    def missing_list(self, folder_name):
+        """某个文件夹的未交学号，按学号排序（缓存在对象内）"""
+        if folder_name not in self._missing_lists:
+            res = self.folder_results[folder_name]
+            self._missing_lists[folder_name] = (res.missing_list() if isinstance(res, CompactResult)
+                                                else sorted(res['missing_ids']))
+        return self._missing_lists[folder_name]
+
+    @property
+    def chart_data(self):
+        if self._summary is None:
+            self._summary = [{
+                "作业文件夹": folder_name,
+                "已提交": res['submitted_count'],
+                "未提交": res['missing_count']
+            } for folder_name, res in self.folder_results.items()]
+        return self._summary
+
+    @property
+    def total_missing_all(self):
+        """汇总名单（dict 列表）；页面展示请用 missing_table"""
+        return [{"文件夹": folder_name, "学号": sid, "姓名": self.id_map.get(sid, "未知")}
+                for folder_name in self.folder_results for sid in self.missing_list(folder_name)]
+
+    @property
+    def missing_table(self):
+        """可筛选、分页的未交名单总表（MissingTable）"""
+        if self._missing_table is None:
+            self._missing_table = MissingTable.from_matrix(self.matrix, self.id_map)
+        return self._missing_table
+
+    @property
+    def matrix(self):
+        """学生 × 作业 提交矩阵，学生按花名册（id_map）顺序排列"""
+        if self._matrix is None:
+            self._matrix = SubmissionMatrix.from_results(list(self.id_map), self.folder_results)
+        return self._matrix
+
+    @property
+    def late_analysis(self):
+        """按时 / 迟交统计（见 deadlines.late_analysis）"""
+        if self._late is None:
+            with maybe_stage(self.metrics, 'late_analysis'):
+                self._late = late_analysis(self.folder_results, self.deadlines, self.id_map)
+        return self._late
+
+    @property
+    def files(self):
+        """可下载文件的清单（不含数据），汇总文件在最前"""
+        files = []
+        if any(res['missing_count'] for res in self.folder_results.values()):
+            files.append({"filename": SUMMARY_FILENAME, "mime": XLSX_MIME, "folder": "汇总数据",
+                          "kind": "summary"})
+        if self.folder_results and self.id_map:
+            files.append({"filename": MATRIX_FILENAME, "mime": XLSX_MIME, "folder": "汇总数据",
+                          "kind": "matrix"})
+        if self.deadlines and self.folder_results:
+            files.append({"filename": LATE_FILENAME, "mime": XLSX_MIME, "folder": "汇总数据", "kind": "late"})
+        for folder_name, res in self.folder_results.items():
+            if res['missing_count']:
+                files.append({"filename": f"未交名单_{folder_name}.xlsx", "mime": XLSX_MIME,
+                              "folder": folder_name, "kind": "xlsx"})
+                files.append({"filename": f"未交名单_{folder_name}.txt", "mime": TXT_MIME,
+                              "folder": folder_name, "kind": "txt"})
+        return files
+
+    def get_data(self, file_item):
+        """生成（或取出已缓存的）某个文件的字节数据，file_item 来自 files"""
+        filename = file_item['filename']
+        if filename not in self._data:
+            with maybe_stage(self.metrics, f"report_{file_item['kind']}", file=filename):
+                self._data[filename] = self._build_data(file_item)
+            if self.metrics is not None:
+                self.metrics.add('report_bytes', len(self._data[filename]))
+        return self._data[filename]
+
+    def _build_data(self, file_item):
+        # 与 ZIP / 目录导出使用同一套写出函数，逐行写入，不再经过 dict 列表和 DataFrame
+        buffer = io.BytesIO()
+        if file_item['kind'] == 'txt':
+            write_txt(buffer, self, file_item['folder'])
+        else:
+            write_xlsx(buffer, report_sheets(self, file_item))
+        return buffer.getvalue()
+
+    def write_zip(self, fileobj, fmt='xlsx'):
+        """把所有名单边生成边压缩写入 fileobj（可写的二进制文件对象），fmt 见 export.EXPORT_FORMATS"""
+        with maybe_stage(self.metrics, 'report_zip', format=fmt):
+            write_report_zip(self, fileobj, fmt)
+
+    def zip_path(self, fmt='xlsx'):
+        """把所有名单文件打包成临时目录（或工作区）中的 ZIP 文件，返回其路径（每种格式生成一次后复用）"""
+        out_path = self._zip_paths.get(fmt)
+        if out_path is not None and os.path.exists(out_path):
+            return out_path
+        # 第一次生成，或者之前的文件已被工作区淘汰
+        if self.workspace is not None:
+            out_path = self.workspace.add_file(self.session_id, RESULTS_ZIP_FILENAME,
+                                               lambda f: self.write_zip(f, fmt))
+        else:
+            temp_dir = tempfile.mkdtemp(prefix=TEMP_DIR_PREFIX)
+            out_path = os.path.join(temp_dir, RESULTS_ZIP_FILENAME)
+            try:
+                with open(out_path, 'wb') as f:
+                    self.write_zip(f, fmt)
+            except Exception:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                raise
+        self._zip_paths[fmt] = out_path
+        return out_path
+
+    def open_zip(self, fmt='xlsx'):
+        """把所有名单文件打包成 ZIP，返回从头读取的二进制文件对象（用完后关闭）
+
+        已经用 zip_path 生成过时直接打开该文件；否则写入 SpooledTemporaryFile，
+        不超过 ZIP_SPOOL_MAX_SIZE 时留在内存中，更大时自动转存到临时文件，不在内存里拼出整个压缩包。
+        """
+        out_path = self._zip_paths.get(fmt)
+        if out_path is not None and os.path.exists(out_path):
+            return open(out_path, 'rb')
+        spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_SIZE, prefix=TEMP_DIR_PREFIX)
+        try:
+            self.write_zip(spool, fmt)
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool
+
+    def generated_paths(self):
+        """zip_path 生成的文件路径列表"""
+        return list(self._zip_paths.values())
+
+    def cleanup(self):
+        """删除 zip_path 生成的临时文件（工作区中的文件在没有其他会话引用时删除）"""
+        for out_path in self._zip_paths.values():
+            if self.workspace is not None:
+                self.workspace.discard(self.session_id, out_path)
+            else:
+                cleanup_temp_dir(out_path)
+        self._zip_paths = {}
+
+
+def write_report_files(report, output_dir, as_zip=False, fmt='xlsx'):
+    """把 ReportBuilder 中的名单文件逐行写入 output_dir，返回写出的文件路径列表
+
+    fmt 为 'xlsx' / 'csv' / 'parquet'（txt 名单始终输出）。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if as_zip:
+        out_path = os.path.join(output_dir, RESULTS_ZIP_FILENAME)
+        with open(out_path, 'wb') as f:
+            report.write_zip(f, fmt)
+        return [out_path]
+    return write_report_dir(report, output_dir, fmt)
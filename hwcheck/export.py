@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+流式导出：名单文件逐行写入，不在内存中拼出整张表
+
+以前每个名单先变成 dict 列表，再变成 DataFrame、openpyxl 对象，最后变成字节，
+学生多、作业多时同一份数据在内存里存了好几份。这里的写出函数只接受行迭代器：
+
+- xlsx: openpyxl 的 write_only 模式，行写入临时 XML 后就释放；单表超过 Excel 行数上限时自动分表
+- csv: UTF-8 (带 BOM，Excel 可直接打开)
+- parquet: 需要安装可选依赖 pyarrow，按批写入
+
+write_report_zip 把 ReportBuilder 的所有名单边生成边压缩写入 ZIP，中途不落临时文件。
+"""
+import csv
+import io
+import os
+import zipfile
+
+import pandas as pd
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+# Excel 单个工作表的最大行数（含表头）
+XLSX_MAX_ROWS = 1_048_576
+_PARQUET_BATCH_ROWS = 65_536
+
+
+def write_xlsx(fileobj, sheets):
+    """把 [(表名, 表头, 行迭代器)] 写成一个工作簿，行数超过上限时拆成 "表名_2"、"表名_3"…"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        ws = None
+        part = 0
+        count = 0
+        for row in rows:
+            if ws is None or count >= XLSX_MAX_ROWS - 1:
+                part += 1
+                ws = wb.create_sheet(title if part == 1 else f"{title}_{part}"[:31])
+                ws.append(header)
+                count = 0
+            ws.append(row)
+            count += 1
+        if ws is None:
+            wb.create_sheet(title).append(header)
+    wb.save(fileobj)
+
+
+def write_csv(fileobj, header, rows):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text)
+    writer.writerow(header)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()  # 不关闭底层文件
+
+
+def write_parquet(fileobj, header, rows):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("导出 Parquet 需要安装 pyarrow")
+    writer = None
+    batch = []
+
+    def flush():
+        nonlocal writer
+        columns = list(zip(*batch)) if batch else [[] for _ in header]
+        table = pa.table({name: list(values) for name, values in zip(header, columns)})
+        if writer is None:
+            writer = pq.ParquetWriter(fileobj, table.schema)
+        writer.write_table(table)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= _PARQUET_BATCH_ROWS:
+            flush()
+    if batch or writer is None:
+        flush()
+    writer.close()
+
+
+def write_table(fileobj, fmt, sheets):
+    """按格式写出一个文件；csv / parquet 只写第一张表（多张表请分别调用）"""
+    if fmt == 'xlsx':
+        write_xlsx(fileobj, sheets)
+    elif fmt == 'csv':
+        write_csv(fileobj, *sheets[0][1:])
+    elif fmt == 'parquet':
+        write_parquet(fileobj, *sheets[0][1:])
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+# ---------- ReportBuilder 的名单表 ----------
+def report_sheets(report, file_item):
+    """某个名单文件的表格：[(表名, 表头, 行迭代器)]，行在迭代时才生成"""
+    kind = file_item['kind']
+    id_map = report.id_map
+    if kind == 'summary':
+        rows = ((folder_name, sid, id_map.get(sid, "未知"))
+                for folder_name in report.folder_results for sid in report.missing_list(folder_name))
+        return [("Sheet1", ["文件夹", "学号", "姓名"], rows)]
+    if kind == 'matrix':
+        return report.matrix.sheets(id_map)
+    if kind == 'late':
+        late = report.late_analysis
+        return [("各作业按时情况", list(late['summary'].columns), _frame_rows(late['summary'])),
+                ("提交时间明细", list(late['detail'].columns), _frame_rows(late['detail']))]
+    rows = ((sid, id_map.get(sid, "未知")) for sid in report.missing_list(file_item['folder']))
+    return [("Sheet1", ["学号", "姓名"], rows)]
+
+
+def _frame_rows(frame):
+    """DataFrame 的行（列表），缺失值（NaN / NaT）写成空单元格"""
+    for row in frame.itertuples(index=False):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def _export_names(file_item, fmt, sheets):
+    """文件在 fmt 格式下的文件名；csv / parquet 的每张表各成一个文件"""
+    stem = os.path.splitext(file_item['filename'])[0]
+    if fmt == 'xlsx':
+        return [(f"{stem}.xlsx", sheets)]
+    names = []
+    for i, sheet in enumerate(sheets):
+        suffix = "" if i == 0 else f"_{sheet[0]}"
+        names.append((f"{stem}{suffix}.{fmt}", [sheet]))
+    return names
+
+
+def write_txt(fileobj, report, folder_name):
+    """某个文件夹的 txt 未交名单（标题行 + 每行 "学号<Tab>姓名"）"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    text.write(f"未交作业名单 - {folder_name}\n")
+    text.write("=" * 30 + "\n")
+    for sid in report.missing_list(folder_name):
+        text.write(f"{sid}\t{report.id_map.get(sid, '未知')}\n")
+    text.flush()
+    text.detach()
+
+
+def iter_report_exports(report, fmt='xlsx'):
+    """产出 (文件名, 写入函数)，写入函数接受一个可写的二进制文件对象"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    for file_item in report.files:
+        if file_item['kind'] == 'txt':
+            yield file_item['filename'], lambda f, folder=file_item['folder']: write_txt(f, report, folder)
+            continue
+        for filename, sheets in _export_names(file_item, fmt, report_sheets(report, file_item)):
+            yield filename, lambda f, sheets=sheets: write_table(f, fmt, sheets)
+
+
+def write_report_zip(report, fileobj, fmt='xlsx'):
+    """把所有名单边生成边压缩写入 fileobj"""
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for filename, write in iter_report_exports(report, fmt):
+            with zip_file.open(filename, 'w') as member:
+                write(member)
+
+
+def write_report_dir(report, output_dir, fmt='xlsx'):
+    """把所有名单逐个写入 output_dir，返回写出的文件路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for filename, write in iter_report_exports(report, fmt):
+        out_path = os.path.join(output_dir, filename)
+        with open(out_path, 'wb') as f:
+            write(f)
+        written.append(out_path)
+    return written
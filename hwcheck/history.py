@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+检查历史：把花名册和每次的检查结果保存到本地 SQLite 数据库
+
+关闭浏览器后 st.session_state 中的内容就没了，下次还要重新解析花名册、重新扫描所有文件夹。
+这里把它们按花名册分组存起来。同一个 Excel 文件只读第一个工作表和合并所有工作表得到的是不同的学生名单，
+所以花名册键（roster_key）是文件内容哈希，all_sheets=True 时再加上 "-all" 后缀
+（表中的 roster_hash 列保存的就是这个键，旧数据库中的记录都是只读第一个工作表的，不需要迁移）：
+
+- rosters / roster_students: 花名册及其学生（保留花名册顺序）
+- assignments: 每个作业文件夹最近一次的检查结果（同一花名册下按显示名称唯一）
+- submission_status: 每个学生在每份作业中的提交状态，按 (学号, 是否提交) 建索引
+- submission_files: 匹配到学号的文件，按学号建索引
+
+重新打开课程时直接载入花名册和之前各周的结果；"某学生本学期所有缺交作业"这类查询
+走索引，不需要重新计算。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认数据库位置，可用环境变量 HWCHECK_HISTORY 覆盖
+DEFAULT_HISTORY_PATH = os.environ.get("HWCHECK_HISTORY") or os.path.join(
+    os.path.expanduser("~"), ".hwcheck", "history.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rosters (
+    roster_hash TEXT PRIMARY KEY,
+    name TEXT,
+    total_students INTEGER NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS roster_students (
+    roster_hash TEXT NOT NULL REFERENCES rosters(roster_hash) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (roster_hash, student_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_roster_students_student ON roster_students(student_id);
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    roster_hash TEXT NOT NULL REFERENCES rosters(roster_hash) ON DELETE CASCADE,
+    folder_name TEXT NOT NULL,
+    source TEXT,
+    checked_at REAL NOT NULL,
+    submitted_count INTEGER NOT NULL,
+    missing_count INTEGER NOT NULL,
+    file_type_stats TEXT,
+    unmatched_files TEXT,
+    UNIQUE (roster_hash, folder_name)
+);
+CREATE TABLE IF NOT EXISTS submission_status (
+    assignment_id INTEGER NOT NULL REFERENCES assignments(id) ON DELETE CASCADE,
+    student_id TEXT NOT NULL,
+    submitted INTEGER NOT NULL,
+    PRIMARY KEY (assignment_id, student_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_status_student ON submission_status(student_id, submitted);
+CREATE TABLE IF NOT EXISTS submission_files (
+    assignment_id INTEGER NOT NULL REFERENCES assignments(id) ON DELETE CASCADE,
+    relpath TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    PRIMARY KEY (assignment_id, relpath, student_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_files_student ON submission_files(student_id);
+"""
+
+
+_ALL_SHEETS_SUFFIX = "-all"
+
+
+def roster_key(roster_data):
+    """花名册在历史数据库中的键：文件内容哈希，合并所有工作表时加上 "-all" 后缀"""
+    return roster_data['roster_hash'] + (_ALL_SHEETS_SUFFIX if roster_data.get('all_sheets') else "")
+
+
+def _split_key(key):
+    """花名册键 -> (文件内容哈希, all_sheets)"""
+    if key.endswith(_ALL_SHEETS_SUFFIX):
+        return key[:-len(_ALL_SHEETS_SUFFIX)], True
+    return key, False
+
+
+def _write_roster(conn, roster_data, name=None):
+    roster_hash = roster_key(roster_data)
+    id_map = roster_data['student_id_to_name']
+    conn.execute(
+        "INSERT INTO rosters (roster_hash, name, total_students, saved_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(roster_hash) DO UPDATE SET name = COALESCE(excluded.name, rosters.name), "
+        "total_students = excluded.total_students, saved_at = excluded.saved_at",
+        (roster_hash, name, len(id_map), time.time()))
+    conn.execute("DELETE FROM roster_students WHERE roster_hash = ?", (roster_hash,))
+    conn.executemany(
+        "INSERT INTO roster_students (roster_hash, position, student_id, name) VALUES (?, ?, ?, ?)",
+        ((roster_hash, i, sid, student_name) for i, (sid, student_name) in enumerate(id_map.items())))
+
+
+class HistoryStore:
+    """SQLite 检查历史，线程安全（同一个连接，加锁串行访问）"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute("PRAGMA foreign_keys = ON")
+            if path != ":memory:":
+                conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            with self._conn:  # 正常结束时提交，出错时回滚
+                yield self._conn
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 花名册 ----------
+    def save_roster(self, roster_data, name=None):
+        """保存 process_roster_file 的结果（已存在时更新名称和学生），返回花名册键"""
+        with self._transaction() as conn:
+            _write_roster(conn, roster_data, name)
+        return roster_key(roster_data)
+
+    def list_rosters(self):
+        """已保存的花名册，最近保存的在前；roster_key 用于其余方法的查询"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.roster_hash, r.name, r.total_students, r.saved_at, COUNT(a.id) "
+                "FROM rosters r LEFT JOIN assignments a ON a.roster_hash = r.roster_hash "
+                "GROUP BY r.roster_hash ORDER BY r.saved_at DESC").fetchall()
+        return [{'roster_key': k, 'roster_hash': _split_key(k)[0], 'all_sheets': _split_key(k)[1], 'name': n,
+                 'total_students': t, 'saved_at': s, 'assignments': c}
+                for k, n, t, s, c in rows]
+
+    def load_roster(self, roster_key=None):
+        """载入花名册（默认最近保存的一份），返回与 process_roster_file 相同结构的字典，不存在时返回 None"""
+        with self._lock:
+            if roster_key is None:
+                row = self._conn.execute(
+                    "SELECT roster_hash FROM rosters ORDER BY saved_at DESC LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                roster_key = row[0]
+            rows = self._conn.execute(
+                "SELECT student_id, name FROM roster_students WHERE roster_hash = ? ORDER BY position",
+                (roster_key,)).fetchall()
+        if not rows:
+            return None
+        student_id_to_name = dict(rows)
+        roster_hash, all_sheets = _split_key(roster_key)
+        return {
+            'student_ids': set(student_id_to_name),
+            'student_id_to_name': student_id_to_name,
+            'total_students': len(student_id_to_name),
+            'roster_hash': roster_hash,
+            'all_sheets': all_sheets,
+            'rows_parsed': 0  # 没有重新解析 Excel
+        }
+
+    def delete_roster(self, roster_key):
+        """删除花名册及其所有检查结果"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rosters WHERE roster_hash = ?", (roster_key,))
+
+    # ---------- 检查结果 ----------
+    def save_results(self, roster_data, folder_results, sources=None):
+        """保存 run_check 的结果，同名作业覆盖之前的记录
+
+        sources 为 {显示名称: 来源路径}，只用于记录。花名册尚未保存时会先保存。
+        """
+        roster_hash = roster_key(roster_data)
+        sources = sources or {}
+        now = time.time()
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM rosters WHERE roster_hash = ?", (roster_hash,)).fetchone() is None:
+                _write_roster(conn, roster_data)
+            for folder_name, res in folder_results.items():
+                # 删除旧记录（级联删除其提交状态和文件）再插入
+                conn.execute("DELETE FROM assignments WHERE roster_hash = ? AND folder_name = ?",
+                             (roster_hash, folder_name))
+                cursor = conn.execute(
+                    "INSERT INTO assignments (roster_hash, folder_name, source, checked_at, submitted_count, "
+                    "missing_count, file_type_stats, unmatched_files) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (roster_hash, folder_name, sources.get(folder_name), now, res['submitted_count'],
+                     res['missing_count'], json.dumps(res['file_type_stats'], ensure_ascii=False),
+                     json.dumps(res['unmatched_files'], ensure_ascii=False)))
+                assignment_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO submission_status (assignment_id, student_id, submitted) VALUES (?, ?, ?)",
+                    [(assignment_id, sid, 1) for sid in res['submitted_ids']]
+                    + [(assignment_id, sid, 0) for sid in res['missing_ids']])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO submission_files (assignment_id, relpath, student_id) VALUES (?, ?, ?)",
+                    ((assignment_id, relpath, sid)
+                     for relpath, student_ids in res['matched_files'].items() for sid in student_ids))
+
+    def list_assignments(self, roster_key):
+        """某花名册下保存的作业，按检查时间排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT folder_name, source, checked_at, submitted_count, missing_count FROM assignments "
+                "WHERE roster_hash = ? ORDER BY checked_at, id", (roster_key,)).fetchall()
+        return [{'folder_name': f, 'source': s, 'checked_at': t, 'submitted_count': sc, 'missing_count': mc}
+                for f, s, t, sc, mc in rows]
+
+    def load_results(self, roster_key, folders=None):
+        """载入保存的检查结果，返回与 run_check 相同结构的 {显示名称: 检查结果}
+
+        folders 不为空时只载入这些作业。cache_stats 固定为 None。
+        """
+        results = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, folder_name, file_type_stats, unmatched_files FROM assignments "
+                "WHERE roster_hash = ? ORDER BY checked_at, id", (roster_key,)).fetchall()
+            for assignment_id, folder_name, type_stats, unmatched in rows:
+                if folders is not None and folder_name not in folders:
+                    continue
+                submitted_ids, missing_ids = set(), set()
+                for sid, submitted in self._conn.execute(
+                        "SELECT student_id, submitted FROM submission_status WHERE assignment_id = ?",
+                        (assignment_id,)):
+                    (submitted_ids if submitted else missing_ids).add(sid)
+                matched_files = {}
+                for relpath, sid in self._conn.execute(
+                        "SELECT relpath, student_id FROM submission_files WHERE assignment_id = ?",
+                        (assignment_id,)):
+                    matched_files[relpath] = matched_files.get(relpath, ()) + (sid,)
+                results[folder_name] = {
+                    'submitted_ids': submitted_ids,
+                    'missing_ids': missing_ids,
+                    'submitted_count': len(submitted_ids),
+                    'missing_count': len(missing_ids),
+                    'file_type_stats': json.loads(type_stats or '{}'),
+                    'matched_files': matched_files,
+                    'unmatched_files': json.loads(unmatched or '[]'),
+                    'cache_stats': None
+                }
+        return results
+
+    # ---------- 查询 ----------
+    def missing_for_student(self, student_id, roster_key=None, since=None):
+        """某学生所有缺交的作业（可限定花名册和起始时间），按检查时间排列"""
+        sql = ("SELECT a.folder_name, a.checked_at, a.roster_hash, r.name FROM submission_status s "
+               "JOIN assignments a ON a.id = s.assignment_id JOIN rosters r ON r.roster_hash = a.roster_hash "
+               "WHERE s.student_id = ? AND s.submitted = 0")
+        params = [student_id]
+        if roster_key is not None:
+            sql += " AND a.roster_hash = ?"
+            params.append(roster_key)
+        if since is not None:
+            sql += " AND a.checked_at >= ?"
+            params.append(since)
+        sql += " ORDER BY a.checked_at, a.id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{'folder_name': f, 'checked_at': t, 'roster_key': k, 'roster_name': n} for f, t, k, n in rows]
+
+    def files_for_student(self, student_id, roster_key=None):
+        """某学生被匹配到的所有文件：[(作业名称, 相对路径)]"""
+        sql = ("SELECT a.folder_name, f.relpath FROM submission_files f JOIN assignments a ON a.id = f.assignment_id "
+               "WHERE f.student_id = ?")
+        params = [student_id]
+        if roster_key is not None:
+            sql += " AND a.roster_hash = ?"
+            params.append(roster_key)
+        with self._lock:
+            return self._conn.execute(sql + " ORDER BY a.checked_at, a.id, f.relpath", params).fetchall()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+按花名册匹配文件名中的学号
+
+旧做法取文件名中第一个连续9位数字，遇到 "20240315_123456789_作业.py" 或更长的数字串就会匹配错，
+而且一个文件最多只能算给一个学生。这里对每个文件名只扫描一次，取出所有连续数字串，
+到花名册学号的哈希集合里查找：
+
+1. 数字串本身就是花名册中的学号 -> 直接记给该学生（可以有多个，即小组合作提交）；
+2. 一个都没有时，再在比学号长的数字串里按学号长度滑动查找（例如学号后面紧跟了序号），
+   只有找到唯一一个学号时才采用，否则视为无法匹配。
+
+都找不到的文件作为"未匹配文件"返回给调用方。
+
+NameMatcher 是可选的后备：文件名里没有学号（如 "张三_实验二.py"）时按花名册姓名查找，
+见该类的说明。
+"""
+import hashlib
+import re
+from collections import defaultdict
+
+_DIGIT_RUN = re.compile(r'\d+')
+_CJK_RUN = re.compile(r'[\u3400-\u9fff]+')
+_NON_LETTER = re.compile(r'[^a-z]+')
+# 文件名中的拉丁字母单词：按非字母字符和大小写切分（"ZhangSan_hw" -> Zhang / San / hw）
+_LATIN_WORD = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+')
+# 拉丁字母 / 拼音姓名至少要这么长才参与匹配，太短的（如 "li"）几乎总会误中
+MIN_LATIN_NAME_LENGTH = 4
+
+
+class StudentIdMatcher:
+    """基于花名册学号集合的文件名匹配器，构建一次后可在多个文件夹、多个线程间共用"""
+
+    def __init__(self, student_ids):
+        self.student_ids = frozenset(student_ids)
+        self.id_lengths = sorted({len(sid) for sid in self.student_ids})
+        # 花名册指纹，用于区分不同花名册下的缓存结果
+        digest = hashlib.sha1()
+        for sid in sorted(self.student_ids):
+            digest.update(sid.encode('ascii', 'replace'))
+            digest.update(b',')
+        self.token = digest.hexdigest()
+
+    def match(self, filename):
+        """返回文件名对应的花名册学号元组（按出现顺序、去重），无法匹配时返回空元组"""
+        runs = _DIGIT_RUN.findall(filename)
+        if not runs:
+            return ()
+        ids = self.student_ids
+        found = []
+        for run in runs:
+            if run in ids and run not in found:
+                found.append(run)
+        if found:
+            return tuple(found)
+
+        # 数字串比学号长：在其中查找唯一的花名册学号
+        candidates = set()
+        for run in runs:
+            for length in self.id_lengths:
+                if len(run) <= length:
+                    break
+                for start in range(len(run) - length + 1):
+                    piece = run[start:start + length]
+                    if piece in ids:
+                        candidates.add(piece)
+        if len(candidates) == 1:
+            return (candidates.pop(),)
+        return ()
+
+    __call__ = match
+
+
+class NameMatcher:
+    """按花名册姓名匹配文件名，用于文件名中没有学号的文件；构建一次后可在多个线程间共用
+
+    每个姓名生成若干"键"：汉字部分（至少 2 个字）、拉丁字母部分（英文名），以及安装了可选依赖
+    pypinyin 时汉字的全拼（"张三" -> "zhangsan"）。键按开头的 2 个汉字 / 3 个字母建索引，
+    匹配时逐个扫描文件名中的每段连续汉字，以及拉丁字母单词连起来的字符串，每个位置只检查以该片段开头的键，
+    几千个文件、几万个姓名也只需要很少的比较。
+
+    匹配不跨越分隔符：汉字键只在同一段连续汉字内查找（"实验二_张三" 中 "二张" 不算）；
+    拉丁字母 / 拼音键必须正好由若干个完整单词组成（"zhang_san"、"ZhangSan" 能匹配 "zhangsan"，
+    "declination" 中的 "lina" 不算）。
+
+    多个键重叠时只保留最长的（"张三丰" 不会同时算作 "张三"）；最后对应到唯一一个学生才算匹配，
+    重名、同音或文件名中出现了多个学生的姓名时不猜测，作为有歧义的候选返回。
+    """
+
+    def __init__(self, student_id_to_name, use_pinyin=True):
+        self._pinyin = None
+        if use_pinyin:
+            try:
+                from pypinyin import lazy_pinyin
+                self._pinyin = lazy_pinyin
+            except ImportError:
+                pass
+        keys = defaultdict(set)  # 键 -> 学号集合（重名 / 同音时有多个）
+        for sid, name in student_id_to_name.items():
+            for key in self._name_keys(name):
+                keys[key].add(sid)
+        self._keys = {key: tuple(sorted(ids)) for key, ids in keys.items()}
+        self._index = defaultdict(list)  # 键开头的片段 -> 键列表
+        for key in self._keys:
+            self._index[key[:_prefix_length(key)]].append(key)
+
+    @property
+    def pinyin_enabled(self):
+        return self._pinyin is not None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _name_keys(self, name):
+        name = str(name or '').strip()
+        cjk = ''.join(_CJK_RUN.findall(name))
+        keys = []
+        if len(cjk) >= 2:
+            keys.append(cjk)
+            if self._pinyin is not None:
+                keys.append(''.join(self._pinyin(cjk)).lower())
+        keys.append(_NON_LETTER.sub('', name.lower()))
+        return [key for key in keys if len(key) >= (2 if _is_cjk(key) else MIN_LATIN_NAME_LENGTH)]
+
+    def _find(self, text, found, offset=0, boundaries=None):
+        """在 text 中查找所有键，把 (起点, 终点, 键) 加入 found（位置加上 offset）
+
+        boundaries 不为 None 时键的起点和终点都必须在其中（单词边界）。
+        """
+        for start in range(len(text)):
+            if boundaries is not None and start not in boundaries:
+                continue
+            for step in (2, 3):
+                for key in self._index.get(text[start:start + step], ()):
+                    end = start + len(key)
+                    if text.startswith(key, start) and (boundaries is None or end in boundaries):
+                        found.append((offset + start, offset + end, key))
+
+    def _search_texts(self, stem):
+        """文件名中要查找的部分：[(文本, 在文件名中的起点, 单词边界)]"""
+        texts = [(m.group(), m.start(), None) for m in _CJK_RUN.finditer(stem)]
+        words = _LATIN_WORD.findall(stem)
+        if words:
+            boundaries = {0}
+            position = 0
+            for word in words:
+                position += len(word)
+                boundaries.add(position)
+            # 字母部分的位置与汉字部分不重叠
+            texts.append((''.join(words).lower(), len(stem), boundaries))
+        return texts
+
+    def match(self, filename):
+        """返回 (学号元组, 候选学号元组)
+
+        唯一匹配时学号元组只有一个学号、候选为空；有歧义时学号元组为空、候选为所有可能的学号；
+        找不到任何姓名时两者都为空。文件后缀不参与匹配。
+        """
+        stem = filename.rsplit('.', 1)[0] if '.' in filename else filename
+        found = []
+        for text, offset, boundaries in self._search_texts(stem):
+            self._find(text, found, offset, boundaries)
+        # 最长的优先，被已保留的键完全覆盖的较短键丢弃
+        kept = []
+        spans = []
+        for start, end, key in sorted(found, key=lambda item: item[0] - item[1]):
+            if not any(s <= start and end <= e for s, e in spans):
+                spans.append((start, end))
+                kept.append(key)
+        candidates = sorted({sid for key in kept for sid in self._keys[key]})
+        if len(candidates) == 1:
+            return tuple(candidates), ()
+        return (), tuple(candidates)
+
+    __call__ = match
+
+
+def _is_cjk(text):
+    return bool(_CJK_RUN.fullmatch(text))
+
+
+def _prefix_length(key):
+    return 2 if _is_cjk(key) else 3
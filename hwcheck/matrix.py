@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+学生 × 作业 提交矩阵
+
+行按花名册顺序排列学生，列按添加顺序排列作业文件夹，值为是否已提交（NumPy 布尔数组）。
+每个学生的缺交次数、每份作业的提交率、"缺交 N 次及以上"名单以及排序筛选都直接在数组上计算，
+不再逐个文件夹遍历 Python 集合。
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .compact import CompactResult
+from .export import write_xlsx
+
+SUBMITTED_MARK = "已交"
+MISSING_MARK = "未交"
+
+
+class SubmissionMatrix:
+    """学生 × 作业 的布尔提交矩阵"""
+
+    def __init__(self, student_ids, folder_names, submitted):
+        self.student_ids = list(student_ids)
+        self.folder_names = list(folder_names)
+        self.submitted = np.asarray(submitted, dtype=bool)
+        if self.submitted.shape != (len(self.student_ids), len(self.folder_names)):
+            raise ValueError("提交矩阵的形状与学生数 / 作业数不一致")
+
+    @classmethod
+    def from_results(cls, student_ids, folder_results):
+        """由花名册学号（按花名册顺序）和 run_check 的结果构建矩阵
+
+        文件夹中出现但不在花名册里的学号会被忽略。
+        学号顺序相同的 CompactResult 直接展开位图，不经过学号集合。
+        """
+        student_ids = list(student_ids)
+        position = None
+        same_order = {}  # RosterIndex -> 学号顺序是否与 student_ids 相同
+        folder_names = list(folder_results)
+        submitted = np.zeros((len(student_ids), len(folder_names)), dtype=bool)
+        for j, folder_name in enumerate(folder_names):
+            res = folder_results[folder_name]
+            if isinstance(res, CompactResult):
+                if res.index not in same_order:
+                    same_order[res.index] = list(res.index.student_ids) == student_ids
+                if same_order[res.index]:
+                    submitted[:, j] = res.mask()
+                    continue
+            if position is None:
+                position = {sid: i for i, sid in enumerate(student_ids)}
+            rows = np.fromiter((position[sid] for sid in res['submitted_ids'] if sid in position), dtype=np.intp)
+            submitted[rows, j] = True
+        return cls(student_ids, folder_names, submitted)
+
+    @property
+    def shape(self):
+        return self.submitted.shape
+
+    def missing_counts(self):
+        """每个学生的缺交次数"""
+        return (~self.submitted).sum(axis=1)
+
+    def submission_counts(self):
+        """每份作业的提交人数"""
+        return self.submitted.sum(axis=0)
+
+    def submission_rates(self):
+        """每份作业的提交率（0~1），花名册为空时为 0"""
+        if not self.student_ids:
+            return np.zeros(len(self.folder_names))
+        return self.submitted.mean(axis=0)
+
+    def students_missing_at_least(self, min_missing):
+        """缺交次数不少于 min_missing 的学生的行号，按缺交次数从多到少排列"""
+        counts = self.missing_counts()
+        rows = np.flatnonzero(counts >= min_missing)
+        # 稳定排序，缺交次数相同时保持花名册顺序
+        return rows[np.argsort(-counts[rows], kind='stable')]
+
+    def to_frame(self, id_map, min_missing=0, folders=None, sort_by_missing=True):
+        """转换为宽表：学号、姓名、缺交次数，每份作业一列
+
+        - min_missing: 只保留缺交次数不少于该值的学生
+        - folders: 只显示这些作业列（缺交次数也只按这些列计算），默认全部
+        - sort_by_missing: 按缺交次数从多到少排序，否则保持花名册顺序
+        """
+        columns = list(range(len(self.folder_names)))
+        if folders is not None:
+            wanted = set(folders)
+            columns = [j for j, name in enumerate(self.folder_names) if name in wanted]
+        sub = self.submitted[:, columns]
+        counts = (~sub).sum(axis=1)
+        rows = np.flatnonzero(counts >= min_missing)
+        if sort_by_missing:
+            rows = rows[np.argsort(-counts[rows], kind='stable')]
+
+        ids = [self.student_ids[i] for i in rows]
+        data = {
+            "学号": ids,
+            "姓名": [id_map.get(sid, "未知") for sid in ids],
+            "缺交次数": counts[rows],
+        }
+        marks = np.where(sub[rows], SUBMITTED_MARK, MISSING_MARK)
+        for k, j in enumerate(columns):
+            data[self.folder_names[j]] = marks[:, k]
+        return pd.DataFrame(data)
+
+    def rates_frame(self):
+        """每份作业的提交人数与提交率"""
+        return pd.DataFrame({
+            "作业文件夹": self.folder_names,
+            "已提交": self.submission_counts(),
+            "未提交": len(self.student_ids) - self.submission_counts(),
+            "提交率": np.round(self.submission_rates(), 4),
+        })
+
+    def sheets(self, id_map):
+        """导出用的表格 [(表名, 表头, 行迭代器)]：提交矩阵（花名册顺序）+ 各作业提交率，行在迭代时才生成"""
+        missing_counts = self.missing_counts()
+
+        def matrix_rows():
+            for i, sid in enumerate(self.student_ids):
+                yield ([sid, id_map.get(sid, "未知"), int(missing_counts[i])]
+                       + [SUBMITTED_MARK if done else MISSING_MARK for done in self.submitted[i]])
+
+        rates = self.rates_frame()
+        return [
+            ("提交矩阵", ["学号", "姓名", "缺交次数"] + self.folder_names, matrix_rows()),
+            ("各作业提交率", list(rates.columns), (list(row) for row in rates.itertuples(index=False))),
+        ]
+
+    def to_excel_bytes(self, id_map):
+        """导出为一个工作簿：提交矩阵（学生为行、作业为列）+ 各作业提交率（逐行写入，见 export.write_xlsx）"""
+        excel_buffer = io.BytesIO()
+        write_xlsx(excel_buffer, self.sheets(id_map))
+        return excel_buffer.getvalue()
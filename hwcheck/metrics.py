@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+检查过程的计时与计数
+
+各阶段（花名册解析、文件夹扫描、上传保存 / 解压、报告生成）把耗时和计数记到 CheckMetrics 里，
+同时以一行 JSON 的形式写到 logging 的 "hwcheck.metrics" 日志器，便于日志系统收集。
+Streamlit 页面的性能面板和命令行的 --metrics 都读取同一个对象。
+
+需要更细的分析时，可以用 profile_call 在 cProfile 下运行一次检查。
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger("hwcheck.metrics")
+
+
+class CheckMetrics:
+    """一次检查的阶段耗时、计数和每个文件夹的扫描情况（线程安全）"""
+
+    def __init__(self):
+        self.stages = OrderedDict()  # 阶段名 -> 累计秒数
+        self.counters = OrderedDict()  # 计数名 -> 数值
+        self.folders = []  # 每个文件夹一条 {'folder', 'seconds', ...}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """计时一个阶段，结束时累加耗时并输出一行 JSON 日志"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+            log_event("stage", stage=name, seconds=round(seconds, 6), **fields)
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def record_folder(self, folder, seconds, **counts):
+        """记录一个文件夹的扫描耗时和计数，并累加到总计数中"""
+        entry = {'folder': folder, 'seconds': round(seconds, 6)}
+        entry.update(counts)
+        with self._lock:
+            self.folders.append(entry)
+            for key, value in counts.items():
+                if isinstance(value, (int, float)):
+                    self.counters[key] = self.counters.get(key, 0) + value
+        log_event("folder_scan", **entry)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'folders': list(self.folders),
+            }
+
+
+def log_event(event, **fields):
+    """输出一行结构化 JSON 日志"""
+    if logger.isEnabledFor(logging.INFO):
+        record = {'event': event, 'ts': round(time.time(), 3)}
+        record.update(fields)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def maybe_stage(metrics, name, **fields):
+    """metrics 为 None 时什么也不做，便于在可选插桩的地方统一写法"""
+    if metrics is None:
+        yield
+    else:
+        with metrics.stage(name, **fields):
+            yield
+
+
+def enable_json_logging(stream=None):
+    """把 hwcheck.metrics 的 JSON 日志输出到 stream（默认 stderr），每条一行"""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+
+def profile_call(func, *args, output=None, top=30, **kwargs):
+    """在 cProfile 下调用 func，返回 (返回值, 按累计耗时排序的前 top 行统计文本)
+
+    output 不为空时同时把原始统计数据写入该文件，可用 snakeviz / pstats 查看。
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    if output:
+        profiler.dump_stats(output)
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(top)
+    return result, buffer.getvalue()
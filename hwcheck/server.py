@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP JSON 接口，供教务系统 / LMS 脚本调用，不用再去解析 Streamlit 页面
+
+只用标准库的 ThreadingHTTPServer（每个请求一个线程），检查逻辑与页面、命令行相同。
+除上传文件外，请求体和响应都是 JSON:
+
+    GET    /health
+    GET    /rosters                    已登记的花名册
+    POST   /rosters                    {"path": "花名册.xlsx", "all_sheets": false, "name": "1班"}
+                                       或上传: POST /rosters?filename=1班.xlsx&name=1班，请求体为文件内容
+    GET    /rosters/<roster_id>        学生名单
+    GET    /sources                    已登记的作业来源
+    POST   /sources                    {"path": "D:/作业/第3周"}（文件夹或 .zip）
+                                       或上传 ZIP: POST /sources?filename=第3周.zip，请求体为文件内容
+    DELETE /sources/<source_id>
+    POST   /check                      {"roster_id": "...", "sources": ["source_id", ...], "extensions": ".py,.zip",
+                                        "all_types": false, "recursive": false, "max_depth": null, "ignore": "...",
+                                        "deadlines": {"第3周": "2024-10-01 23:59"}, "match_names": false}
+    POST   /batch                      {"checks": [与 /check 相同的对象, ...]}，各项并行执行，单项出错不影响其他项
+
+- 花名册按内容登记（roster_id 由内容哈希得到），同一个文件重复登记不会重复解析；
+- 所有检查共用一个 SnapshotCache，重复检查同一来源时只处理新增或改动过的文件；
+- 上传的 ZIP 保存在 Workspace 中（按内容去重、受配额限制），删除来源时释放。
+
+默认只监听 127.0.0.1。登记本地路径相当于允许调用方列出服务器上的文件名，不要监听公网地址；
+设置 token 后每个请求都要带 "Authorization: Bearer <token>"。
+"""
+import hashlib
+import hmac
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import SnapshotCache
+from .deadlines import STATUS_LATE, late_analysis, parse_deadline
+from .engine import DEFAULT_EXTENSIONS, parse_extensions, process_roster_file, run_check
+from .matcher import NameMatcher
+from .metrics import log_event
+from .sources import DEFAULT_IGNORE_PATTERNS, is_zip_source, parse_ignore_patterns
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# JSON 请求体与上传花名册的大小上限（上传的 ZIP 只受 Workspace 配额限制）
+MAX_JSON_BYTES = 10 * 1024 * 1024
+MAX_ROSTER_BYTES = 50 * 1024 * 1024
+# /batch 中同时执行的检查数
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+class ApiError(Exception):
+    """带 HTTP 状态码的接口错误，响应为 {"error": 说明}"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- 请求参数校验：类型不对时返回 400，不让错误参数进入检查流程 ----------
+def _field(body, key, types, description):
+    """取出可选字段，不是 None 也不是 types 类型时抛出 ApiError（true / false 不算整数）"""
+    value = body.get(key)
+    if value is None:
+        return None
+    types = types if isinstance(types, tuple) else (types,)
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{key} 必须是{description}")
+    return value
+
+
+def _string_list(body, key, allow_string=False):
+    """字符串数组（allow_string=True 时也可以是逗号分隔的字符串）"""
+    description = "字符串或字符串数组" if allow_string else "字符串数组"
+    value = _field(body, key, (str, list) if allow_string else list, description)
+    if isinstance(value, list) and not all(isinstance(item, str) for item in value):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{key} 必须是{description}")
+    return value
+
+
+def _validate_spec(spec):
+    """检查 /check（及 /batch 中每一项）的参数类型"""
+    if not isinstance(spec, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "检查参数必须是 JSON 对象")
+    _field(spec, 'roster_id', str, "字符串")
+    _string_list(spec, 'sources')
+    _string_list(spec, 'extensions', allow_string=True)
+    _string_list(spec, 'ignore', allow_string=True)
+    max_depth = _field(spec, 'max_depth', int, "非负整数或 null")
+    if max_depth is not None and max_depth < 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "max_depth 必须是非负整数或 null")
+    deadlines = _field(spec, 'deadlines', dict, "对象（作业名 -> 截止时间）")
+    if deadlines and not all(isinstance(text, str) for text in deadlines.values()):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "deadlines 中的截止时间必须是字符串")
+
+
+class _BodyReader:
+    """只读 Content-Length 个字节的请求体，读完后返回 b''（否则会一直等待连接上的下一个请求）"""
+
+    def __init__(self, rfile, length):
+        self._rfile = rfile
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self._rfile.read(size)
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+
+class CheckService:
+    """接口背后的状态：已登记的花名册、作业来源和共用的快照缓存，线程安全"""
+
+    def __init__(self, workspace=None, cache=None, max_workers=None, batch_concurrency=DEFAULT_BATCH_CONCURRENCY):
+        self.cache = cache if cache is not None else SnapshotCache()
+        self.max_workers = max_workers
+        self.batch_concurrency = batch_concurrency
+        self._workspace = workspace
+        self._session = f"api-{uuid.uuid4().hex}"  # 在 Workspace 中标识本服务
+        self._rosters = {}  # roster_id -> {'name', 'all_sheets', 'data', 'registered_at'}
+        self._sources = {}  # source_id -> {'name', 'path', 'kind', 'uploaded', 'registered_at'}
+        self._lock = threading.Lock()
+
+    @property
+    def workspace(self):
+        with self._lock:
+            if self._workspace is None:
+                from .workspace import Workspace
+                self._workspace = Workspace()
+            return self._workspace
+
+    def _touch_workspace(self):
+        """让 Workspace 知道本服务仍在使用上传的 ZIP，不会因会话过期被清理"""
+        if self._workspace is not None:
+            with self._lock:
+                paths = [s['path'] for s in self._sources.values() if s['uploaded']]
+            self._workspace.touch(self._session, paths)
+
+    # ---------- 花名册 ----------
+    def register_roster(self, roster_file, name=None, all_sheets=False):
+        """解析并登记花名册（路径或文件对象），返回花名册概要"""
+        messages = []
+        roster_data = process_roster_file(roster_file, all_sheets=all_sheets,
+                                          notify=lambda level, message: messages.append((level, message)))
+        if not roster_data:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "；".join(m for level, m in messages if level == 'error')
+                           or "花名册读取失败")
+        roster_id = roster_data['roster_hash'][:16] + ("-all" if all_sheets else "")
+        with self._lock:
+            entry = self._rosters.get(roster_id)
+            if entry is None:
+                entry = self._rosters[roster_id] = {'name': name, 'all_sheets': all_sheets, 'data': roster_data,
+                                                    'registered_at': time.time()}
+            elif name:
+                entry['name'] = name
+        summary = self._roster_summary(roster_id, entry)
+        summary['messages'] = [{'level': level, 'message': m} for level, m in messages]
+        return summary
+
+    @staticmethod
+    def _roster_summary(roster_id, entry):
+        return {'roster_id': roster_id, 'name': entry['name'], 'all_sheets': entry['all_sheets'],
+                'total_students': entry['data']['total_students'], 'registered_at': entry['registered_at']}
+
+    def list_rosters(self):
+        with self._lock:
+            return [self._roster_summary(roster_id, entry) for roster_id, entry in self._rosters.items()]
+
+    def roster(self, roster_id):
+        with self._lock:
+            entry = self._rosters.get(roster_id)
+        if entry is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"没有登记花名册 {roster_id}")
+        return entry
+
+    # ---------- 作业来源 ----------
+    def register_source(self, path=None, upload=None, filename=None):
+        """登记本地文件夹 / ZIP（path），或保存上传的 ZIP（upload 为可读的文件对象），返回来源信息"""
+        uploaded = upload is not None
+        if uploaded:
+            if not filename or not filename.lower().endswith('.zip'):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "上传的来源必须是 .zip 文件（请在 filename 参数中给出文件名）")
+            try:
+                path, _ = self.workspace.add_upload(self._session, upload, filename)
+            except ValueError as e:
+                raise ApiError(HTTPStatus.INSUFFICIENT_STORAGE, str(e))
+            if not zipfile.is_zipfile(path):
+                self.workspace.discard(self._session, path)
+                raise ApiError(HTTPStatus.BAD_REQUEST, "上传的文件不是有效的 ZIP 压缩包")
+        elif not path or not os.path.exists(path):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"路径无效: {path}")
+        path = os.path.abspath(path)
+        kind = 'zip' if is_zip_source(path) else 'folder'
+        if kind == 'folder' and not os.path.isdir(path):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"只支持文件夹或 .zip 压缩包: {path}")
+
+        source_id = hashlib.blake2b(path.encode('utf-8'), digest_size=6).hexdigest()
+        with self._lock:
+            entry = self._sources.get(source_id)
+            if entry is None:
+                # 显示名称在所有来源中唯一（检查结果按显示名称区分）
+                name = os.path.basename(filename or path)
+                if any(s['name'] == name for s in self._sources.values()):
+                    name = f"{name} ({source_id[:6]})"
+                entry = self._sources[source_id] = {'name': name, 'path': path, 'kind': kind, 'uploaded': uploaded,
+                                                    'registered_at': time.time()}
+        self._touch_workspace()
+        return dict(entry, source_id=source_id)
+
+    def list_sources(self):
+        self._touch_workspace()
+        with self._lock:
+            return [dict(entry, source_id=source_id) for source_id, entry in self._sources.items()]
+
+    def remove_source(self, source_id):
+        with self._lock:
+            entry = self._sources.pop(source_id, None)
+        if entry is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"没有登记来源 {source_id}")
+        self.cache.discard(entry['path'])
+        if entry['uploaded']:
+            self.workspace.discard(self._session, entry['path'])
+        return {'source_id': source_id, 'removed': True}
+
+    # ---------- 检查 ----------
+    def check(self, spec):
+        """按请求中的参数检查，返回 JSON 可序列化的结果；参数类型不对时抛出 ApiError (400)"""
+        _validate_spec(spec)
+        roster_id = spec.get('roster_id')
+        if not roster_id:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "缺少 roster_id")
+        roster = self.roster(roster_id)
+        roster_data = roster['data']
+        id_map = roster_data['student_id_to_name']
+
+        with self._lock:
+            source_ids = spec.get('sources') or list(self._sources)
+            unknown = [source_id for source_id in source_ids if source_id not in self._sources]
+            sources = {source_id: self._sources[source_id] for source_id in source_ids if source_id in self._sources}
+        if unknown:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"没有登记来源: {', '.join(unknown)}")
+        if not sources:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "没有可检查的作业来源")
+        self._touch_workspace()
+
+        all_types = bool(spec.get('all_types', False))
+        extensions = spec.get('extensions', DEFAULT_EXTENSIONS)
+        if isinstance(extensions, list):
+            extensions = ",".join(extensions)
+        ignore = spec.get('ignore', list(DEFAULT_IGNORE_PATTERNS))
+        if isinstance(ignore, str):
+            ignore = parse_ignore_patterns(ignore)
+        try:
+            deadlines = {name: parse_deadline(text) for name, text in (spec.get('deadlines') or {}).items()}
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+        messages = []
+        paths = [entry['path'] for entry in sources.values()]
+        folder_results = run_check(
+            roster_data, paths,
+            target_extensions=[] if all_types else parse_extensions(extensions), check_all_types=all_types,
+            display_names={entry['path']: entry['name'] for entry in sources.values()},
+            notify=lambda level, message: messages.append({'level': level, 'message': message}),
+            max_workers=self.max_workers, recursive=bool(spec.get('recursive', False)),
+            max_depth=spec.get('max_depth'), ignore_patterns=ignore, cache=self.cache,
+            name_matcher=self._name_matcher(roster) if spec.get('match_names') else None)
+
+        late = late_analysis(folder_results, deadlines, id_map)['detail'] if deadlines else None
+        folders = []
+        for source_id, entry in sources.items():
+            res = folder_results.get(entry['name'])
+            if res is None:
+                continue
+            folder = {
+                'source_id': source_id,
+                'name': entry['name'],
+                'submitted_count': res['submitted_count'],
+                'missing_count': res['missing_count'],
+                'missing': [{'student_id': sid, 'name': id_map.get(sid)} for sid in sorted(res['missing_ids'])],
+                'file_type_stats': res['file_type_stats'],
+                'unmatched_files': res['unmatched_files'],
+                'name_matched_files': res['name_matched_files'],
+                'ambiguous_files': res['ambiguous_files'],
+                'cache_stats': res['cache_stats'],
+            }
+            if late is not None and entry['name'] in deadlines:
+                rows = late[(late["文件夹"] == entry['name']) & (late["状态"] == STATUS_LATE)]
+                folder['deadline'] = deadlines[entry['name']]
+                folder['late'] = [{'student_id': sid, 'name': id_map.get(sid), 'hours_late': float(hours)}
+                                  for sid, hours in zip(rows["学号"], rows["迟交(小时)"])]
+            folders.append(folder)
+        return {'roster_id': roster_id, 'checked_at': time.time(), 'folders': folders, 'messages': messages}
+
+    def _name_matcher(self, roster):
+        """花名册的姓名索引，第一次用到时构建并随花名册保存"""
+        with self._lock:
+            if 'name_matcher' not in roster:
+                roster['name_matcher'] = NameMatcher(roster['data']['student_id_to_name'])
+            return roster['name_matcher']
+
+    def batch(self, specs):
+        """并行执行多项检查，返回与 specs 一一对应的结果；出错的项为 {"error": 说明, "status": 状态码}"""
+        if not isinstance(specs, list) or not specs:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "checks 必须是非空数组")
+
+        def run(spec):
+            try:
+                return self.check(spec)
+            except ApiError as e:
+                return {'error': str(e), 'status': int(e.status)}
+            except Exception as e:
+                return {'error': f"检查失败: {e}", 'status': int(HTTPStatus.INTERNAL_SERVER_ERROR)}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.batch_concurrency, len(specs))),
+                                thread_name_prefix="hwcheck-api-batch") as executor:
+            return {'results': list(executor.map(run, specs))}
+
+
+# =======================================
+# HTTP
+# ========================================
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "hwcheck"
+    protocol_version = "HTTP/1.1"
+
+    _ROUTES = [
+        ('GET', re.compile(r'^/health$'), '_health'),
+        ('GET', re.compile(r'^/rosters$'), '_list_rosters'),
+        ('POST', re.compile(r'^/rosters$'), '_add_roster'),
+        ('GET', re.compile(r'^/rosters/(?P<roster_id>[\w-]+)$'), '_get_roster'),
+        ('GET', re.compile(r'^/sources$'), '_list_sources'),
+        ('POST', re.compile(r'^/sources$'), '_add_source'),
+        ('DELETE', re.compile(r'^/sources/(?P<source_id>\w+)$'), '_remove_source'),
+        ('POST', re.compile(r'^/check$'), '_check'),
+        ('POST', re.compile(r'^/batch$'), '_batch'),
+    ]
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self._body = _BodyReader(self.rfile, int(self.headers.get('Content-Length') or 0))
+        status = HTTPStatus.OK
+        try:
+            self._authorize()
+            for route_method, pattern, handler in self._ROUTES:
+                match = pattern.match(url.path)
+                if match:
+                    if route_method == method:
+                        payload = getattr(self, handler)(**match.groupdict())
+                        break
+            else:
+                known = any(pattern.match(url.path) for _, pattern, _ in self._ROUTES)
+                raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND,
+                               f"不支持的接口: {method} {url.path}")
+        except ApiError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"服务器内部错误: {e}"}
+        # 没读完的请求体要读掉，否则会被当成下一个请求
+        while self._body.read(1024 * 1024):
+            pass
+        self._send_json(status, payload)
+        log_event('http_request', method=method, path=url.path, status=int(status),
+                  seconds=round(time.perf_counter() - start, 4))
+
+    def _authorize(self):
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'),
+                                             f"Bearer {token}".encode('utf-8')):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "缺少或错误的访问令牌")
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # 请求日志通过 log_event 输出（python -m hwcheck serve --metrics-log）
+
+    def _is_upload(self):
+        return not self.headers.get('Content-Type', '').startswith('application/json')
+
+    def _json_body(self):
+        if self._body.remaining > MAX_JSON_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "请求体过大")
+        raw = self._body.read()
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"请求体不是有效的 JSON: {e}")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "请求体必须是 JSON 对象")
+        return body
+
+    # ---------- 接口 ----------
+    def _health(self):
+        return {'status': 'ok'}
+
+    def _list_rosters(self):
+        return {'rosters': self.service.list_rosters()}
+
+    def _add_roster(self):
+        if self._is_upload():
+            if self._body.remaining > MAX_ROSTER_BYTES:
+                raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "花名册文件过大")
+            roster_file = io.BytesIO(self._body.read())
+            name = self.query.get('name') or self.query.get('filename')
+            all_sheets = self.query.get('all_sheets', '').lower() in ('1', 'true', 'yes')
+        else:
+            body = self._json_body()
+            roster_file = _field(body, 'path', str, "字符串")
+            _field(body, 'name', str, "字符串")
+            if not roster_file or not os.path.isfile(roster_file):
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"花名册路径无效: {roster_file}")
+            name = body.get('name') or os.path.basename(roster_file)
+            all_sheets = bool(body.get('all_sheets', False))
+        return self.service.register_roster(roster_file, name=name, all_sheets=all_sheets)
+
+    def _get_roster(self, roster_id):
+        entry = self.service.roster(roster_id)
+        summary = self.service._roster_summary(roster_id, entry)
+        summary['students'] = [{'student_id': sid, 'name': name}
+                               for sid, name in entry['data']['student_id_to_name'].items()]
+        return summary
+
+    def _list_sources(self):
+        return {'sources': self.service.list_sources()}
+
+    def _add_source(self):
+        if self._is_upload():
+            return self.service.register_source(upload=self._body, filename=self.query.get('filename'))
+        return self.service.register_source(path=_field(self._json_body(), 'path', str, "字符串"))
+
+    def _remove_source(self, source_id):
+        return self.service.remove_source(source_id)
+
+    def _check(self):
+        return self.service.check(self._json_body())
+
+    def _batch(self):
+        # 每一项的参数在 check() 中校验，出错的项单独返回 400
+        return self.service.batch(self._json_body().get('checks'))
+
+
+def _json_default(value):
+    if isinstance(value, (set, frozenset, tuple)):
+        return sorted(value)
+    return str(value)
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None, token=None):
+    """创建（但不启动）接口服务器；port=0 时由系统分配端口，见 server.server_address"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service or CheckService()
+    server.token = token
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None, token=None):
+    """启动接口服务器并一直运行，按 Ctrl+C 退出"""
+    server = make_server(host, port, service=service, token=token)
+    print(f"接口服务已启动: http://{server.server_address[0]}:{server.server_address[1]}/ ，按 Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("接口服务已停止")
+    finally:
+        server.server_close()
+    return server
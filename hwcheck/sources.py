@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+作业来源：本地文件夹 或 ZIP 压缩包
+
+检查作业只需要文件名，所以 ZIP 包不再整体解压，而是直接读取中央目录 (infolist)。
+两种来源都产出带有 name / relpath / ext / size / mtime 属性的文件对象，
+只有在真正需要文件内容时才调用 open() 读取（ZIP 成员按需解压，不落盘）。
+
+文件夹通过 os.scandir 逐层流式遍历（复用目录项缓存的文件类型，不额外 stat），
+支持递归、最大深度与忽略规则；任何时候都不会把完整文件列表放进内存。
+"""
+import fnmatch
+import os
+import shutil
+import time
+import zipfile
+
+# 复制 / 解压文件时每次读写的块大小，大文件也只占用这么多内存
+COPY_CHUNK_SIZE = 1024 * 1024
+# 默认忽略的目录/文件（按名称匹配，支持通配符）
+DEFAULT_IGNORE_PATTERNS = ('__MACOSX', '.git', 'node_modules')
+
+
+def is_zip_source(path):
+    """判断来源是否为 ZIP 压缩包（按后缀判断，不读取文件内容）"""
+    return str(path).lower().endswith('.zip') and os.path.isfile(path)
+
+
+def _decode_zip_name(info):
+    """还原 ZIP 成员的文件名
+
+    Windows 下压缩的中文文件名通常是 GBK 编码且没有设置 UTF-8 标志位，
+    zipfile 会按 cp437 解码成乱码，这里尝试转回 GBK。
+    """
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def parse_ignore_patterns(text):
+    """把逗号分隔的忽略规则拆成列表"""
+    if not text:
+        return []
+    return [p.strip() for p in text.replace('，', ',').split(',') if p.strip()]
+
+
+def _is_ignored(name, ignore_patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in ignore_patterns)
+
+
+class FolderFile:
+    """本地文件夹中的一个文件（包装 os.DirEntry，stat 结果由 DirEntry 缓存）"""
+    __slots__ = ('name', 'relpath', 'ext', '_entry')
+
+    def __init__(self, entry, relpath):
+        self._entry = entry
+        self.name = entry.name
+        self.relpath = relpath
+        self.ext = os.path.splitext(entry.name)[1].lower()  # 获取小写后缀，如 .py
+
+    @property
+    def path(self):
+        return self._entry.path
+
+    def stat(self):
+        return self._entry.stat()
+
+    @property
+    def size(self):
+        return self.stat().st_size
+
+    @property
+    def mtime(self):
+        return self.stat().st_mtime
+
+    def open(self):
+        return open(self._entry.path, 'rb')
+
+
+class LocalFile:
+    """按路径访问的本地文件，没有现成的 DirEntry 时使用（例如快照缓存中的条目）"""
+    __slots__ = ('name', 'relpath', 'ext', 'path')
+
+    def __init__(self, folder_path, relpath):
+        self.relpath = relpath
+        self.name = relpath.rsplit('/', 1)[-1]
+        self.ext = os.path.splitext(self.name)[1].lower()
+        self.path = os.path.join(folder_path, *relpath.split('/'))
+
+    def stat(self):
+        return os.stat(self.path)
+
+    @property
+    def size(self):
+        return self.stat().st_size
+
+    @property
+    def mtime(self):
+        return self.stat().st_mtime
+
+    def open(self):
+        return open(self.path, 'rb')
+
+
+class ZipMemberFile:
+    """ZIP 压缩包中的一个成员，只保存中央目录里的信息"""
+    __slots__ = ('name', 'relpath', 'ext', 'zip_path', 'info')
+
+    def __init__(self, zip_path, info):
+        self.zip_path = zip_path
+        self.info = info
+        self.relpath = _decode_zip_name(info)
+        self.name = self.relpath.rstrip('/').rsplit('/', 1)[-1]
+        self.ext = os.path.splitext(self.name)[1].lower()
+
+    @property
+    def path(self):
+        return f"{self.zip_path}/{self.relpath}"
+
+    @property
+    def size(self):
+        return self.info.file_size
+
+    @property
+    def mtime(self):
+        return time.mktime(self.info.date_time + (0, 0, -1))
+
+    def open(self):
+        """按需读取成员内容（流式解压，不写临时文件）"""
+        # 成员流持有底层文件的引用，压缩包对象可以立即关闭，成员流关闭时才真正释放文件
+        with zipfile.ZipFile(self.zip_path, 'r') as zf:
+            return zf.open(self.info, 'r')
+
+
+def iter_folder_files(folder_path, max_depth=0, ignore_patterns=DEFAULT_IGNORE_PATTERNS):
+    """用 os.scandir 逐个产出文件夹中的文件
+
+    - max_depth: 向下进入子文件夹的层数，0 表示只看顶层，None 表示不限
+    - ignore_patterns: 名称匹配这些规则的文件/文件夹会被跳过
+
+    每处理完一层目录就释放其句柄，只把待访问的子目录路径留在栈里。
+    """
+    ignore_patterns = tuple(ignore_patterns or ())
+    pending = [(os.fspath(folder_path), '', 0)]
+    while pending:
+        dir_path, rel_prefix, depth = pending.pop()
+        subdirs = []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if ignore_patterns and _is_ignored(entry.name, ignore_patterns):
+                    continue
+                # is_dir / is_file 使用 scandir 返回的 d_type，通常不需要额外的 stat
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is None or depth < max_depth:
+                        subdirs.append((entry.path, rel_prefix + entry.name + '/', depth + 1))
+                elif entry.is_file():
+                    yield FolderFile(entry, rel_prefix + entry.name)
+        # 反向压栈，使子目录按目录中的顺序被访问
+        pending.extend(reversed(subdirs))
+
+
+def iter_zip_files(zip_path, max_depth=0, ignore_patterns=DEFAULT_IGNORE_PATTERNS):
+    """逐个产出 ZIP 包中的文件，max_depth / ignore_patterns 含义与 iter_folder_files 相同
+
+    max_depth=0 时只看顶层成员，与解压后只看顶层目录的行为一致。
+    """
+    ignore_patterns = tuple(ignore_patterns or ())
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        infos = zf.infolist()
+    for info in infos:
+        if info.is_dir():
+            continue
+        member = ZipMemberFile(zip_path, info)
+        parts = member.relpath.strip('/').split('/')
+        if max_depth is not None and len(parts) - 1 > max_depth:
+            continue
+        if ignore_patterns and any(_is_ignored(part, ignore_patterns) for part in parts):
+            continue
+        yield member
+
+
+def iter_source_files(source, max_depth=0, ignore_patterns=DEFAULT_IGNORE_PATTERNS):
+    """根据来源类型（文件夹 / ZIP）逐个产出文件"""
+    if is_zip_source(source):
+        return iter_zip_files(source, max_depth=max_depth, ignore_patterns=ignore_patterns)
+    return iter_folder_files(source, max_depth=max_depth, ignore_patterns=ignore_patterns)
+
+
+def extract_zip_member(member, dest_dir, metrics=None):
+    """只在确实需要文件内容时，把单个 ZIP 成员分块解压到 dest_dir，返回写出的路径"""
+    os.makedirs(dest_dir, exist_ok=True)
+    out_path = os.path.join(dest_dir, member.name)
+    with member.open() as src, open(out_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        if metrics is not None:
+            metrics.add('bytes_extracted', dst.tell())
+    return out_path
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+结果页的缺交名单表：一次算好，按条件筛选、分页取出
+
+以前汇总页和每个文件夹页每次重跑都从 dict 列表重建整张 DataFrame 再整表发给浏览器，
+学生多、作业多时又慢又大。MissingTable 在检查结果出来后由提交矩阵一次性生成
+（每条缺交记录一行，文件夹为分类列），之后：
+
+- 按文件夹筛选只比较分类编码；
+- 按学号 / 姓名搜索在预先拼好的小写搜索列上做子串匹配；
+- page() 只切出当前页，前端只收到这一页的数据。
+
+每个查询（搜索词 + 文件夹）的行号按 LRU 缓存最近 QUERY_CACHE_SIZE 个，翻页、在汇总页和各文件夹页之间切换时
+不用重新筛选。
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+PAGE_SIZES = (50, 100, 500, 1000)
+# 最多缓存多少个查询的行号（每个页面上的表各占一个）
+QUERY_CACHE_SIZE = 16
+
+
+class MissingTable:
+    """未交名单总表，列为 文件夹 / 学号 / 姓名，按文件夹顺序、学号排序"""
+
+    COLUMNS = ["文件夹", "学号", "姓名"]
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self._search_keys = (self.frame["学号"] + " " + self.frame["姓名"]).str.lower()
+        self._queries = OrderedDict()  # (搜索词, 文件夹) -> 行号数组，最近使用的在最后
+
+    @classmethod
+    def from_matrix(cls, matrix, id_map):
+        """由 SubmissionMatrix 生成：矩阵中每个未交的格子一行"""
+        ids = np.array(matrix.student_ids, dtype=object)
+        order = np.argsort(ids, kind='stable')
+        # 转置后按行展开即为"先文件夹、再学号"的顺序
+        folder_idx, student_idx = np.nonzero(~matrix.submitted[order].T)
+        sids = ids[order][student_idx]
+        frame = pd.DataFrame({
+            "文件夹": pd.Categorical.from_codes(folder_idx, categories=matrix.folder_names)
+            if matrix.folder_names else pd.Categorical([]),
+            "学号": pd.array(sids, dtype=object),
+            "姓名": pd.array([id_map.get(sid, "未知") for sid in sids], dtype=object),
+        }, columns=cls.COLUMNS)
+        return cls(frame)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def folder_names(self):
+        return list(self.frame["文件夹"].cat.categories)
+
+    def count(self, folder_name):
+        """某个文件夹的缺交人数"""
+        return int((self.frame["文件夹"] == folder_name).sum())
+
+    def select(self, search="", folders=None):
+        """符合条件的行号数组
+
+        - search: 学号或姓名中包含该字符串（不区分大小写），为空时不筛选
+        - folders: 只保留这些文件夹，None 表示全部
+        """
+        search = (search or "").strip().lower()
+        key = (search, None if folders is None else tuple(folders))
+        rows = self._queries.get(key)
+        if rows is not None:
+            self._queries.move_to_end(key)
+            return rows
+
+        mask = np.ones(len(self.frame), dtype=bool)
+        if folders is not None:
+            categories = self.frame["文件夹"].cat.categories
+            codes = [categories.get_loc(name) for name in folders if name in categories]
+            mask &= np.isin(self.frame["文件夹"].cat.codes.to_numpy(), codes)
+        if search:
+            mask[mask] = self._search_keys[mask].str.contains(search, regex=False).to_numpy()
+        rows = np.flatnonzero(mask)
+        self._queries[key] = rows
+        while len(self._queries) > QUERY_CACHE_SIZE:
+            self._queries.popitem(last=False)
+        return rows
+
+    def page(self, search="", folders=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """取出一页，返回 {'frame', 'total', 'page', 'page_count'}
+
+        page 从 1 开始，超出范围时取最后一页（调用方用返回的 page / page_count 更新页码控件，不必另外调用 select）。
+        """
+        rows = self.select(search, folders)
+        total = len(rows)
+        page_count = max(1, math.ceil(total / page_size))
+        page = min(max(1, int(page)), page_count)
+        start = (page - 1) * page_size
+        frame = self.frame.iloc[rows[start:start + page_size]].reset_index(drop=True)
+        frame["文件夹"] = frame["文件夹"].astype(object)
+        return {'frame': frame, 'total': total, 'page': page, 'page_count': page_count}
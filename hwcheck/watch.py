@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""
+监视模式：作业文件夹有新文件时增量更新检查结果
+
+临近截止时间时不用反复点"开始检查"。先用 run_check 得到每个文件夹的结果，
+再把本地文件夹交给 FolderWatcher：
+
+- Linux 上通过 inotify（ctypes 调用 libc，不需要额外依赖）接收文件创建 / 删除 / 移动事件，
+  只对事件涉及的文件匹配学号，更新该文件夹的已交 / 未交名单，不重新扫描目录；
+- 其它平台或 inotify 不可用时退回轮询：每隔 poll_interval 秒列一次目录，
+  只对新增 / 消失的文件名做匹配。
+
+新文件按与 check_homework_in_folder 相同的规则处理：先按学号匹配，可选再按姓名匹配（name_matcher），
+传入 inspector 时检查压缩包内容。已知文件被覆盖（重新提交、同名文件移入，inotify 的 IN_CLOSE_WRITE /
+IN_MOVED_TO、轮询时大小 / 修改时间变化）时去掉旧记录，按新文件重新处理，提交时间随之更新。
+
+不管监视多少个文件夹，都只有一个后台线程。ZIP 压缩包来源不监视。
+每次结果有变化时 version 加一，调用方比较 version 即可知道是否需要刷新页面。
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+from collections import Counter
+
+from .matcher import StudentIdMatcher
+from .metrics import log_event
+from .sources import DEFAULT_IGNORE_PATTERNS, LocalFile, _is_ignored, is_zip_source, iter_folder_files
+
+# 轮询模式下两次列目录的间隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify 常量（见 <sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_EXCL_UNLINK = 0x04000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF
+               | _IN_ONLYDIR | _IN_EXCL_UNLINK)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """最小的 inotify 封装，只在 Linux 上可用，不可用时构造函数抛出 OSError"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("找不到 libc")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("当前系统不支持 inotify")
+        self._libc = libc
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """读出当前所有事件：[(wd, mask, name)]"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _FolderState:
+    """一个被监视文件夹的增量状态，结构与 check_homework_in_folder 的结果对应"""
+
+    def __init__(self, name, path, roster_student_ids, result):
+        self.name = name
+        self.path = path
+        self.roster_student_ids = roster_student_ids
+        self.matched = dict(result['matched_files'])  # 相对路径 -> 学号元组
+        self.unmatched = dict.fromkeys(result['unmatched_files'])  # 保持顺序的集合
+        self.stats = dict(result.get('file_stats') or {})  # 相对路径 -> (大小, 修改时间)
+        # 内容不符合要求的压缩包也是已知文件，不能在开始监视时当作新文件重新计入
+        self.rejected = dict(result.get('rejected_files') or {})  # 相对路径 -> 原因
+        self.rejected_stats = {}  # 被拒绝的压缩包的 (大小, 修改时间)，用于发现改动
+        self.archive_notes = dict(result.get('archive_notes') or {})
+        self.name_matched = dict(result.get('name_matched_files') or {})
+        self.ambiguous = dict(result.get('ambiguous_files') or {})
+        # 每个学生被匹配到的文件数，减到 0 才算未交
+        self.file_counts = Counter(sid for ids in self.matched.values() for sid in ids)
+        self.type_stats = Counter(_ext(relpath) for relpath in self.matched)
+
+    def add_file(self, relpath, student_ids, stat=None, rejected=None, note=None, by_name=False, candidates=()):
+        """记录一个新文件（FolderWatcher._add 已按检查规则得出各项），已知文件不重复记录（被覆盖时先 remove_file）
+
+        - stat: (大小, 修改时间)，作为提交时间
+        - rejected: 压缩包内容不符合要求的原因，不为 None 时不算作提交
+        - note: 压缩包无法检查时的说明；by_name: 学号是按姓名匹配到的；candidates: 姓名有歧义时的候选学号
+        """
+        if self.knows(relpath):
+            return False
+        if rejected is not None:
+            self.rejected[relpath] = rejected
+            if stat is not None:
+                self.rejected_stats[relpath] = stat
+        elif student_ids:
+            self.matched[relpath] = student_ids
+            if stat is not None:
+                self.stats[relpath] = stat
+            if note:
+                self.archive_notes[relpath] = note
+            if by_name:
+                self.name_matched[relpath] = student_ids[0]
+            self.file_counts.update(student_ids)
+            self.type_stats[_ext(relpath)] += 1
+        else:
+            self.unmatched[relpath] = None
+            if candidates:
+                self.ambiguous[relpath] = list(candidates)
+        return True
+
+    def knows(self, relpath):
+        return relpath in self.matched or relpath in self.unmatched or relpath in self.rejected
+
+    def stat_of(self, relpath):
+        """记录的 (大小, 修改时间)，没有时为 None"""
+        return self.stats.get(relpath) or self.rejected_stats.get(relpath)
+
+    def remove_file(self, relpath):
+        self.ambiguous.pop(relpath, None)
+        if relpath in self.unmatched:
+            del self.unmatched[relpath]
+            return True
+        if relpath in self.rejected:
+            del self.rejected[relpath]
+            self.rejected_stats.pop(relpath, None)
+            return True
+        student_ids = self.matched.pop(relpath, None)
+        if student_ids is None:
+            return False
+        self.stats.pop(relpath, None)
+        self.archive_notes.pop(relpath, None)
+        self.name_matched.pop(relpath, None)
+        self.file_counts.subtract(student_ids)
+        for sid in student_ids:
+            if self.file_counts[sid] <= 0:
+                del self.file_counts[sid]
+        ext = _ext(relpath)
+        self.type_stats[ext] -= 1
+        if self.type_stats[ext] <= 0:
+            del self.type_stats[ext]
+        return True
+
+    def remove_prefix(self, prefix):
+        """子文件夹被删除或移走时，去掉其中所有文件"""
+        gone = [relpath for relpath in self.known_files() if relpath.startswith(prefix)]
+        for relpath in gone:
+            self.remove_file(relpath)
+        return bool(gone)
+
+    def known_files(self):
+        return set(self.matched) | set(self.unmatched) | set(self.rejected)
+
+    def result(self):
+        submitted_ids = set(self.file_counts)
+        missing_ids = self.roster_student_ids - submitted_ids
+        return {
+            'submitted_ids': submitted_ids,
+            'missing_ids': missing_ids,
+            'submitted_count': len(submitted_ids),
+            'missing_count': len(missing_ids),
+            'file_type_stats': dict(self.type_stats),
+            'matched_files': dict(self.matched),
+            'file_stats': dict(self.stats),
+            'unmatched_files': list(self.unmatched),
+            'rejected_files': dict(self.rejected),
+            'archive_notes': dict(self.archive_notes),
+            'name_matched_files': dict(self.name_matched),
+            'ambiguous_files': dict(self.ambiguous),
+            'cache_stats': None
+        }
+
+
+def _ext(relpath):
+    return os.path.splitext(relpath)[1].lower()
+
+
+class FolderWatcher:
+    """在一个后台线程中监视多个本地作业文件夹，增量维护它们的检查结果
+
+    参数与 check_homework_in_folder 相同（inspector / name_matcher 应与初次检查时一致）；
+    on_change(folder_name) 在后台线程中回调。use_inotify=False 时强制使用轮询。
+    """
+
+    def __init__(self, roster_student_ids, target_extensions=None, check_all_types=False, recursive=False,
+                 max_depth=None, ignore_patterns=DEFAULT_IGNORE_PATTERNS, matcher=None,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True, on_change=None, inspector=None,
+                 name_matcher=None):
+        self.roster_student_ids = set(roster_student_ids)
+        self.target_extensions = set(target_extensions or ())
+        self.check_all_types = check_all_types
+        self.depth = max_depth if recursive else 0
+        self.ignore_patterns = tuple(ignore_patterns or ())
+        self.matcher = matcher or StudentIdMatcher(self.roster_student_ids)
+        self.inspector = inspector
+        self.name_matcher = name_matcher
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.version = 0
+        self._states = {}  # 显示名称 -> _FolderState
+        self._watches = {}  # inotify wd -> (_FolderState, 相对目录前缀, 目录深度)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._wake_r = self._wake_w = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._wake_r, self._wake_w = os.pipe()
+            except OSError as e:
+                log_event("watch_fallback", backend="polling", error=str(e))
+                self._inotify = None
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify is not None else "polling"
+
+    @property
+    def folder_names(self):
+        with self._lock:
+            return list(self._states)
+
+    def add(self, folder_path, folder_name, result):
+        """开始监视一个文件夹，result 是它在 run_check 中的检查结果。ZIP 来源返回 False"""
+        if is_zip_source(folder_path) or not os.path.isdir(folder_path):
+            return False
+        state = _FolderState(folder_name, folder_path, self.roster_student_ids, result)
+        with self._lock:
+            self._states[folder_name] = state
+            if self._inotify is not None:
+                self._watch_tree(state, folder_path, '', 0)
+            # 补上检查结束到开始监视之间出现的文件（只列目录，不重新匹配已知文件）
+            self._sync(state)
+        return True
+
+    def results(self):
+        """当前所有被监视文件夹的结果副本 {显示名称: 检查结果}"""
+        with self._lock:
+            return {name: state.result() for name, state in self._states.items()}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="hwcheck-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._watches.clear()
+            if self._inotify is not None:
+                self._inotify.close()
+                os.close(self._wake_r)
+                os.close(self._wake_w)
+                self._inotify = self._wake_r = self._wake_w = None
+
+    # ---------- 内部实现（以下方法都在持有 _lock 时调用，_run 除外） ----------
+    def _wants(self, name):
+        if self.ignore_patterns and _is_ignored(name, self.ignore_patterns):
+            return False
+        return self.check_all_types or _ext(name) in self.target_extensions
+
+    def _can_descend(self, depth):
+        return self.depth is None or depth < self.depth
+
+    def _watch_tree(self, state, dir_path, rel_prefix, depth):
+        """给目录及其允许深度内的子目录加 inotify 监视"""
+        pending = [(dir_path, rel_prefix, depth)]
+        while pending:
+            path, prefix, d = pending.pop()
+            try:
+                wd = self._inotify.add_watch(path)
+            except OSError:
+                continue
+            self._watches[wd] = (state, prefix, d)
+            if not self._can_descend(d):
+                continue
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and not _is_ignored(entry.name, self.ignore_patterns):
+                            pending.append((entry.path, prefix + entry.name + '/', d + 1))
+            except OSError:
+                continue
+
+    def _list(self, dir_path, max_depth):
+        """{相对路径: 文件对象}，只包含符合类型要求的文件"""
+        try:
+            return {f.relpath: f for f in iter_folder_files(dir_path, max_depth=max_depth,
+                                                            ignore_patterns=self.ignore_patterns)
+                    if self._wants(f.name)}
+        except OSError:
+            return {}
+
+    def _inspects(self, relpath):
+        return self.inspector is not None and self.inspector.is_archive(relpath)
+
+    def _add(self, state, relpath, file_obj):
+        """按与 check_homework_in_folder 相同的规则处理一个新文件：学号、姓名、压缩包内容"""
+        student_ids = self.matcher.match(file_obj.name)
+        by_name, candidates = False, ()
+        if not student_ids and self.name_matcher is not None:
+            student_ids, candidates = self.name_matcher.match(file_obj.name)
+            by_name = bool(student_ids)
+        try:
+            stat = (file_obj.size, file_obj.mtime)
+        except OSError:
+            stat = None
+        rejected = note = None
+        if student_ids and self._inspects(relpath):
+            accepted, reason = self.inspector.inspect(file_obj)
+            if accepted:
+                note = reason
+            else:
+                rejected, by_name = reason, False
+        return state.add_file(relpath, student_ids, stat=stat, rejected=rejected, note=note, by_name=by_name,
+                              candidates=candidates)
+
+    def _readd(self, state, relpath, file_obj):
+        """文件被替换（内容写完、被覆盖或同名文件移入）：去掉旧记录，按新文件重新处理"""
+        state.remove_file(relpath)
+        self._add(state, relpath, file_obj)
+        return True
+
+    def _refresh(self, state, relpath, file_obj):
+        """已知文件的大小 / 修改时间变了就重新处理（压缩包重新检查内容，其余文件更新提交时间）"""
+        if relpath in state.unmatched:
+            return False  # 文件名没变，仍然匹配不上，内容改动不影响结果
+        try:
+            current = (file_obj.size, file_obj.mtime)
+        except OSError:
+            return False
+        recorded = state.stat_of(relpath)
+        if recorded is None and relpath in state.rejected:
+            state.rejected_stats[relpath] = current  # 初次检查没有记录时间，从现在开始跟踪
+            return False
+        if recorded is not None and tuple(recorded) == current:
+            return False
+        return self._readd(state, relpath, file_obj)
+
+    def _sync(self, state):
+        """列一次目录，与已知文件对比，只处理新增、消失和大小 / 修改时间变了的文件。返回是否有变化"""
+        listing = self._list(state.path, self.depth)
+        known = state.known_files()
+        changed = False
+        for relpath in known - listing.keys():
+            changed |= state.remove_file(relpath)
+        for relpath in listing.keys() - known:
+            changed |= self._add(state, relpath, listing[relpath])
+        for relpath in known & listing.keys():
+            changed |= self._refresh(state, relpath, listing[relpath])
+        return changed
+
+    def _handle_event(self, wd, mask, name):
+        """处理一条 inotify 事件，返回有变化的文件夹显示名称或 None"""
+        if mask & _IN_Q_OVERFLOW:
+            # 事件队列溢出，丢了哪些事件无从得知，只能每个文件夹重新列一次目录
+            return [state.name for state in self._states.values() if self._sync(state)]
+        watch = self._watches.get(wd)
+        if watch is None:
+            return None
+        state, prefix, depth = watch
+        if mask & _IN_IGNORED:
+            del self._watches[wd]
+            return None
+        if not name or (self.ignore_patterns and _is_ignored(name, self.ignore_patterns)):
+            return None
+        relpath = prefix + name
+        added = mask & (_IN_CREATE | _IN_MOVED_TO)
+        if mask & _IN_ISDIR:
+            if not self._can_descend(depth):
+                return None
+            if added:
+                dir_path = os.path.join(state.path, *relpath.split('/'))
+                self._watch_tree(state, dir_path, relpath + '/', depth + 1)
+                sub_depth = None if self.depth is None else self.depth - depth - 1
+                changed = False
+                for sub_relpath, file_obj in self._list(dir_path, sub_depth).items():
+                    changed |= self._add(state, relpath + '/' + sub_relpath, file_obj)
+                return [state.name] if changed else None
+            # 子文件夹被删除或移走：移走的不会自动收到 IN_IGNORED，需要手动取消监视
+            for sub_wd, (sub_state, sub_prefix, _) in list(self._watches.items()):
+                if sub_state is state and sub_prefix.startswith(relpath + '/'):
+                    if mask & _IN_MOVED_FROM:
+                        self._inotify.rm_watch(sub_wd)
+                    del self._watches[sub_wd]
+            return [state.name] if state.remove_prefix(relpath + '/') else None
+        if not self._wants(name):
+            return None
+        if mask & _IN_CLOSE_WRITE:
+            # 文件写完：新文件在 IN_CREATE 时已经记录，这里按写完后的大小 / 修改时间更新；
+            # 已有文件被重新写入（重新提交）时同样替换旧记录
+            changed = self._refresh(state, relpath, LocalFile(state.path, relpath))
+        elif mask & _IN_MOVED_TO and state.knows(relpath):
+            # 同名文件移入，覆盖了已知文件：先去掉旧记录再按新文件添加
+            changed = self._readd(state, relpath, LocalFile(state.path, relpath))
+        elif added:
+            changed = self._add(state, relpath, LocalFile(state.path, relpath))
+        else:
+            changed = state.remove_file(relpath)
+        return [state.name] if changed else None
+
+    def _notify_changes(self, names):
+        if not names:
+            return
+        with self._lock:
+            self.version += 1
+        if self.on_change:
+            for name in names:
+                self.on_change(name)
+
+    def _run(self):
+        if self._inotify is not None:
+            fd = self._inotify.fd
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if self._stop.is_set():
+                    break
+                if fd not in ready:
+                    continue
+                changed = []
+                with self._lock:
+                    for wd, mask, name in self._inotify.read_events():
+                        for folder_name in self._handle_event(wd, mask, name) or ():
+                            if folder_name not in changed:
+                                changed.append(folder_name)
+                self._notify_changes(changed)
+        else:
+            while not self._stop.wait(self.poll_interval):
+                with self._lock:
+                    changed = [state.name for state in self._states.values() if self._sync(state)]
+                self._notify_changes(changed)
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+上传压缩包的共享工作区
+
+以前每次"添加压缩包"都用 mkdtemp 新建一个临时目录，只有点"清空所有来源"才会删除，
+用户直接关掉页面时这些文件就一直留在服务器上。Workspace 统一管理这些文件：
+
+- 按内容哈希存放：root/<摘要>/<原文件名>，同一个压缩包（无论谁、用什么名字上传）只保存一份；
+- 会话引用：每次页面运行时用 touch() 报告本会话正在使用的路径，超过 session_ttl 没有活动的会话视为已过期；
+  会话持有的后台资源（如监视模式的线程）用 on_release() 登记，会话结束或过期时一并停止；
+- 清理：没有会话引用、且超过 session_ttl 未使用的条目被删除；总大小超过 quota_bytes 时
+  按最久未使用的顺序淘汰没有会话引用的条目，仍放不下时拒绝新的上传；
+- 启动时删除上次没写完的暂存文件，并按上述规则清理留下的条目。
+
+结果 ZIP 等生成的文件也可以用 add_file() 放进工作区，同样受配额和会话过期的约束
+（这类条目不按内容去重，摘要是随机生成的）。
+
+条目的最近使用时间记录在条目目录的修改时间上，重启后仍按 LRU 淘汰。
+对象是线程安全的（Streamlit 的各个会话是同一进程中的不同线程），但不要让多个进程共用一个 root。
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from .engine import TEMP_DIR_PREFIX, is_temp_dir
+from .metrics import log_event, maybe_stage
+from .sources import COPY_CHUNK_SIZE
+
+# 默认工作区位置与配额，可用环境变量 HWCHECK_WORKSPACE / HWCHECK_WORKSPACE_QUOTA_MB 覆盖
+DEFAULT_WORKSPACE_DIR = os.environ.get("HWCHECK_WORKSPACE") or os.path.join(
+    tempfile.gettempdir(), "hwcheck_workspace")
+DEFAULT_WORKSPACE_QUOTA = int(os.environ.get("HWCHECK_WORKSPACE_QUOTA_MB") or 10 * 1024) * 1024 * 1024
+# 会话超过该秒数没有活动即视为过期
+DEFAULT_SESSION_TTL = 6 * 3600
+# touch() 之间最少间隔多少秒才顺带清理一次
+_SWEEP_INTERVAL = 60
+_PARTIAL_SUFFIX = ".partial"
+_DIGEST_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class Workspace:
+    """按内容哈希去重、有配额和 LRU 淘汰的上传文件工作区"""
+
+    def __init__(self, root=DEFAULT_WORKSPACE_DIR, quota_bytes=DEFAULT_WORKSPACE_QUOTA,
+                 session_ttl=DEFAULT_SESSION_TTL):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self.session_ttl = session_ttl
+        self._entries = {}  # 摘要 -> {'path', 'size', 'last_used'}
+        self._sessions = {}  # 会话 id -> (最后活动时间, 引用的摘要集合)
+        self._release_callbacks = {}  # 会话 id -> {名称: 会话结束时调用的函数}
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """启动时扫描 root：删除暂存文件和不完整的条目，载入其余条目后清理一次"""
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            if name.endswith(_PARTIAL_SUFFIX):
+                _remove(full)
+                continue
+            if not _DIGEST_RE.match(name) or not os.path.isdir(full):
+                continue
+            try:
+                files = os.listdir(full)
+                if len(files) != 1:
+                    raise OSError("条目中的文件数不对")
+                path = os.path.join(full, files[0])
+                self._entries[name] = {'path': path, 'size': os.path.getsize(path),
+                                       'last_used': os.path.getmtime(full)}
+            except OSError:
+                _remove(full)
+        self.sweep()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return self._digest_of(path) is not None
+
+    def _digest_of(self, path):
+        """工作区中的文件路径 -> 摘要，不是工作区文件时返回 None"""
+        path = os.path.abspath(path)
+        entry_dir = os.path.dirname(path)
+        digest = os.path.basename(entry_dir)
+        if os.path.dirname(entry_dir) != self.root:
+            return None
+        entry = self._entries.get(digest)
+        return digest if entry is not None and entry['path'] == path else None
+
+    def _use(self, digest, now):
+        entry = self._entries[digest]
+        entry['last_used'] = now
+        try:
+            os.utime(os.path.dirname(entry['path']), (now, now))
+        except OSError:
+            pass
+
+    # ---------- 上传 ----------
+    def add_upload(self, session_id, file_obj, filename, metrics=None):
+        """保存一个上传的文件并让 session_id 引用它，返回 (文件路径, 是否复用了已有文件)
+
+        边写入暂存文件边计算哈希，内容相同的文件已存在时丢弃暂存文件直接复用。
+        空间不足（淘汰所有未被引用的条目后仍超出配额）时抛出 ValueError。
+        """
+        size_hint = getattr(file_obj, 'size', None)
+        if size_hint is not None and size_hint > self.quota_bytes:
+            raise ValueError(f"文件大小超过工作区配额 {self.quota_bytes // (1024 * 1024)} MB")
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)  # Streamlit 的 UploadedFile 重跑后读取位置可能不在开头
+        fd, partial = tempfile.mkstemp(dir=self.root, suffix=_PARTIAL_SUFFIX)
+        try:
+            digest = hashlib.blake2b(digest_size=16)
+            size = 0
+            with maybe_stage(metrics, 'upload_save', file=os.path.basename(filename)):
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in iter(lambda: file_obj.read(COPY_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+            digest = digest.hexdigest()
+
+            now = time.time()
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is not None and os.path.exists(entry['path']):
+                    _remove(partial)
+                    self._use(digest, now)
+                    self._reference(session_id, digest, now)
+                    if metrics is not None:
+                        metrics.add('uploads_reused', 1)
+                    return entry['path'], True
+                path = self._store(session_id, partial, digest, filename, size, now)
+            if metrics is not None:
+                metrics.add('bytes_saved', size)
+            return path, False
+        except Exception:
+            _remove(partial)
+            raise
+
+    def add_file(self, session_id, filename, write):
+        """调用 write(f) 在工作区中生成一个文件（如结果 ZIP）并让 session_id 引用它，返回文件路径
+
+        空间不足时抛出 ValueError（与 add_upload 相同）。
+        """
+        fd, partial = tempfile.mkstemp(dir=self.root, suffix=_PARTIAL_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            size = os.path.getsize(partial)
+            with self._lock:
+                return self._store(session_id, partial, uuid.uuid4().hex, filename, size, time.time())
+        except Exception:
+            _remove(partial)
+            raise
+
+    def _store(self, session_id, partial, digest, filename, size, now):
+        """把写好的暂存文件移入新条目（调用方持有锁）"""
+        if not self._evict(size):
+            raise ValueError(f"工作区空间不足（配额 {self.quota_bytes // (1024 * 1024)} MB，"
+                             f"其余文件都在使用中），请稍后再试")
+        entry_dir = os.path.join(self.root, digest)
+        os.makedirs(entry_dir, exist_ok=True)
+        path = os.path.join(entry_dir, os.path.basename(filename))
+        os.replace(partial, path)
+        self._entries[digest] = {'path': path, 'size': size, 'last_used': now}
+        self._use(digest, now)
+        self._reference(session_id, digest, now)
+        return path
+
+    def discard(self, session_id, path):
+        """session_id 不再使用 path；没有其他会话引用时立即删除（例如上传的不是有效 ZIP）"""
+        with self._lock:
+            digest = self._digest_of(path)
+            if digest is None:
+                return False
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session[1].discard(digest)
+            if digest in self._referenced():
+                return False
+            self._drop(digest)
+            return True
+
+    # ---------- 会话 ----------
+    def _reference(self, session_id, digest, now):
+        _, digests = self._sessions.get(session_id, (now, set()))
+        digests.add(digest)
+        self._sessions[session_id] = (now, digests)
+
+    def touch(self, session_id, paths=()):
+        """记录会话仍然活跃，并把它引用的条目更新为 paths 中属于工作区的那些
+
+        每次页面运行时调用；不再出现在 paths 中的条目不再受该会话保护。
+        距上次清理超过一分钟时顺带调用 sweep()。
+        """
+        now = time.time()
+        with self._lock:
+            digests = {digest for digest in map(self._digest_of, paths) if digest is not None}
+            for digest in digests:
+                self._use(digest, now)
+            self._sessions[session_id] = (now, digests)
+            if now - self._last_sweep >= _SWEEP_INTERVAL:
+                self.sweep(now)
+
+    def release(self, session_id):
+        """会话结束，不再引用任何条目（条目保留，供之后相同的上传复用），并调用它登记的 on_release 回调"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._run_release_callbacks()
+
+    def on_release(self, session_id, name, callback):
+        """登记会话结束（release 或超过 session_ttl 过期）时调用的 callback()，同名的替换之前登记的
+
+        callback 为 None 时取消登记。用于停止会话自己启动的后台线程等，页面关掉后不会一直留着。
+        会话应已 touch() 过，否则下次清理时就被当作已结束。
+        """
+        with self._lock:
+            callbacks = self._release_callbacks.setdefault(session_id, {})
+            if callback is None:
+                callbacks.pop(name, None)
+            else:
+                callbacks[name] = callback
+            if not callbacks:
+                del self._release_callbacks[session_id]
+
+    def _run_release_callbacks(self):
+        """调用已结束的会话登记的回调（持有 _lock 时调用）"""
+        for session_id in [sid for sid in self._release_callbacks if sid not in self._sessions]:
+            for name, callback in self._release_callbacks.pop(session_id).items():
+                try:
+                    callback()
+                except Exception as e:
+                    log_event("session_release_error", session=session_id, name=name, error=str(e))
+
+    def _referenced(self):
+        return set().union(*(digests for _, digests in self._sessions.values()))
+
+    # ---------- 清理 ----------
+    def sweep(self, now=None):
+        """删除过期会话（调用它们的 on_release 回调），再删除过期且未被引用的条目，最后按配额淘汰，返回删除的条目数"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._last_sweep = now
+            for session_id, (last_seen, _) in list(self._sessions.items()):
+                if now - last_seen > self.session_ttl:
+                    del self._sessions[session_id]
+            self._run_release_callbacks()
+            referenced = self._referenced()
+            removed = 0
+            for digest, entry in list(self._entries.items()):
+                if digest not in referenced and now - entry['last_used'] > self.session_ttl:
+                    self._drop(digest)
+                    removed += 1
+            before = len(self._entries)
+            self._evict(0)
+            return removed + before - len(self._entries)
+
+    def _evict(self, needed_bytes):
+        """按最久未使用的顺序删除未被引用的条目，直到能再放下 needed_bytes；放不下时返回 False"""
+        total = sum(entry['size'] for entry in self._entries.values())
+        if total + needed_bytes <= self.quota_bytes:
+            return True
+        referenced = self._referenced()
+        for digest in sorted(self._entries, key=lambda d: self._entries[d]['last_used']):
+            if digest in referenced:
+                continue
+            total -= self._entries[digest]['size']
+            self._drop(digest)
+            if total + needed_bytes <= self.quota_bytes:
+                return True
+        return False
+
+    def _drop(self, digest):
+        entry = self._entries.pop(digest)
+        _remove(os.path.dirname(entry['path']))
+        log_event("workspace_drop", path=entry['path'], size=entry['size'])
+
+    def usage(self):
+        """{'entries', 'bytes', 'quota_bytes', 'sessions', 'referenced'}"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(entry['size'] for entry in self._entries.values()),
+                'quota_bytes': self.quota_bytes,
+                'sessions': len(self._sessions),
+                'referenced': len(self._referenced() & set(self._entries)),
+            }
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cleanup_stale_temp_dirs(max_age=DEFAULT_SESSION_TTL, temp_root=None):
+    """删除系统临时目录中超过 max_age 秒未修改的旧式临时目录（save_upload_to_temp 等创建的），返回删除的个数"""
+    temp_root = temp_root or tempfile.gettempdir()
+    now = time.time()
+    removed = 0
+    for name in os.listdir(temp_root):
+        path = os.path.join(temp_root, name)
+        if not name.startswith(TEMP_DIR_PREFIX) or not is_temp_dir(path):
+            continue
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                shutil.rmtree(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""测试共用的工具：生成花名册和作业文件夹"""
+import os
+import sys
+import zipfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from hwcheck import clear_roster_cache, process_roster_file  # noqa: E402
+
+STUDENTS = {
+    "202400001": "张三",
+    "202400002": "李四",
+    "202400003": "王五",
+    "202400004": "赵六",
+}
+
+
+def quiet(level, message):
+    pass
+
+
+def write_roster(path, students=STUDENTS, title=None):
+    """写一个 .xlsx 花名册，title 不为空时在表头前加一行标题"""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    if title:
+        ws.append([title])
+    ws.append(["序号", "学号", "姓名"])
+    for i, (sid, name) in enumerate(students.items(), start=1):
+        ws.append([i, int(sid), name])
+    wb.save(path)
+    return path
+
+
+def make_files(folder, names, content=b"x"):
+    """在 folder 下创建文件（名称可含子目录），返回 folder"""
+    for name in names:
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+    return str(folder)
+
+
+def make_zip(path, members):
+    """members: {成员名: 字节内容}"""
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_roster_cache():
+    clear_roster_cache()
+    yield
+    clear_roster_cache()
+
+
+@pytest.fixture
+def roster_data(tmp_path):
+    return process_roster_file(write_roster(tmp_path / "roster.xlsx"), notify=quiet)
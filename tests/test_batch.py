@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import json
+
+from conftest import make_files, write_roster
+from hwcheck import load_manifest, run_batch, unique_display_names
+
+
+def test_unique_display_names():
+    assert unique_display_names(["/a/hw1", "/b/hw1/", "/c/hw2", "/d/hw1"]) == {
+        "/a/hw1": "hw1", "/b/hw1/": "hw1 (2)", "/c/hw2": "hw2", "/d/hw1": "hw1 (3)"}
+
+
+def _manifest(tmp_path, classes):
+    path = tmp_path / "batch.json"
+    path.write_text(json.dumps({"defaults": {"extensions": ".py"}, "classes": classes}), encoding='utf-8')
+    return load_manifest(path)
+
+
+def test_same_basename_sources_do_not_overwrite(tmp_path):
+    write_roster(tmp_path / "r.xlsx")
+    make_files(tmp_path / "a" / "hw1", ["202400001.py"])
+    make_files(tmp_path / "b" / "hw1", ["202400002.py", "202400003.py"])
+    classes = _manifest(tmp_path, [{"name": "1班", "roster": "r.xlsx", "sources": ["a/hw1", "b/hw1"]}])
+    report = run_batch(classes, max_workers=1, notify=lambda level, message: None)
+    _, folder_results = report.class_results["1班"]
+    assert list(folder_results) == ["hw1", "hw1 (2)"]
+    assert folder_results["hw1"]['submitted_ids'] == {"202400001"}
+    assert folder_results["hw1 (2)"]['submitted_ids'] == {"202400002", "202400003"}
+
+
+def test_scan_messages_carry_class_prefix(tmp_path):
+    write_roster(tmp_path / "r.xlsx")
+    (tmp_path / "bad.zip").write_bytes(b"not a zip")
+    classes = _manifest(tmp_path, [{"name": "1班", "roster": "r.xlsx", "sources": ["bad.zip"]},
+                                   {"name": "2班", "roster": "r.xlsx", "sources": ["bad.zip"]}])
+    messages = []
+    run_batch(classes, max_workers=1, notify=lambda level, message: messages.append((level, message)))
+    errors = [message for level, message in messages if level == 'error']
+    assert errors and all(message.startswith("[1班、2班] ") for message in errors)
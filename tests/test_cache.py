@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+
+from conftest import make_files, make_zip, quiet
+from hwcheck import SnapshotCache, run_check
+
+
+def test_snapshot_cache_reuses_unchanged_files(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw1", ["202400001.py", "202400003.py"])
+    cache = SnapshotCache()
+    run_check(roster_data, [folder], ['.py'], notify=quiet, cache=cache)
+    make_files(folder, ["202400002.py"])
+    os.remove(os.path.join(folder, "202400003.py"))
+    res = run_check(roster_data, [folder], ['.py'], notify=quiet, cache=cache)["hw1"]
+    assert res['submitted_ids'] == {"202400001", "202400002"}
+    assert res['cache_stats'] == {'files': 2, 'reused': 1, 'parsed': 1, 'removed': 1}
+
+    # 大小或修改时间变了的文件重新解析
+    os.utime(os.path.join(folder, "202400001.py"), (1, 1))
+    res = run_check(roster_data, [folder], ['.py'], notify=quiet, cache=cache)["hw1"]
+    assert res['cache_stats']['reused'] == 1 and res['cache_stats']['parsed'] == 1
+    assert len(cache) == 1 and cache.total_entries == 2
+
+
+def test_snapshot_cache_zip_and_scan_options(tmp_path, roster_data):
+    source = make_zip(tmp_path / "hw.zip", {"202400001.py": b"x", "sub/202400002.py": b"y"})
+    cache = SnapshotCache()
+    run_check(roster_data, [source], ['.py'], notify=quiet, cache=cache)
+    res = run_check(roster_data, [source], ['.py'], notify=quiet, cache=cache)["hw.zip"]
+    assert res['cache_stats'] == {'files': 1, 'reused': 1, 'parsed': 0, 'removed': 0}
+
+    # 扫描深度不同的结果分开缓存
+    res = run_check(roster_data, [source], ['.py'], notify=quiet, cache=cache, recursive=True)["hw.zip"]
+    assert res['submitted_ids'] == {"202400001", "202400002"} and res['cache_stats']['reused'] == 0
+    assert len(cache) == 2
+    cache.discard(source)
+    assert len(cache) == 0 and cache.total_entries == 0
+
+
+def test_snapshot_cache_evicts_oldest_source(tmp_path, roster_data):
+    cache = SnapshotCache(max_entries=2)
+    hw1 = make_files(tmp_path / "hw1", ["202400001.py", "202400002.py"])
+    hw2 = make_files(tmp_path / "hw2", ["202400003.py"])
+    run_check(roster_data, [hw1], ['.py'], notify=quiet, cache=cache)
+    run_check(roster_data, [hw2], ['.py'], notify=quiet, cache=cache)
+    assert len(cache) == 1 and cache.total_entries == 1
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import make_files, quiet
+from hwcheck import CompactResult, ReportBuilder, RosterIndex, compact_results, run_check
+from hwcheck.compact import FileStats, MatchedFiles
+
+
+def test_compact_results_match_plain(tmp_path, roster_data):
+    hw1 = make_files(tmp_path / "hw1", ["202400001.py", "202400002_202400003.py"])
+    hw2 = make_files(tmp_path / "hw2", ["202400004.py", "notes.py"])
+    plain = run_check(roster_data, [hw1, hw2], ['.py'], notify=quiet)
+    compact = compact_results(plain, roster_data)
+    for name, res in plain.items():
+        assert isinstance(compact[name], CompactResult)
+        assert dict(compact[name]) == dict(res)
+        assert compact[name].missing_list() == sorted(res['missing_ids'])
+    # 同一花名册的学号表只建一份，已经压缩过的结果原样返回
+    assert compact_results(compact, roster_data)["hw1"] is compact["hw1"]
+    assert compact["hw2"].index is RosterIndex.for_roster(roster_data)
+
+    id_map = roster_data['student_id_to_name']
+    a, b = ReportBuilder(plain, id_map), ReportBuilder(compact, id_map)
+    assert (a.matrix.submitted == b.matrix.submitted).all()
+    assert a.missing_table.frame.equals(b.missing_table.frame)
+    assert [f['filename'] for f in a.files] == [f['filename'] for f in b.files]
+
+
+
+def test_per_file_maps_are_columnar(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw1", ["b/202400002.py", "202400001_作业.py", "202400003_202400004.py"])
+    plain = run_check(roster_data, [folder], ['.py'], notify=quiet, recursive=True)["hw1"]
+    compact = compact_results({"hw1": plain}, roster_data)["hw1"]
+    matched, stats = compact['matched_files'], compact['file_stats']
+    assert isinstance(matched, MatchedFiles) and isinstance(stats, FileStats)
+    assert matched.keys_table is stats.keys_table  # 两项的路径相同，只存一份
+    assert list(matched) == sorted(plain['matched_files'])
+    assert dict(matched.items()) == plain['matched_files'] and dict(stats) == plain['file_stats']
+    assert matched["202400003_202400004.py"] == ("202400003", "202400004")
+    assert matched.get("b/202400002.py") == ("202400002",) and "nope.py" not in matched
+    assert stats["b/202400002.py"] == plain['file_stats']["b/202400002.py"]
+    # 学号是学号表中的同一个 str 对象
+    assert matched["b/202400002.py"][0] is compact.index.student_ids[1]
+    with pytest.raises(KeyError):
+        matched["b"]
+
+
+def test_unknown_ids_keep_plain_dict(roster_data):
+    index = RosterIndex.for_roster(roster_data)
+    matched = MatchedFiles.from_dict({"x.py": ("202400001",), "y.py": ("999999999",)}, index)
+    assert matched == {"x.py": ("202400001",), "y.py": ("999999999",)} and isinstance(matched, dict)
+    stats = FileStats.from_dict({"x.py": (3, 1.5)})
+    assert stats == {"x.py": (3, 1.5)} and list(stats.values()) == [(3, 1.5)]
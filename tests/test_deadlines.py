@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+
+import pandas as pd
+import pytest
+
+from hwcheck import late_analysis, parse_deadline
+from hwcheck.deadlines import STATUS_LATE, STATUS_ON_TIME, STATUS_SUBMITTED, to_local_datetime
+
+
+def test_parse_deadline():
+    assert parse_deadline("2024-10-01") == datetime.datetime(2024, 10, 1, 23, 59, 59).timestamp()
+    assert parse_deadline(" 2024-10-01 08:30 ") == datetime.datetime(2024, 10, 1, 8, 30).timestamp()
+    assert parse_deadline("2024-10-01T08:30:15") == datetime.datetime(2024, 10, 1, 8, 30, 15).timestamp()
+    with pytest.raises(ValueError, match="无法识别的截止时间"):
+        parse_deadline("下周一")
+
+
+@pytest.fixture
+def dst_zone(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset 不可用")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_local_time_follows_dst(dst_zone):
+    # 冬令时和夏令时的 UTC 偏移不同，每个时间戳按各自的偏移换算
+    stamps = [datetime.datetime(2024, 1, 15, 12).timestamp(), datetime.datetime(2024, 7, 15, 12).timestamp()]
+    local = to_local_datetime(pd.Series(stamps + [float('nan')]))
+    assert local[:2].tolist() == [pd.Timestamp(2024, 1, 15, 12), pd.Timestamp(2024, 7, 15, 12)]
+    assert pd.isna(local[2])
+
+
+def _result(matched, stats, missing_count):
+    return {'matched_files': matched, 'file_stats': stats, 'missing_count': missing_count}
+
+
+def test_late_analysis():
+    deadline = parse_deadline("2024-10-01 23:59")
+    results = {
+        "hw1": _result({"202400001_a.py": ("202400001",), "202400001_b.py": ("202400001",),
+                        "202400002.py": ("202400002",), "group.py": ("202400003", "202400004")},
+                       {"202400001_a.py": (10, deadline + 7200), "202400001_b.py": (20, deadline - 60),
+                        "202400002.py": (5, deadline + 3 * 3600), "group.py": (8, deadline)}, 0),
+        "hw2": _result({"202400001.py": ("202400001",)}, {"202400001.py": (1, deadline + 10 ** 6)}, 3),
+        "history": _result({"202400002.py": ("202400002",)}, {}, 3),  # 历史记录没有文件时间
+    }
+    analysis = late_analysis(results, {"hw1": deadline}, {"202400001": "张三"})
+
+    summary = analysis['summary'].set_index("作业文件夹")
+    assert summary.loc["hw1", [STATUS_ON_TIME, STATUS_LATE, STATUS_SUBMITTED, "未交"]].tolist() == [3, 1, 0, 0]
+    assert summary.loc["hw2", [STATUS_ON_TIME, STATUS_LATE, STATUS_SUBMITTED, "未交"]].tolist() == [0, 0, 1, 3]
+    assert summary.loc["history", STATUS_SUBMITTED] == 1
+    assert summary.loc["hw1", "截止时间"] == pd.Timestamp(2024, 10, 1, 23, 59)
+    assert pd.isna(summary.loc["hw2", "截止时间"])
+
+    detail = analysis['detail']
+    # 迟交的排在最前；有一个文件按时交了就算按时，提交时间取最早的文件
+    assert detail.loc[0, ["文件夹", "学号", "状态", "迟交(小时)"]].tolist() == ["hw1", "202400002", STATUS_LATE, 3.0]
+    first = detail[(detail["文件夹"] == "hw1") & (detail["学号"] == "202400001")].iloc[0]
+    assert first["状态"] == STATUS_ON_TIME and first["姓名"] == "张三"
+    assert first["文件数"] == 2 and first["总大小(字节)"] == 30
+    assert first["提交时间"] == pd.Timestamp(datetime.datetime.fromtimestamp(deadline - 60))
+    group = detail[detail["文件夹"] == "hw1"].set_index("学号").loc[["202400003", "202400004"], "状态"]
+    assert group.tolist() == [STATUS_ON_TIME, STATUS_ON_TIME]  # 正好在截止时间也算按时
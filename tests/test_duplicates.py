@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+
+from conftest import make_files, make_zip, quiet
+from hwcheck import HashCache, find_duplicate_submissions, find_duplicates, run_check
+
+
+def _matched(folder):
+    return {name: (name[:9],) for name in os.listdir(folder)}
+
+
+def test_same_content_from_different_students(tmp_path):
+    folder = make_files(tmp_path / "hw", ["202400001.py", "202400002.py"], content=b"print('copy')")
+    make_files(folder, ["202400003.py"], content=b"print('own')")
+    make_files(folder, ["202400004.py"], content=b"print('ow2')")  # 大小相同，内容不同
+    dup = find_duplicates(folder, _matched(folder), max_workers=1)
+    assert [(g['files'], g['student_ids']) for g in dup['groups']] == [
+        (["202400001.py", "202400002.py"], ["202400001", "202400002"])]
+    assert dup['stats']['files'] == 4 and dup['stats']['hashed'] == 4
+
+
+def test_same_student_and_empty_files_are_skipped(tmp_path):
+    folder = make_files(tmp_path / "hw", ["202400001_a.py", "202400001_b.py"], content=b"same")
+    make_files(folder, ["202400002.py", "202400003.py"], content=b"")
+    dup = find_duplicates(folder, _matched(folder), max_workers=1)
+    assert dup['groups'] == []
+    # 大小预筛选后不需要读任何文件
+    assert dup['stats']['size_candidates'] == 0 and dup['stats']['hashed'] == 0
+
+
+def test_cache_skips_unchanged_files(tmp_path):
+    folder = make_files(tmp_path / "hw", ["202400001.py", "202400002.py"], content=b"abc")
+    cache = HashCache()
+    first = find_duplicates(folder, _matched(folder), max_workers=1, cache=cache)
+    second = find_duplicates(folder, _matched(folder), max_workers=1, cache=cache)
+    assert second['groups'] == first['groups'] and len(second['groups']) == 1
+    assert second['stats']['hashed'] == 0 and second['stats']['cache_hits'] == 2
+
+    # 改动过的文件重新计算
+    make_files(folder, ["202400002.py"], content=b"xyz")
+    os.utime(os.path.join(folder, "202400002.py"), (1, 1))
+    third = find_duplicates(folder, _matched(folder), max_workers=1, cache=cache)
+    assert third['groups'] == [] and third['stats']['hashed'] == 1
+
+
+def test_zip_source_and_submissions(tmp_path, roster_data):
+    zip_path = make_zip(tmp_path / "hw.zip", {"202400001.py": b"print(1)", "202400003.py": b"print(1)",
+                                              "202400002.py": b"print(2)"})
+    results = run_check(roster_data, [zip_path], ['.py'], notify=quiet)
+    messages = []
+    dups = find_duplicate_submissions(results, {"hw.zip": zip_path}, notify=lambda level, msg: messages.append(msg),
+                                      max_workers=1)
+    assert list(dups) == ["hw.zip"] and not messages
+    assert [g['student_ids'] for g in dups["hw.zip"]['groups']] == [["202400001", "202400003"]]
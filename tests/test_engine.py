@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import zipfile
+
+from conftest import STUDENTS, make_files, make_zip, quiet
+from hwcheck import ReportBuilder, engine, check_homework_in_folder, extract_student_id_from_filename, run_check
+
+
+def test_extract_student_id():
+    assert extract_student_id_from_filename("202400001_张三.docx") == "202400001"
+    assert extract_student_id_from_filename("作业一.docx") is None
+
+
+def test_check_folder(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw1", ["202400001_张三.py", "202400002.docx", "readme.py", "sub/202400003.py"])
+    res = check_homework_in_folder(folder, roster_data['student_ids'], ['.py'], notify=quiet)
+    assert res['submitted_ids'] == {"202400001"}
+    assert res['missing_ids'] == set(STUDENTS) - {"202400001"}
+    assert res['unmatched_files'] == ["readme.py"]
+    assert set(res['file_stats']) == {"202400001_张三.py"}
+
+    res = check_homework_in_folder(folder, roster_data['student_ids'], ['.py'], notify=quiet, recursive=True)
+    assert res['submitted_ids'] == {"202400001", "202400003"}
+
+
+def test_check_zip_source(tmp_path, roster_data):
+    source = make_zip(tmp_path / "hw.zip", {"202400002.py": b"print()", "x/202400004.py": b""})
+    res = check_homework_in_folder(source, roster_data['student_ids'], check_all_types=True,
+                                   notify=quiet, recursive=True)
+    assert res['submitted_ids'] == {"202400002", "202400004"}
+
+
+def test_run_check_and_report(tmp_path, roster_data):
+    hw1 = make_files(tmp_path / "hw1", ["202400001.py", "202400002.py"])
+    hw2 = make_files(tmp_path / "hw2", ["202400003.py"])
+    results = run_check(roster_data, [hw1, hw2], ['.py'], notify=quiet)
+    assert list(results) == ["hw1", "hw2"]
+    report = ReportBuilder(results, roster_data['student_id_to_name'])
+    assert report.missing_list("hw1") == ["202400003", "202400004"]
+    assert report.matrix.submission_counts().tolist() == [2, 1]
+    names = [item['filename'] for item in report.files]
+    assert "未交名单_hw2.txt" in names
+    assert os.path.getsize(report.zip_path()) > 0
+    report.cleanup()
+
+
+def test_open_zip_spools_to_disk(tmp_path, roster_data, monkeypatch):
+    results = run_check(roster_data, [make_files(tmp_path / "hw1", ["202400001.py"])], ['.py'], notify=quiet)
+    report = ReportBuilder(results, roster_data['student_id_to_name'])
+    monkeypatch.setattr(engine, "ZIP_SPOOL_MAX_SIZE", 64)
+    with report.open_zip() as f:
+        assert f._rolled  # 超过上限后转存到临时文件，不留在内存中
+        assert "未交名单_hw1.txt" in zipfile.ZipFile(f).namelist()
+    assert report.generated_paths() == []
+
+    # 已经生成过 zip_path 时直接打开该文件
+    path = report.zip_path()
+    with report.open_zip() as f:
+        assert f.name == path
+    report.cleanup()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from conftest import make_files, quiet
+from hwcheck import BatchReport, ReportBuilder, compact_results, run_check, write_report_dir, write_report_zip
+from hwcheck.export import write_csv, write_parquet, write_xlsx
+
+
+@pytest.fixture
+def report(tmp_path, roster_data):
+    hw1 = make_files(tmp_path / "hw1", ["202400001.py", "202400002.py"])
+    hw2 = make_files(tmp_path / "hw2", ["202400003.py"])
+    results = run_check(roster_data, [hw1, hw2], ['.py'], notify=quiet)
+    return ReportBuilder(compact_results(results, roster_data), roster_data['student_id_to_name'])
+
+
+def _rows(data):
+    return list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+
+
+def test_csv_export(tmp_path, report):
+    written = write_report_dir(report, tmp_path / "out", fmt='csv')
+    names = sorted(p.rsplit("/", 1)[-1] for p in written)
+    assert names == ["作业提交矩阵.csv", "作业提交矩阵_各作业提交率.csv", "未交作业名单_汇总.csv",
+                     "未交名单_hw1.csv", "未交名单_hw1.txt", "未交名单_hw2.csv", "未交名单_hw2.txt"]
+    with open(tmp_path / "out" / "未交名单_hw1.csv", 'rb') as f:
+        data = f.read()
+    assert data.startswith(b"\xef\xbb\xbf")  # 带 BOM，Excel 直接打开不乱码
+    assert _rows(data) == [["学号", "姓名"], ["202400003", "王五"], ["202400004", "赵六"]]
+    with open(tmp_path / "out" / "未交作业名单_汇总.csv", 'rb') as f:
+        assert len(_rows(f.read())) == 1 + 2 + 3
+    with open(tmp_path / "out" / "未交名单_hw2.txt", encoding='utf-8') as f:
+        assert f.read().splitlines()[2:] == ["202400001\t张三", "202400002\t李四", "202400004\t赵六"]
+
+
+def test_parquet_export(report):
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    write_report_zip(report, buffer, fmt='parquet')
+    with zipfile.ZipFile(buffer) as zf:
+        assert "未交名单_hw1.parquet" in zf.namelist()
+        frame = pd.read_parquet(io.BytesIO(zf.read("作业提交矩阵.parquet")))
+    assert list(frame.columns) == ["学号", "姓名", "缺交次数", "hw1", "hw2"]
+    assert frame["缺交次数"].tolist() == [1, 1, 1, 2]
+
+
+def test_parquet_batches_and_empty_table():
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    write_parquet(buffer, ["学号", "序号"], ([f"{i:09d}", i] for i in range(70_000)))
+    frame = pd.read_parquet(io.BytesIO(buffer.getvalue()))
+    assert len(frame) == 70_000 and frame["序号"].iloc[-1] == 69_999
+
+    buffer = io.BytesIO()
+    write_parquet(buffer, ["学号", "姓名"], iter(()))
+    assert list(pd.read_parquet(io.BytesIO(buffer.getvalue())).columns) == ["学号", "姓名"]
+
+
+def test_single_files_match_zip_members(report):
+    buffer = io.BytesIO()
+    write_report_zip(report, buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        for item in report.files:
+            if item['kind'] == 'txt':
+                assert report.get_data(item) == zf.read(item['filename'])
+
+
+def test_xlsx_splits_sheets_over_row_limit(monkeypatch):
+    monkeypatch.setattr("hwcheck.export.XLSX_MAX_ROWS", 3)
+    buffer = io.BytesIO()
+    write_xlsx(buffer, [("名单", ["学号"], ([i] for i in range(5))), ("空表", ["学号"], iter(()))])
+    wb = load_workbook(buffer)
+    assert wb.sheetnames == ["名单", "名单_2", "名单_3", "空表"]
+    assert [row[0] for row in wb["名单_3"].iter_rows(values_only=True)] == ["学号", 4]
+
+
+def test_csv_keeps_underlying_file_open():
+    buffer = io.BytesIO()
+    write_csv(buffer, ["学号"], [["202400001"]])
+    assert not buffer.closed and _rows(buffer.getvalue()) == [["学号"], ["202400001"]]
+
+
+def test_matrix_and_batch_workbooks(tmp_path, report, roster_data):
+    wb = load_workbook(io.BytesIO(report.matrix.to_excel_bytes(report.id_map)))
+    assert wb.sheetnames == ["提交矩阵", "各作业提交率"]
+    rows = list(wb["提交矩阵"].iter_rows(values_only=True))
+    assert rows[0] == ("学号", "姓名", "缺交次数", "hw1", "hw2")
+    assert rows[1] == ("202400001", "张三", 1, "已交", "未交")
+
+    batch = BatchReport({"1班": (roster_data, dict(report.folder_results))})
+    path = batch.write(tmp_path / "batch")
+    wb = load_workbook(path)
+    summary = list(wb["各班提交情况"].iter_rows(values_only=True))
+    assert summary[0] == tuple(batch.summary_frame().columns)
+    assert summary[1] == ("1班", "hw1", 2, 2, 0.5)
+    missing = list(wb["未交名单"].iter_rows(values_only=True))
+    assert len(missing) == 1 + len(batch.missing_frame())
+    assert missing[1] == ("1班", "hw1", "202400003", "王五")
+    assert load_workbook(io.BytesIO(batch.to_excel_bytes())).sheetnames == ["各班提交情况", "未交名单"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from openpyxl import Workbook
+
+from conftest import STUDENTS, make_files, quiet
+from hwcheck import HistoryStore, process_roster_file, roster_key, run_check
+
+
+def _two_sheet_roster(path):
+    """两个班各一个工作表；只读第一个工作表时只有 1 班"""
+    items = list(STUDENTS.items())
+    wb = Workbook()
+    wb.active.title = "1班"
+    wb.create_sheet("2班")
+    for ws, students in zip(wb.worksheets, (items[:2], items[2:])):
+        ws.append(["学号", "姓名"])
+        for sid, name in students:
+            ws.append([sid, name])
+    wb.save(path)
+    return path
+
+
+def test_round_trip_and_reopen(tmp_path, roster_data):
+    folders = [make_files(tmp_path / "hw1", ["202400001.py", "202400002_a.py", "notes.py"]),
+               make_files(tmp_path / "hw2", ["202400001.py"])]
+    results = run_check(roster_data, folders, ['.py'], notify=quiet)
+    db = str(tmp_path / "history.db")
+    store = HistoryStore(db)
+    key = store.save_roster(roster_data, name="1班")
+    store.save_results(roster_data, results, sources={"hw1": folders[0]})
+    store.close()
+
+    # 重新打开数据库后花名册和结果都在
+    store = HistoryStore(db)
+    try:
+        assert [(r['roster_key'], r['name'], r['total_students'], r['assignments'])
+                for r in store.list_rosters()] == [(key, "1班", 4, 2)]
+        loaded = store.load_roster()
+        assert list(loaded['student_id_to_name'].items()) == list(STUDENTS.items())
+        assert loaded['roster_hash'] == roster_data['roster_hash'] and not loaded['all_sheets']
+
+        saved = store.load_results(key)
+        assert list(saved) == ["hw1", "hw2"]
+        for name, res in results.items():
+            for field in ('submitted_ids', 'missing_ids', 'submitted_count', 'file_type_stats', 'matched_files',
+                          'unmatched_files'):
+                assert saved[name][field] == res[field], (name, field)
+        assert [a['source'] for a in store.list_assignments(key)] == [folders[0], None]
+
+        # 按学号查询缺交记录走索引，包括本次没有载入的作业
+        assert [m['folder_name'] for m in store.missing_for_student("202400002", roster_key=key)] == ["hw2"]
+        assert [m['folder_name'] for m in store.missing_for_student("202400003")] == ["hw1", "hw2"]
+        assert store.missing_for_student("202400001") == []
+        assert store.files_for_student("202400001", roster_key=key) == [("hw1", "202400001.py"),
+                                                                        ("hw2", "202400001.py")]
+    finally:
+        store.close()
+
+
+def test_resave_replaces_assignment(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw1", ["202400001.py"])
+    store = HistoryStore(":memory:")
+    store.save_results(roster_data, run_check(roster_data, [folder], ['.py'], notify=quiet))
+    make_files(folder, ["202400003.py"])
+    store.save_results(roster_data, run_check(roster_data, [folder], ['.py'], notify=quiet))
+    key = roster_key(roster_data)
+    assert len(store.list_assignments(key)) == 1
+    assert store.load_results(key)["hw1"]['submitted_ids'] == {"202400001", "202400003"}
+    assert store.missing_for_student("202400003") == []
+    store.delete_roster(key)
+    assert store.list_rosters() == [] and store.load_results(key) == {}
+
+
+def test_all_sheets_stored_separately(tmp_path):
+    path = _two_sheet_roster(tmp_path / "roster.xlsx")
+    first = process_roster_file(path, notify=quiet)
+    merged = process_roster_file(path, notify=quiet, all_sheets=True)
+    assert first['roster_hash'] == merged['roster_hash'] and first['total_students'] == 2
+
+    store = HistoryStore(":memory:")
+    assert store.save_roster(first) != store.save_roster(merged)
+    assert sorted(r['total_students'] for r in store.list_rosters()) == [2, 4]
+    loaded = store.load_roster(roster_key(merged))
+    assert loaded['all_sheets'] and loaded['student_ids'] == set(STUDENTS)
+    assert store.load_roster(roster_key(first))['student_ids'] == {"202400001", "202400002"}
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import make_files, make_zip, quiet
+from hwcheck import ArchiveInspector, NameMatcher, StudentIdMatcher, check_homework_in_folder
+
+NAMES = {
+    "202400001": "张三",
+    "202400002": "张三丰",
+    "202400003": "李四",
+    "202400004": "李四",
+    "202400005": "John Smith",
+    "202400006": "Lina",
+}
+
+
+def test_student_id_matcher():
+    matcher = StudentIdMatcher({"202400001", "202400002"})
+    assert matcher.match("202400001_202400002_小组.py") == ("202400001", "202400002")
+    assert matcher.match("20240315_202400001_作业.py") == ("202400001",)
+    assert matcher.match("x2024000011.py") == ("202400001",)
+    assert matcher.match("202400009.py") == ()
+
+
+@pytest.fixture(scope="module")
+def names():
+    return NameMatcher(NAMES, use_pinyin=False)
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("张三_实验二.py", (("202400001",), ())),
+    ("实验二张三丰.docx", (("202400002",), ())),
+    ("李四.py", ((), ("202400003", "202400004"))),
+    ("张三_李四.py", ((), ("202400001", "202400003", "202400004"))),
+    ("作业.py", ((), ())),
+    ("john_smith_hw.py", (("202400005",), ())),
+    ("JohnSmith.py", (("202400005",), ())),
+    ("hw1-LINA.py", (("202400006",), ())),
+])
+def test_name_matcher(names, filename, expected):
+    assert names.match(filename) == expected
+
+
+@pytest.mark.parametrize("filename", [
+    "declination.py",  # "lina" 在单词中间
+    "johnsmithson.py",
+    "实验张_三.py",  # 汉字键不跨分隔符
+])
+def test_name_matcher_respects_boundaries(names, filename):
+    assert names.match(filename) == ((), ())
+
+
+def test_cjk_key_does_not_span_separators():
+    matcher = NameMatcher({"202400001": "二张"}, use_pinyin=False)
+    assert matcher.match("实验二_张三.py") == ((), ())
+    assert matcher.match("实验_二张.py") == (("202400001",), ())
+
+
+def test_check_folder_with_inspector_and_names(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw", ["王五_实验.py", "李四赵六.py"])
+    make_zip(tmp_path / "hw" / "202400001.zip", {"main.py": b"print()"})
+    make_zip(tmp_path / "hw" / "202400002.zip", {"readme.txt": b"hi"})
+    res = check_homework_in_folder(folder, roster_data['student_ids'], ['.py', '.zip'], notify=quiet,
+                                   inspector=ArchiveInspector({'.py'}),
+                                   name_matcher=NameMatcher(roster_data['student_id_to_name'], use_pinyin=False))
+    assert res['submitted_ids'] == {"202400001", "202400003"}
+    assert res['name_matched_files'] == {"王五_实验.py": "202400003"}
+    assert res['ambiguous_files'] == {"李四赵六.py": ["202400002", "202400004"]}
+    assert set(res['rejected_files']) == {"202400002.zip"}
+    assert "李四赵六.py" in res['unmatched_files']
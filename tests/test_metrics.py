@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import logging
+
+import pytest
+
+from conftest import make_files, quiet, write_roster
+from hwcheck import CheckMetrics, enable_json_logging, log_event, process_roster_file, profile_call, run_check
+from hwcheck.metrics import logger
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    handler = enable_json_logging(stream)
+    yield stream
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def _events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_stages_counters_and_folders(tmp_path, log_stream):
+    metrics = CheckMetrics()
+    roster_path = write_roster(tmp_path / "roster.xlsx")
+    roster_data = process_roster_file(roster_path, notify=quiet, metrics=metrics)
+    process_roster_file(roster_path, notify=quiet, metrics=metrics)  # 第二次命中缓存
+    folder = make_files(tmp_path / "hw1", ["202400001.py", "202400002.py", "notes.py"])
+    run_check(roster_data, [folder], ['.py'], notify=quiet, metrics=metrics)
+
+    data = metrics.as_dict()
+    assert {'roster_read', 'roster_parse', 'scan'} <= set(data['stages'])
+    assert all(seconds >= 0 for seconds in data['stages'].values())
+    assert data['counters']['roster_cache_hits'] == 1
+    assert data['counters']['roster_students'] == 8  # 两次解析各计一次
+    assert data['counters']['files_matched'] == 2 and data['counters']['files_unmatched'] == 1
+    assert [(f['folder'], f['files_seen']) for f in data['folders']] == [("hw1", 3)]
+    json.dumps(data)  # 可以直接序列化
+
+    events = _events(log_stream)
+    assert [e['stage'] for e in events if e['event'] == "stage"].count('roster_read') == 2
+    scan = [e for e in events if e['event'] == "folder_scan"]
+    assert scan[0]['folder'] == "hw1" and scan[0]['files_matched'] == 2
+
+
+def test_log_event_only_when_enabled(log_stream):
+    log_event("custom", value=1, path="作业")
+    logger.setLevel(logging.WARNING)
+    log_event("hidden")
+    events = _events(log_stream)
+    assert [(e['event'], e.get('value'), e.get('path')) for e in events] == [("custom", 1, "作业")]
+    assert '"作业"' in log_stream.getvalue()  # 中文不转义
+
+
+def test_profile_call(tmp_path):
+    output = tmp_path / "check.prof"
+    result, text = profile_call(sorted, [3, 1, 2], output=str(output), top=5)
+    assert result == [1, 2, 3]
+    assert "function calls" in text and output.exists()
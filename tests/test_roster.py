@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import re
+import zipfile
+
+from openpyxl import Workbook
+
+from conftest import STUDENTS, quiet, write_roster
+from hwcheck import StudentIdMatcher, process_roster_file
+
+
+def _collect():
+    messages = []
+    return messages, lambda level, message: messages.append((level, message))
+
+
+def _set_dimension(path, ref):
+    """把工作表 XML 中的 <dimension> 改成 ref（模拟导出工具写错的标记）"""
+    with zipfile.ZipFile(path) as zf:
+        members = {name: zf.read(name) for name in zf.namelist()}
+    sheet = "xl/worksheets/sheet1.xml"
+    members[sheet] = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="{ref}"'.encode(), members[sheet])
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+
+def test_parse_roster(tmp_path):
+    roster = process_roster_file(write_roster(tmp_path / "r.xlsx"), notify=quiet)
+    assert roster['student_id_to_name'] == STUDENTS
+    assert roster['total_students'] == 4
+
+
+def test_header_after_title_rows(tmp_path):
+    roster = process_roster_file(write_roster(tmp_path / "r.xlsx", title="2024级 花名册"), notify=quiet)
+    assert roster['student_id_to_name'] == STUDENTS
+
+
+def test_stale_dimension_tag(tmp_path):
+    path = write_roster(tmp_path / "r.xlsx")
+    _set_dimension(path, "A1")
+    roster = process_roster_file(path, notify=quiet)
+    assert roster['student_id_to_name'] == STUDENTS
+
+
+def test_roster_without_ids_is_an_error(tmp_path):
+    path = write_roster(tmp_path / "r.xlsx", students={})
+    messages, notify = _collect()
+    assert process_roster_file(path, notify=notify) is None
+    assert [level for level, _ in messages] == ['error']
+
+
+def test_roster_from_file_object(tmp_path):
+    with open(write_roster(tmp_path / "r.xlsx"), 'rb') as f:
+        assert process_roster_file(f, notify=quiet)['total_students'] == 4
+
+
+def test_long_student_ids_are_kept_whole(tmp_path):
+    students = {"202400000123": "甲", "202400000124": "乙", "202400000125": "丙"}
+    roster = process_roster_file(write_roster(tmp_path / "r.xlsx", students=students), notify=quiet)
+    assert roster['student_id_to_name'] == students
+
+    matcher = StudentIdMatcher(roster['student_ids'])
+    assert matcher.match("202400000124_hw.py") == ("202400000124",)
+    assert matcher.match("202400000_hw.py") == ()
+
+
+def test_id_column_found_without_header(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["编号", "账号", "名字"])
+    ws.append([1, "S202400000123", "甲"])
+    ws.append([2, "S202400000124", "乙"])
+    wb.save(tmp_path / "r.xlsx")
+    roster = process_roster_file(tmp_path / "r.xlsx", notify=quiet)
+    assert roster['student_id_to_name'] == {"202400000123": "甲", "202400000124": "乙"}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import make_files, write_roster
+from hwcheck import CheckService, Workspace, make_server
+
+
+@pytest.fixture
+def api(tmp_path):
+    server = make_server(port=0, service=CheckService(workspace=Workspace(tmp_path / "ws")))
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def call(method, path, body=None, raw=None):
+        data = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+        request = urllib.request.Request(base + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield call
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def registered(api, tmp_path):
+    _, roster = api("POST", "/rosters", {"path": str(write_roster(tmp_path / "r.xlsx"))})
+    _, source = api("POST", "/sources", {"path": make_files(tmp_path / "hw1", ["202400001.py"])})
+    return roster['roster_id'], source['source_id']
+
+
+def test_check(api, registered):
+    roster_id, source_id = registered
+    status, result = api("POST", "/check", {"roster_id": roster_id, "sources": [source_id], "extensions": [".py"],
+                                            "max_depth": 2, "deadlines": {"hw1": "2030-01-01"}})
+    assert status == 200
+    assert result['folders'][0]['submitted_count'] == 1
+    assert not result['messages']
+
+
+@pytest.mark.parametrize("body", [
+    [1, 2],
+    "abc",
+    {"path": 5},
+])
+def test_bad_source_body(api, body):
+    status, result = api("POST", "/sources", body)
+    assert status == 400 and 'error' in result
+
+
+@pytest.mark.parametrize("spec", [
+    {"sources": "abc"},
+    {"sources": [1]},
+    {"max_depth": "x"},
+    {"max_depth": -1},
+    {"max_depth": True},
+    {"deadlines": ["2024-10-01"]},
+    {"deadlines": {"hw1": 5}},
+    {"extensions": 5},
+    {"ignore": [None]},
+])
+def test_bad_check_spec(api, registered, spec):
+    roster_id, _ = registered
+    status, result = api("POST", "/check", dict(spec, roster_id=roster_id))
+    assert status == 400, result
+
+
+def test_bad_body_shapes(api, registered):
+    roster_id, _ = registered
+    assert api("POST", "/check", [roster_id])[0] == 400
+    assert api("POST", "/rosters", {"path": 0})[0] == 400
+    assert api("POST", "/batch", {"checks": "x"})[0] == 400
+    status, result = api("POST", "/batch", {"checks": [{"roster_id": roster_id}, {"roster_id": roster_id,
+                                                                                   "max_depth": "x"}, 7]})
+    assert status == 200
+    assert 'folders' in result['results'][0]
+    assert [item.get('status') for item in result['results'][1:]] == [400, 400]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from conftest import STUDENTS
+from hwcheck import MissingTable, SubmissionMatrix
+from hwcheck import tables
+
+
+def _table():
+    # hw1: 202400001、202400003 已交；hw2: 只有 202400002 已交
+    matrix = SubmissionMatrix(list(STUDENTS)[::-1], ["hw1", "hw2"],
+                              [[False, False], [True, False], [False, True], [True, False]])
+    return MissingTable.from_matrix(matrix, STUDENTS)
+
+
+def test_rows_sorted_by_folder_then_id():
+    table = _table()
+    assert len(table) == 5 and table.folder_names == ["hw1", "hw2"]
+    assert table.frame.astype(object).values.tolist() == [
+        ["hw1", "202400002", "李四"], ["hw1", "202400004", "赵六"],
+        ["hw2", "202400001", "张三"], ["hw2", "202400003", "王五"], ["hw2", "202400004", "赵六"]]
+    assert table.count("hw2") == 3 and table.count("hw9") == 0
+
+
+def test_select_filters():
+    table = _table()
+    assert table.select(folders=["hw2"]).tolist() == [2, 3, 4]
+    assert table.select(" 赵六 ").tolist() == [1, 4]
+    assert table.select("0004", folders=["hw1"]).tolist() == [1]
+    assert table.select(folders=["不存在"]).tolist() == []
+
+
+def test_page_clamps_and_drops_categories():
+    table = _table()
+    result = table.page(page=9, page_size=2)
+    assert (result['total'], result['page'], result['page_count']) == (5, 3, 3)
+    assert result['frame']["学号"].tolist() == ["202400004"]
+    assert result['frame']["文件夹"].dtype == object
+    empty = table.page("无此人")
+    assert (empty['total'], empty['page'], empty['page_count'], len(empty['frame'])) == (0, 1, 1, 0)
+
+
+def test_queries_cached_per_filter(monkeypatch):
+    table = _table()
+    summary = table.select("")
+    folder = table.select(folders=["hw1"])
+    # 汇总页和文件夹页交替渲染时都命中缓存（返回同一个行号数组），不重新筛选
+    assert table.select("") is summary
+    assert table.select(folders=["hw1"]) is folder
+    assert table.page(folders=["hw1"])['total'] == 2 and len(table._queries) == 2
+
+    monkeypatch.setattr(tables, "QUERY_CACHE_SIZE", 2)
+    table.select("张")
+    assert table.select("") is not summary  # 超出缓存数量时淘汰最久未用的查询
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+
+from conftest import STUDENTS, make_files, make_zip, quiet
+from hwcheck import ArchiveInspector, FolderWatcher, NameMatcher, check_homework_in_folder
+
+EXTS = ['.py', '.zip', '.txt']
+
+
+def _wait_for(watcher, version, timeout=5.0):
+    deadline = time.time() + timeout
+    while watcher.version <= version and time.time() < deadline:
+        time.sleep(0.02)
+    assert watcher.version > version, "监视器没有发现变化"
+
+
+@pytest.fixture(params=[False, True], ids=["polling", "inotify"])
+def use_inotify(request):
+    return request.param
+
+
+def _start(folder, roster_data, use_inotify, **kwargs):
+    res = check_homework_in_folder(folder, roster_data['student_ids'], EXTS, notify=quiet, **kwargs)
+    watcher = FolderWatcher(roster_data['student_ids'], target_extensions=EXTS, poll_interval=0.05,
+                            use_inotify=use_inotify, **kwargs)
+    if use_inotify and watcher.backend != "inotify":
+        pytest.skip("inotify 不可用")
+    assert watcher.add(folder, "hw", res)
+    return res, watcher.start()
+
+
+def test_new_and_removed_files(tmp_path, roster_data, use_inotify):
+    folder = make_files(tmp_path / "hw", ["202400001.py", "notes.py"])
+    _, watcher = _start(folder, roster_data, use_inotify)
+    try:
+        version = watcher.version
+        make_files(folder, ["202400002.py"])
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001", "202400002"}
+        assert res['unmatched_files'] == ["notes.py"]
+        assert set(res['file_stats']) == {"202400001.py", "202400002.py"}
+
+        version = watcher.version
+        os.remove(os.path.join(folder, "202400001.py"))
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400002"}
+        assert res['missing_ids'] == set(STUDENTS) - {"202400002"}
+    finally:
+        watcher.stop()
+
+
+def test_rejected_archive_stays_rejected(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    make_zip(tmp_path / "hw" / "202400003.zip", {"readme.txt": b"hi"})
+    inspector = ArchiveInspector({'.py'})
+    res = check_homework_in_folder(folder, roster_data['student_ids'], EXTS, notify=quiet, inspector=inspector)
+    assert "202400003.zip" in res['rejected_files']
+
+    watcher = FolderWatcher(roster_data['student_ids'], target_extensions=EXTS, use_inotify=False,
+                            inspector=inspector)
+    watcher.add(folder, "hw", res)
+    result = watcher.results()["hw"]
+    assert result['submitted_ids'] == {"202400001"}
+    assert set(result['rejected_files']) == {"202400003.zip"}
+
+
+def test_new_and_rewritten_archives_are_inspected(tmp_path, roster_data, use_inotify):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    _, watcher = _start(folder, roster_data, use_inotify, inspector=ArchiveInspector({'.py'}))
+    try:
+        version = watcher.version
+        make_zip(tmp_path / "hw" / "202400002.zip", {"readme.txt": b"hi"})
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001"}
+        assert "202400002.zip" in res['rejected_files']
+
+        # 重新上传了正确的压缩包（大小和修改时间都变了）
+        version = watcher.version
+        make_zip(tmp_path / "hw" / "202400002.zip", {"main.py": b"print('hello world')"})
+        os.utime(os.path.join(folder, "202400002.zip"), (time.time() + 5, time.time() + 5))
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001", "202400002"}
+        assert not res['rejected_files']
+    finally:
+        watcher.stop()
+
+
+def test_name_matching(tmp_path, roster_data, use_inotify):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    _, watcher = _start(folder, roster_data, use_inotify,
+                        name_matcher=NameMatcher(roster_data['student_id_to_name'], use_pinyin=False))
+    try:
+        version = watcher.version
+        make_files(folder, ["作业_王五.py"])
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001", "202400003"}
+        assert res['name_matched_files'] == {"作业_王五.py": "202400003"}
+    finally:
+        watcher.stop()
+
+
+def _replace_with(tmp_path, target, content, mtime):
+    """在文件夹外写好新文件，再移过去覆盖 target（同名文件移入）"""
+    staged = tmp_path / "staged.bin"
+    staged.write_bytes(content)
+    os.utime(staged, (mtime, mtime))
+    os.replace(staged, target)
+
+
+def test_replaced_file_updates_record(tmp_path, roster_data, use_inotify):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    make_zip(tmp_path / "hw" / "202400002.zip", {"main.py": b"print('hi')"})
+    _, watcher = _start(folder, roster_data, use_inotify, inspector=ArchiveInspector({'.py'}))
+    try:
+        # 同名的 .py 文件移入覆盖：仍是同一个学生，提交时间换成新文件的
+        version = watcher.version
+        mtime = time.time() + 10
+        _replace_with(tmp_path, os.path.join(folder, "202400001.py"), b"print('v2')", mtime)
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001", "202400002"}
+        assert tuple(res['file_stats']["202400001.py"]) == (len(b"print('v2')"), mtime)
+        assert res['file_type_stats'] == {'.py': 1, '.zip': 1}
+
+        # 压缩包被不符合要求的新压缩包覆盖：按新内容重新检查
+        version = watcher.version
+        bad = tmp_path / "bad.zip"
+        make_zip(bad, {"readme.txt": b"hi"})
+        _replace_with(tmp_path, os.path.join(folder, "202400002.zip"), bad.read_bytes(), mtime)
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['submitted_ids'] == {"202400001"}
+        assert set(res['rejected_files']) == {"202400002.zip"}
+        assert "202400002.zip" not in res['file_stats']
+    finally:
+        watcher.stop()
+
+
+def test_rewritten_file_refreshes_stat(tmp_path, roster_data, use_inotify):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    _, watcher = _start(folder, roster_data, use_inotify)
+    try:
+        # 原地重新写入（重新提交），不经过创建 / 移入
+        version = watcher.version
+        with open(os.path.join(folder, "202400001.py"), "wb") as f:
+            f.write(b"print('resubmitted')")
+        _wait_for(watcher, version)
+        res = watcher.results()["hw"]
+        assert res['file_stats']["202400001.py"][0] == len(b"print('resubmitted')")
+        assert res['submitted_ids'] == {"202400001"}
+    finally:
+        watcher.stop()
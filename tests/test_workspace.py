@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+from conftest import make_files, quiet
+from hwcheck import FolderWatcher, ReportBuilder, Workspace, run_check
+
+
+def test_upload_dedup_and_discard(tmp_path):
+    ws = Workspace(tmp_path / "ws", quota_bytes=1024)
+    path, reused = ws.add_upload("s1", io.BytesIO(b"abc"), "a.zip")
+    assert not reused and os.path.exists(path)
+    assert ws.add_upload("s2", io.BytesIO(b"abc"), "b.zip") == (path, True)
+    assert not ws.discard("s1", path)  # s2 仍在使用
+    assert ws.discard("s2", path) and not os.path.exists(path)
+
+
+def test_quota_evicts_unreferenced(tmp_path):
+    ws = Workspace(tmp_path / "ws", quota_bytes=10)
+    old, _ = ws.add_upload("s1", io.BytesIO(b"123456"), "a.zip")
+    with pytest.raises(ValueError):
+        ws.add_upload("s2", io.BytesIO(b"abcdef"), "b.zip")
+    ws.touch("s1", [])
+    new, _ = ws.add_upload("s2", io.BytesIO(b"abcdef"), "b.zip")
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_report_zip_in_workspace(tmp_path, roster_data):
+    results = run_check(roster_data, [make_files(tmp_path / "hw1", ["202400001.py"])], ['.py'], notify=quiet)
+    ws = Workspace(tmp_path / "ws")
+    report = ReportBuilder(results, roster_data['student_id_to_name'], workspace=ws, session_id="s1")
+    path = report.zip_path()
+    assert path in ws and report.generated_paths() == [path]
+    assert "未交名单_hw1.txt" in zipfile.ZipFile(path).namelist()
+    assert report.zip_path() == path
+
+    # 会话过期后由工作区清理，报告再次请求时重新生成
+    ws.sweep(now=os.path.getmtime(os.path.dirname(path)) + ws.session_ttl + 1)
+    assert not os.path.exists(path)
+    path = report.zip_path()
+    assert os.path.exists(path)
+    report.cleanup()
+    assert not os.path.exists(path) and len(ws) == 0
+
+
+def test_release_callbacks_stop_watcher(tmp_path, roster_data):
+    folder = make_files(tmp_path / "hw", ["202400001.py"])
+    results = run_check(roster_data, [folder], ['.py'], notify=quiet)
+    ws = Workspace(tmp_path / "ws", session_ttl=60)
+    ws.touch("s1")
+    watcher = FolderWatcher(roster_data['student_ids'], target_extensions=['.py'], use_inotify=False)
+    watcher.add(folder, "hw", results["hw"])
+    ws.on_release("s1", "watcher", watcher.start().stop)
+
+    # 会话还活着时不停止，过期后清理时停止它的监视线程
+    ws.sweep(now=time.time() + 30)
+    assert watcher._thread is not None
+    ws.sweep(now=time.time() + 90)
+    assert watcher._thread is None and watcher._stop.is_set()
+
+    # 主动结束：只调用最后登记的同名回调，且只调用一次；取消登记的不调用
+    stopped = []
+    ws.touch("s2")
+    ws.on_release("s2", "watcher", lambda: stopped.append("old"))
+    ws.on_release("s2", "watcher", lambda: stopped.append("new"))
+    ws.on_release("s2", "other", lambda: stopped.append("other"))
+    ws.on_release("s2", "other", None)
+    ws.release("s2")
+    ws.release("s2")
+    assert stopped == ["new"]
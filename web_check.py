@@ -1,13 +1,42 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import os
-import re
 import pandas as pd
 from pathlib import Path
-import io
+import datetime
+import uuid
 import zipfile
-import tempfile
-import shutil
+
+from hwcheck import (
+    ARCHIVE_EXTENSIONS,
+    ArchiveInspector,
+    CheckMetrics,
+    DEFAULT_EXTENSIONS,
+    DEFAULT_HISTORY_PATH,
+    DEFAULT_IGNORE_PATTERNS,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SCAN_WORKERS,
+    EXPORT_FORMATS,
+    FolderWatcher,
+    HashCache,
+    HistoryStore,
+    NameMatcher,
+    PAGE_SIZES,
+    RESULTS_ZIP_FILENAME,
+    ReportBuilder,
+    cleanup_temp_dir,
+    compact_results,
+    find_duplicate_submissions,
+    parse_extensions,
+    parse_ignore_patterns,
+    process_roster_file,
+    roster_key,
+    run_check,
+    SnapshotCache,
+    Workspace,
+    cleanup_stale_temp_dirs,
+    profile_call,
+)
 
 # ==============================
 # 0. 页面配置与 CSS 样式
@@ -44,166 +73,59 @@ st.markdown("""
 
 
 # =======================================
-# 1. 核心逻辑函数
+# 1. 核心逻辑函数（见 hwcheck/engine.py）
 # ========================================
-def extract_student_id_from_filename(filename):
-    """从文件名中提取前9位数字作为学号"""
-    match = re.search(r'\d{9}', filename)
-    if match:
-        return match.group()
-    return None
+def st_notify(level, message):
+    """把引擎的消息显示到页面上"""
+    {'success': st.success, 'warning': st.warning, 'error': st.error}.get(level, st.info)(message)
 
 
-def process_roster_file(roster_file):
-    """处理花名册文件，返回结构化数据"""
-    try:
-        header_index = 0  # 默认表头为第0行（第一行）
-        try:
-            # 预读取前6行（header=None表示不指定表头，全作为数据读入）
-            df_preview = pd.read_excel(uploaded_file, header=None, nrows=6)
-
-            # 循环检查前5行
-            found_header = False
-            for i in range(min(5, len(df_preview))):
-                # 将该行所有数据转为字符串并拼接，便于搜索
-                row_values = df_preview.iloc[i].astype(str).values
-                row_str = " ".join(row_values)
-
-                # 如果该行包含关键字
-                if '学号' in row_str or '姓名' in row_str:
-                    header_index = i
-                    print(f"在 Excel 第 {i + 1} 行检测到表头关键字，将以此行作为表头读取。")
-                    found_header = True
-                    break
-
-            if not found_header:
-                print("在前5行未检测到'学号'或'姓名'关键字，将默认使用第1行作为表头。")
-
-        except Exception as pre_e:
-            print(f"预扫描表头失败，将尝试默认读取: {pre_e}")
-        # 使用确定的 header_index 正式读取数据
-        df = pd.read_excel(uploaded_file, header=header_index)
-
-        # 查找学号列
-        student_id_col = None
-        for col in df.columns:
-            if '学号' in str(col):
-                student_id_col = col
-                break
-        if student_id_col is None:
-            # 备用策略：找包含9位数字的列
-            for col in df.columns:
-                sample_values = df[col].dropna().head(5)
-                if len(sample_values) > 0:
-                    has_9digit = any(re.search(r'\d{9}', str(v)) for v in sample_values)
-                    if has_9digit:
-                        student_id_col = col
-                        break
-        if student_id_col is None:
-            student_id_col = df.columns[0]
-            st.warning(f"未找到明确的'学号'列，使用第一列: {student_id_col}")
-        else:
-            st.success(f"使用学号列: {student_id_col}")
-
-        # 查找姓名列
-        name_col = None
-        for col in df.columns:
-            if '姓名' in str(col):
-                name_col = col
-                break
-        if name_col is None:
-            if student_id_col == df.columns[0] and len(df.columns) > 1:
-                name_col = df.columns[1]
-            else:
-                col_index = list(df.columns).index(student_id_col)
-                if col_index + 1 < len(df.columns):
-                    name_col = df.columns[col_index + 1]
+def stop_watcher():
+    """停止监视模式（来源或检查结果整体变化时调用）"""
+    watcher = st.session_state.get('watcher')
+    if watcher is not None:
+        watcher.stop()
+        st.session_state.watcher = None
+        get_workspace().on_release(st.session_state.workspace_session, 'watcher', None)
 
-        if name_col:
-            st.success(f"使用姓名列: {name_col}")
-        else:
-            st.warning("未找到姓名列，将只显示学号")
 
-        student_id_to_name = {}
-        student_ids = set()
+@st.cache_resource
+def get_workspace():
+    """所有会话共用的上传文件工作区；进程启动后第一次调用时顺带清理旧式临时目录"""
+    cleanup_stale_temp_dirs()
+    return Workspace()
 
-        for idx, row in df.iterrows():
-            id_value = row[student_id_col]
-            if pd.isna(id_value):
-                continue
-            str_value = str(id_value).strip()
-            student_id = None
-            if str_value.isdigit() and len(str_value) >= 9:
-                student_id = str_value[:9]
-            else:
-                match = re.search(r'\d{9}', str_value)
-                if match:
-                    student_id = match.group()
-
-            if student_id:
-                student_ids.add(student_id)
-                name = "未知"
-                if name_col and not pd.isna(row[name_col]):
-                    name = str(row[name_col]).strip()
-                student_id_to_name[student_id] = name
-
-        return {
-            'student_ids': student_ids,
-            'student_id_to_name': student_id_to_name,
-            'total_students': len(student_ids)
-        }
-    except Exception as e:
-        st.error(f"读取花名册时出错: {e}")
-        return None
 
+def get_name_matcher():
+    """当前花名册的姓名索引，花名册不变时跨多次检查复用"""
+    roster_hash = st.session_state.roster_data['roster_hash']
+    cached = st.session_state.get('name_matcher')
+    if cached is None or cached[0] != roster_hash:
+        cached = (roster_hash, NameMatcher(st.session_state.student_id_to_name))
+        st.session_state.name_matcher = cached
+    return cached[1]
 
-def check_homework_in_folder(folder_path, roster_student_ids, target_extensions=None, check_all_types=False):
-    """
-    检查指定文件夹中的作业文件，支持自定义后缀筛选
-    """
-    try:
-        # 获取文件夹下所有文件
-        all_files = [f for f in Path(folder_path).iterdir() if f.is_file()]
-
-        submitted_ids = set()
-        file_type_stats = {}  # 用于统计提交的文件类型：{'.py': 10, '.docx': 2}
-
-        for file_path in all_files:
-            file_name = file_path.name
-            file_ext = file_path.suffix.lower()  # 获取小写后缀，如 .py
-
-            # 1. 提取学号
-            student_id = extract_student_id_from_filename(file_name)
-
-            if student_id:
-                # 2. 判断是否符合文件类型要求
-                is_valid_type = False
-                if check_all_types:
-                    is_valid_type = True
-                elif target_extensions and file_ext in target_extensions:
-                    is_valid_type = True
-
-                # 3. 如果符合要求，计入提交名单并统计类型
-                if is_valid_type:
-                    submitted_ids.add(student_id)
-                    # 统计该类型文件的数量
-                    if file_ext in file_type_stats:
-                        file_type_stats[file_ext] += 1
-                    else:
-                        file_type_stats[file_ext] = 1
 
-        missing_ids = roster_student_ids - submitted_ids
+def show_missing_page(table, key, folders=None, folder_filter=False, height=400):
+    """分页显示未交名单：搜索、筛选在服务器端完成，只把当前页发给浏览器
 
-        return {
-            'submitted_ids': submitted_ids,
-            'missing_ids': missing_ids,
-            'submitted_count': len(submitted_ids),
-            'missing_count': len(missing_ids),
-            'file_type_stats': file_type_stats  # 新增：返回类型统计
-        }
-    except Exception as e:
-        st.error(f"检查文件夹 {folder_path} 时出错: {e}")
-        return None
+    folders 不为 None 时只显示这些文件夹；folder_filter 为 True 时显示文件夹多选框。
+    """
+    f1, f2, f3 = st.columns([2, 2, 1]) if folder_filter else (*st.columns([3, 1]), None)
+    search = f1.text_input("搜索学号或姓名", key=f"{key}_search", placeholder="例如 20240001 或 张三")
+    if folder_filter:
+        folders = f2.multiselect("文件夹", table.folder_names, key=f"{key}_folders") or None
+    page_size = (f3 or f2).selectbox("每页行数", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                    key=f"{key}_page_size")
+    # 每次运行只筛选一次：先按当前页码取页，page() 会把超出范围的页码改成最后一页
+    result = table.page(search, folders, page=st.session_state.get(f"{key}_page", 1), page_size=page_size)
+    if st.session_state.get(f"{key}_page") != result['page']:
+        st.session_state[f"{key}_page"] = result['page']  # 筛选后页数变少时回到最后一页
+    st.number_input("页码", min_value=1, max_value=result['page_count'], key=f"{key}_page")
+    if folders is not None and not folder_filter:
+        result['frame'] = result['frame'].drop(columns=["文件夹"])
+    st.dataframe(result['frame'], use_container_width=True, hide_index=True, height=height)
+    st.caption(f"共 {result['total']} 条，第 {result['page']} / {result['page_count']} 页")
 
 
 # ===========================
@@ -222,6 +144,36 @@ if 'check_performed' not in st.session_state:
 
 if 'folder_display_names' not in st.session_state:
     st.session_state.folder_display_names = {} # 新增：路径 -> 显示名称的映射
+if 'snapshot_cache' not in st.session_state:
+    st.session_state.snapshot_cache = SnapshotCache()  # 目录快照，重复检查时只处理有变化的文件
+if 'setup_metrics' not in st.session_state:
+    st.session_state.setup_metrics = CheckMetrics()  # 花名册解析、上传保存的耗时
+if 'check_metrics' not in st.session_state:
+    st.session_state.check_metrics = None  # 最近一次检查（扫描 + 报告生成）的耗时
+if 'profile_text' not in st.session_state:
+    st.session_state.profile_text = None
+if 'history_store' not in st.session_state:
+    # 本地 SQLite 检查历史，打不开（如目录只读）时不保存历史
+    try:
+        st.session_state.history_store = HistoryStore(DEFAULT_HISTORY_PATH)
+    except Exception as e:
+        st.session_state.history_store = None
+        print(f"无法打开历史数据库 {DEFAULT_HISTORY_PATH}: {e}")
+if 'workspace_session' not in st.session_state:
+    st.session_state.workspace_session = uuid.uuid4().hex  # 在共享工作区中标识本会话
+workspace = get_workspace()
+# 告诉工作区本会话还活着、正在用哪些上传文件和结果 ZIP，其余会话过期或不再使用的文件可以被清理
+workspace.touch(st.session_state.workspace_session,
+                st.session_state.folder_paths + (st.session_state.report.generated_paths()
+                                                 if st.session_state.get('report') is not None else []))
+if 'hash_cache' not in st.session_state:
+    st.session_state.hash_cache = HashCache()  # 文件内容哈希，重复检测时只计算改动过的文件
+if 'duplicate_results' not in st.session_state:
+    st.session_state.duplicate_results = {}  # 显示名称 -> 内容相同的提交分组
+if 'history_results' not in st.session_state:
+    st.session_state.history_results = {}  # 从历史记录载入、本次没有重新扫描的作业结果
+if 'deadlines' not in st.session_state:
+    st.session_state.deadlines = {}  # 作业名 -> 截止时间戳，用于按时 / 迟交统计
 
 # ==========================
 # 3. 侧边栏逻辑
@@ -234,12 +186,17 @@ with st.sidebar:
     uploaded_file = st.file_uploader("选择花名册Excel文件", type=['xlsx', 'xls'])
 
     if uploaded_file is not None:
+        all_sheets = st.checkbox("合并所有工作表", value=False, help="花名册按班级分成多个工作表时勾选")
         if st.button("处理花名册", type="primary"):
             with st.spinner("正在处理花名册..."):
-                roster_data = process_roster_file(uploaded_file)
+                roster_data = process_roster_file(uploaded_file, notify=st_notify, all_sheets=all_sheets,
+                                                  metrics=st.session_state.setup_metrics)
                 if roster_data:
                     st.session_state.roster_data = roster_data
                     st.session_state.student_id_to_name = roster_data['student_id_to_name']
+                    st.session_state.history_results = {}
+                    if st.session_state.history_store is not None:
+                        st.session_state.history_store.save_roster(roster_data, name=uploaded_file.name)
                     # 重置检查状态，因为数据变了
                     st.session_state.check_performed = False
                     st.success(f"花名册处理完成！共读取 {roster_data['total_students']} 名学生")
@@ -251,19 +208,40 @@ with st.sidebar:
     target_exts = []
     if not check_all_types:
         # 默认只查找 .py，用户可以输入多个，用逗号隔开
-        ext_input = st.text_input("输入要查找的文件后缀 (英文逗号分隔)", value=".py, .zip, .docx")
+        ext_input = st.text_input("输入要查找的文件后缀 (英文逗号分隔)", value=DEFAULT_EXTENSIONS)
         # 处理用户输入：分割、去空格、转小写、确保有点号
-        if ext_input:
-            raw_exts = ext_input.replace('，', ',').split(',')
-            for ext in raw_exts:
-                clean_ext = ext.strip().lower()
-                if clean_ext:
-                    if not clean_ext.startswith('.'):
-                        clean_ext = '.' + clean_ext
-                    target_exts.append(clean_ext)
+        target_exts = parse_extensions(ext_input)
         st.caption(f"当前将查找: {', '.join(target_exts)}")
     else:
         st.caption("当前将查找文件夹内包含学号的 **所有** 文件")
+    recursive_scan = st.checkbox("同时查找子文件夹📁", value=False,
+                                 help="适用于压缩包内多了一层文件夹、或每个学生一个子文件夹的情况")
+    max_depth = None
+    if recursive_scan:
+        depth_input = st.number_input("最大查找层数 (0 表示不限)", min_value=0, max_value=50, value=0)
+        max_depth = int(depth_input) or None
+    ignore_input = st.text_input("忽略的文件夹/文件 (英文逗号分隔，支持通配符)",
+                                 value=", ".join(DEFAULT_IGNORE_PATTERNS))
+    ignore_patterns = parse_ignore_patterns(ignore_input)
+    scan_workers = st.number_input("并行扫描线程数", min_value=1, max_value=64, value=DEFAULT_SCAN_WORKERS,
+                                   help="同时扫描的文件夹数量，文件夹在网络共享盘上时可以适当调大")
+    inspector = None
+    if check_all_types or any(ext in ARCHIVE_EXTENSIONS for ext in target_exts):
+        inspect_archives = st.checkbox("检查压缩包内容📦", value=False,
+                                       help="打开学生交的 .zip/.rar（含嵌套压缩包）查看内容，不解压到磁盘")
+        if inspect_archives:
+            inner_default = ", ".join(ext for ext in target_exts if ext not in ARCHIVE_EXTENSIONS) or ".py"
+            required_inner = parse_extensions(st.text_input("压缩包中至少要有一个 (英文逗号分隔)",
+                                                            value=inner_default))
+            # 检查器缓存压缩包的成员列表，要求不变时跨多次检查复用
+            inspector = st.session_state.get('archive_inspector')
+            if inspector is None or inspector.required_extensions != frozenset(required_inner):
+                inspector = ArchiveInspector(required_inner)
+                st.session_state.archive_inspector = inspector
+    match_names = st.checkbox("按姓名匹配没有学号的文件🔤", value=False,
+                              help="如 \"张三_实验二.py\"；重名或文件名中有多个姓名时不猜测，列为有歧义的文件")
+    detect_duplicates = st.checkbox("检测内容相同的提交🧬", value=False,
+                                    help="比较已匹配文件的内容，找出不同学生交的完全相同的文件（需要读取文件）")
 
     # 3 添加作业文件夹
     st.subheader("3️⃣ 添加作业文件")
@@ -291,42 +269,55 @@ with st.sidebar:
 
     # --- 方式 B: 上传压缩包 ---
     with tab_upload:
-        uploaded_zip = st.file_uploader("上传作业ZIP包", type="zip")
-        if uploaded_zip and st.button("解压并添加", use_container_width=True):
+        # 上传控件的 key 每次添加后更换，让 Streamlit 释放已保存到磁盘的上传内容
+        uploaded_zip = st.file_uploader("上传作业ZIP包", type="zip",
+                                        key=f"zip_upload_{st.session_state.get('zip_upload_seq', 0)}")
+        if uploaded_zip and st.button("添加压缩包", use_container_width=True):
             try:
-                # 1. 创建临时目录
-                temp_dir = tempfile.mkdtemp(prefix="my_temporary_file_")
-
-                # 2. 解压文件
-                with zipfile.ZipFile(uploaded_zip, 'r') as zf:
-                    zf.extractall(temp_dir)
-
-                # 3. 添加到路径列表 (逻辑同上)
-                if temp_dir not in st.session_state.folder_paths:
-                    st.session_state.folder_paths.append(temp_dir)
+                # 1. 原样保存到共享工作区（不解压，检查时直接读取 ZIP 目录）；内容相同的压缩包只保存一份
+                zip_path, reused = workspace.add_upload(st.session_state.workspace_session, uploaded_zip,
+                                                        uploaded_zip.name, metrics=st.session_state.setup_metrics)
+                if not zipfile.is_zipfile(zip_path):
+                    workspace.discard(st.session_state.workspace_session, zip_path)
+                    raise ValueError("不是有效的 ZIP 文件")
+
+                # 2. 添加到路径列表 (逻辑同上)
+                if zip_path in st.session_state.folder_paths:
+                    st.warning("内容相同的压缩包已经添加过了")
+                else:
+                    st.session_state.folder_paths.append(zip_path)
                     # 把临时路径映射为上传的文件名，方便显示
-                    st.session_state.folder_display_names[temp_dir] = f"📦 {uploaded_zip.name}"
+                    st.session_state.folder_display_names[zip_path] = f"📦 {uploaded_zip.name}"
                     st.session_state.check_performed = False
-                    st.success(f"已解压并添加: {uploaded_zip.name}")
+                    st.session_state.zip_upload_seq = st.session_state.get('zip_upload_seq', 0) + 1
+                    st.success(f"已添加: {uploaded_zip.name}" + ("（复用服务器上相同的压缩包）" if reused else ""))
                     st.rerun()
             except Exception as e:
-                st.error(f"解压失败: {e}")
+                st.error(f"添加压缩包失败: {e}")
+        usage = workspace.usage()
+        st.caption(f"服务器已缓存 {usage['entries']} 个文件（上传的压缩包和结果 ZIP），"
+                   f"占用 {usage['bytes'] / 1024 / 1024:.1f} / "
+                   f"{usage['quota_bytes'] // (1024 * 1024)} MB")
 
     col_clear = st.columns(1)[0]
     with col_clear:
         if st.button("清空所有来源", use_container_width=True, type="secondary"):
-            # 遍历 folder_paths 删除临时目录
+            # 上传的压缩包在共享工作区中，下次运行时不再被本会话引用，由工作区按配额 / 过期时间清理；
+            # 这里只删除旧式的临时目录
             for path in st.session_state.folder_paths:
-                # 安全检查：路径存在，且确实是我们创建的临时目录（通过名字包含前缀判断，防止误删）
-                if os.path.exists(path) and "my_temporary_file_" in path:
-                    try:
-                        shutil.rmtree(path)  # 删除文件夹及其内容
-                        print(f"已清理临时目录: {path}")  # 后台打印日志
-                    except Exception as e:
-                        st.error(f"清理目录 {path} 失败: {e}")
+                # 只会删除我们创建的临时目录（通过名字包含前缀判断，防止误删）
+                cleanup_temp_dir(path, notify=st_notify)
             st.session_state.folder_paths = []
             st.session_state.folder_display_names = {}  # 清空映射
             st.session_state.folder_results = {}
+            st.session_state.history_results = {}
+            st.session_state.snapshot_cache.clear()
+            st.session_state.hash_cache.clear()
+            st.session_state.duplicate_results = {}
+            stop_watcher()
+            if st.session_state.get('report') is not None:
+                st.session_state.report.cleanup()
+                st.session_state.report = None
             st.session_state.check_performed = False
             st.rerun()
 
@@ -345,6 +336,43 @@ with st.sidebar:
                 </div>
                 """, unsafe_allow_html=True)
 
+    # 4 历史记录
+    history_store = st.session_state.history_store
+    st.subheader("4️⃣ 历史记录")
+    save_history = False
+    if history_store is None:
+        st.caption("历史数据库不可用，检查结果不会保存")
+    else:
+        save_history = st.checkbox("保存检查结果到历史记录💾", value=True,
+                                   help=f"保存在 {history_store.path}，下次打开可直接载入")
+        saved_rosters = history_store.list_rosters()
+        if saved_rosters:
+            roster_labels = {
+                r['roster_key']: f"{r['name'] or '未命名花名册'}{' · 所有工作表' if r['all_sheets'] else ''} · "
+                                 f"{r['total_students']} 人 · "
+                                 f"{r['assignments']} 份作业 · "
+                                 f"{datetime.datetime.fromtimestamp(r['saved_at']):%m-%d %H:%M}"
+                for r in saved_rosters}
+            chosen_key = st.selectbox("已保存的花名册", list(roster_labels), format_func=roster_labels.get)
+            if st.button("载入花名册和历史结果", use_container_width=True):
+                roster_data = history_store.load_roster(chosen_key)
+                if roster_data:
+                    stop_watcher()
+                    st.session_state.roster_data = roster_data
+                    st.session_state.student_id_to_name = roster_data['student_id_to_name']
+                    st.session_state.history_results = compact_results(history_store.load_results(chosen_key),
+                                                                       roster_data)
+                    st.session_state.folder_results = dict(st.session_state.history_results)
+                    st.session_state.check_performed = bool(st.session_state.folder_results)
+                    st.rerun()
+
+    # 性能面板（内容在页面最后填充，这样能包含本次运行中的报告生成耗时）
+    st.subheader("5️⃣ 性能分析")
+    show_perf_panel = st.checkbox("显示性能面板⏱️", value=False)
+    profile_next_check = st.checkbox("用 cProfile 分析下一次检查", value=False,
+                                     help="分析时逐个扫描文件夹，检查会变慢")
+    perf_panel = st.container()
+
 # ==========================================
 # 4. 主界面逻辑 (可视化与下载)
 # ==========================================
@@ -358,14 +386,14 @@ if not st.session_state.check_performed:
     ### 使用指南
     1. **上传花名册**：Excel文件需包含“学号”和“姓名”列。
     2. **文件查找配置**：可以指定要查找的文件类型，或者查找所有类型文件。
-    3. **添加文件夹**：复制电脑上的文件夹路径粘贴到输入框中，点击添加，或者上传.zip格式的压缩包并解压。
+    3. **添加文件夹**：复制电脑上的文件夹路径粘贴到输入框中，点击添加，或者上传.zip格式的压缩包（无需解压）。
     4. **开始检查**：点击按钮，系统将自动比对名单。
     5. **查看结果**：系统将显示提交统计、可视化图表和未交名单.
     6. **下载文件**：可以下载打包文件.zip或者单个文件.xlsx/.txt。
 
     ### 文件要求：
-    - **花名册文件**：Excel格式，需包含9位学号和姓名列。
-    - **作业文件**：支持多种格式，但文件名中需包含9位学号。
+    - **花名册文件**：Excel格式，需包含学号（一般为9位数字）和姓名列。
+    - **作业文件**：支持多种格式，但文件名中需包含花名册中的学号。
     - **文件夹路径**：确保有访问权限的本地文件夹路径。
     - **压缩包格式**：必须是.zip文件。
     """)
@@ -375,20 +403,52 @@ if not st.session_state.check_performed:
 
     # ... (在“开始检查”按钮逻辑中，调用新的 check 函数) ...
     if st.button("开始检查作业✔️", type="primary", use_container_width=True, disabled=not ready_to_check):
+        stop_watcher()
         with st.spinner("正在检查作业提交情况..."):
-            folder_results = {}
-            for folder_path in st.session_state.folder_paths:
-                # 优先使用我们记录的名字（如 "📦 作业1.zip"），找不到才用文件夹名
-                folder_name = st.session_state.folder_display_names.get(folder_path, os.path.basename(folder_path))
-                # !!! 注意这里传入了新的参数 !!!
-                result = check_homework_in_folder(
-                    folder_path,
-                    st.session_state.roster_data['student_ids'],
-                    target_extensions=target_exts,
-                    check_all_types=check_all_types
-                )
-                if result:
-                    folder_results[folder_name] = result
+            progress_bar = st.progress(0.0, text="正在扫描作业文件夹...")
+            check_metrics = CheckMetrics()
+            check_kwargs = dict(
+                target_extensions=target_exts,
+                check_all_types=check_all_types,
+                display_names=st.session_state.folder_display_names,
+                notify=st_notify,
+                max_workers=scan_workers,
+                recursive=recursive_scan,
+                max_depth=max_depth,
+                ignore_patterns=ignore_patterns,
+                cache=st.session_state.snapshot_cache,
+                metrics=check_metrics,
+                inspector=inspector,
+                name_matcher=get_name_matcher() if match_names else None,
+                progress=lambda done, total, name: progress_bar.progress(done / total,
+                                                                         text=f"已扫描 {done}/{total}: {name}")
+            )
+            if profile_next_check:
+                # cProfile 只统计当前线程，分析时逐个扫描
+                check_kwargs['max_workers'] = 1
+                folder_results, st.session_state.profile_text = profile_call(
+                    run_check, st.session_state.roster_data, st.session_state.folder_paths, **check_kwargs)
+            else:
+                folder_results = run_check(st.session_state.roster_data, st.session_state.folder_paths,
+                                           **check_kwargs)
+            st.session_state.check_metrics = check_metrics
+            st.session_state.duplicate_results = {}
+            if detect_duplicates and folder_results:
+                with st.spinner("正在比较文件内容..."):
+                    folder_names = [st.session_state.folder_display_names.get(p, os.path.basename(p))
+                                    for p in st.session_state.folder_paths]
+                    st.session_state.duplicate_results = find_duplicate_submissions(
+                        folder_results, dict(zip(folder_names, st.session_state.folder_paths)), notify=st_notify,
+                        cache=st.session_state.hash_cache, metrics=check_metrics)
+            if save_history and folder_results:
+                folder_names = [st.session_state.folder_display_names.get(p, os.path.basename(p))
+                                for p in st.session_state.folder_paths]
+                history_store.save_results(st.session_state.roster_data, folder_results,
+                                           sources=dict(zip(folder_names, st.session_state.folder_paths)))
+            # 之前各周从历史记录载入的结果不用重新扫描，与本次结果合并显示（本次扫描的覆盖同名作业）
+            # 会话中只保存紧凑结果：已交学生为位图，学号字符串按花名册共用一份
+            folder_results = {**st.session_state.history_results,
+                              **compact_results(folder_results, st.session_state.roster_data)}
 
             st.session_state.folder_results = folder_results
             st.session_state.check_performed = True
@@ -396,71 +456,88 @@ if not st.session_state.check_performed:
             st.rerun()  # 强制刷新主界面显示结果
 
 else:
+    # ------------------
+    # 4.0 监视模式：本地文件夹有新文件时增量更新结果
+    # ------------------
+    watchable = [path for path in st.session_state.folder_paths
+                 if os.path.isdir(path)
+                 and st.session_state.folder_display_names.get(path, os.path.basename(path))
+                 in st.session_state.folder_results]
+    watch_on = st.toggle("👀 实时监视本地文件夹", value=st.session_state.get('watcher') is not None,
+                         disabled=not watchable,
+                         help="有新文件时自动更新已交/未交名单，不重新扫描（压缩包来源不监视）")
+    if watch_on and st.session_state.get('watcher') is None:
+        watcher = FolderWatcher(st.session_state.roster_data['student_ids'], target_extensions=target_exts,
+                                check_all_types=check_all_types, recursive=recursive_scan, max_depth=max_depth,
+                                ignore_patterns=ignore_patterns, inspector=inspector,
+                                name_matcher=get_name_matcher() if match_names else None)
+        for path in watchable:
+            name = st.session_state.folder_display_names.get(path, os.path.basename(path))
+            watcher.add(path, name, st.session_state.folder_results[name])
+        st.session_state.watcher = watcher.start()
+        # 页面关掉、会话过期时由工作区停止监视线程并关闭 inotify
+        workspace.on_release(st.session_state.workspace_session, 'watcher', watcher.stop)
+        st.session_state.watch_version = watcher.version
+    elif not watch_on:
+        stop_watcher()
+
+    if st.session_state.get('watcher') is not None:
+        @st.fragment(run_every=2)
+        def watch_status():
+            watcher = st.session_state.watcher
+            if watcher is None:
+                return
+            if watcher.version != st.session_state.watch_version:
+                st.session_state.watch_version = watcher.version
+                # 生成新的结果字典，报告和图表会随之重新生成
+                st.session_state.folder_results = {
+                    **st.session_state.folder_results,
+                    **compact_results(watcher.results(), st.session_state.roster_data)}
+                st.rerun(scope="app")
+            st.caption(f"正在监视 {len(watcher.folder_names)} 个文件夹（{watcher.backend}），"
+                       f"已更新 {watcher.version} 次")
+
+        watch_status()
+
     # ------------------
     # 4.1 数据准备
     # ------------------
     results = st.session_state.folder_results
     id_map = st.session_state.student_id_to_name
 
-    # 准备图表数据
-    chart_data = []
-    generated_files_list = []
-    total_missing_all = []  # 汇总列表
-
-    for folder_name, res in results.items():
-        # 图表数据
-        chart_data.append({
-            "作业文件夹": folder_name,
-            "已提交": res['submitted_count'],
-            "未提交": res['missing_count']
-        })
-
-        missing_list = sorted(list(res['missing_ids']))
-
-        # 汇总数据收集
-        for sid in missing_list:
-            total_missing_all.append({
-                "文件夹": folder_name,
-                "学号": sid,
-                "姓名": id_map.get(sid, "未知")
-            })
-
-        # 生成下载文件数据
-        if missing_list:
-            # Excel
-            df_out = pd.DataFrame([{"学号": sid, "姓名": id_map.get(sid, "未知")} for sid in missing_list])
-            excel_buffer = io.BytesIO()
-            df_out.to_excel(excel_buffer, index=False)
-
-            # TXT
-            txt_content = f"未交作业名单 - {folder_name}\n" + "=" * 30 + "\n"
-            for sid in missing_list:
-                txt_content += f"{sid}\t{id_map.get(sid, '未知')}\n"
-
-            generated_files_list.append({
-                "filename": f"未交名单_{folder_name}.xlsx",
-                "data": excel_buffer.getvalue(),
-                "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "folder": folder_name
-            })
-            generated_files_list.append({
-                "filename": f"未交名单_{folder_name}.txt",
-                "data": txt_content.encode('utf-8'),
-                "mime": "text/plain",
-                "folder": folder_name
-            })
-
-    # 生成汇总文件
-    if total_missing_all:
-        df_total = pd.DataFrame(total_missing_all)
-        excel_buffer_total = io.BytesIO()
-        df_total.to_excel(excel_buffer_total, index=False)
-        generated_files_list.insert(0, {
-            "filename": "未交作业名单_汇总.xlsx",
-            "data": excel_buffer_total.getvalue(),
-            "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "folder": "汇总数据"
-        })
+    # 截止时间按作业名保存，重新检查后仍然有效
+    with st.expander("⏰ 截止时间（用于统计按时 / 迟交）", expanded=False):
+        saved_deadlines = st.session_state.deadlines
+        edited = st.data_editor(
+            pd.DataFrame({
+                "作业文件夹": list(results),
+                "截止时间": pd.Series([datetime.datetime.fromtimestamp(saved_deadlines[name])
+                                   if name in saved_deadlines else None for name in results],
+                                  dtype="datetime64[ns]"),
+            }),
+            column_config={"截止时间": st.column_config.DatetimeColumn("截止时间", format="YYYY-MM-DD HH:mm")},
+            disabled=["作业文件夹"], hide_index=True, use_container_width=True, key="deadline_editor")
+        st.caption("按文件的修改时间判断：学生在该作业中最早的文件不晚于截止时间即为按时")
+        st.session_state.deadlines = {
+            **{name: ts for name, ts in saved_deadlines.items() if name not in results},
+            **{name: value.to_pydatetime().timestamp()
+               for name, value in zip(edited["作业文件夹"], edited["截止时间"]) if pd.notna(value)},
+        }
+
+    # 报告对象跟随检查结果保存，页面重跑（切换标签等）时不会重复生成
+    deadlines = {name: ts for name, ts in st.session_state.deadlines.items() if name in results}
+    report = st.session_state.get('report')
+    if (report is None or report.folder_results is not results or report.id_map is not id_map
+            or report.deadlines != deadlines):
+        if report is not None:
+            report.cleanup()  # 删除上一次结果的临时 ZIP
+        report = ReportBuilder(results, id_map, metrics=st.session_state.check_metrics, deadlines=deadlines,
+                               workspace=workspace, session_id=st.session_state.workspace_session)
+        st.session_state.report = report
+        st.session_state.downloads_ready = False
+    chart_data = report.chart_data
+    missing_table = report.missing_table
+    generated_files_list = report.files
 
     # ------------------
     # 4.2 可视化展示
@@ -485,21 +562,46 @@ else:
     st.subheader("🫣 详细缺交名单")
 
     # 动态创建 Tabs
-    tab_labels = ["汇总视图"] + list(results.keys())
+    tab_labels = ["汇总视图", "学生视图", "按时情况"] + list(results.keys())
     tabs = st.tabs(tab_labels)
 
     # Tab 1: 汇总
     with tabs[0]:
-        if total_missing_all:
-            st.dataframe(pd.DataFrame(total_missing_all), use_container_width=True)
+        if len(missing_table):
+            show_missing_page(missing_table, "summary", folder_filter=True)
         else:
             st.success("🎉 所有文件夹作业均已收齐！")
 
+    # Tab 2: 学生 × 作业 矩阵
+    with tabs[1]:
+        matrix = report.matrix
+        f1, f2 = st.columns([1, 2])
+        min_missing = f1.number_input("只显示缺交次数不少于", min_value=0, max_value=max(len(results), 1),
+                                      value=min(1, len(results)), key="matrix_min_missing")
+        selected_folders = f2.multiselect("统计的作业", list(results.keys()), default=list(results.keys()),
+                                          key="matrix_folders")
+        df_matrix = matrix.to_frame(id_map, min_missing=min_missing, folders=selected_folders)
+        st.caption(f"共 {len(df_matrix)} 名学生符合条件（按缺交次数从多到少排序）")
+        st.dataframe(df_matrix, use_container_width=True, hide_index=True, height=400)
+
+        # 从历史数据库按学号查询（包括本次没有载入的作业）
+        if st.session_state.history_store is not None and st.session_state.roster_data:
+            query_id = st.text_input("查询学生历史缺交记录（输入学号）", key="history_student_query").strip()
+            if query_id:
+                missing = st.session_state.history_store.missing_for_student(
+                    query_id, roster_key=roster_key(st.session_state.roster_data))
+                st.caption(f"{query_id} {id_map.get(query_id, '')} 在历史记录中共缺交 {len(missing)} 份作业")
+                if missing:
+                    st.dataframe(pd.DataFrame({
+                        "作业": [m['folder_name'] for m in missing],
+                        "检查时间": [datetime.datetime.fromtimestamp(m['checked_at']) for m in missing],
+                    }), use_container_width=True, hide_index=True)
+
         # ... (在主界面的 Tabs 循环中) ...
 
         # Tab 2+: 各个文件夹
         for i, (folder_name, res) in enumerate(results.items()):
-            with tabs[i + 1]:
+            with tabs[i + 3]:
                 c1, c2 = st.columns([1, 2])
 
                 # --- c1: 统计数据 ---
@@ -539,17 +641,86 @@ else:
                     else:
                         st.caption("没有检测到符合条件的文件。")
 
+                    # 3. 匹配不到花名册学号的文件
+                    unmatched = res.get('unmatched_files') or []
+                    if unmatched:
+                        with st.expander(f"⚠️ {len(unmatched)} 个文件未匹配到花名册中的学号"):
+                            st.dataframe(pd.DataFrame({"文件": unmatched}), hide_index=True,
+                                         use_container_width=True)
+
+                    # 按姓名匹配的文件
+                    name_matched = res.get('name_matched_files') or {}
+                    if name_matched:
+                        with st.expander(f"🔤 {len(name_matched)} 个文件按姓名匹配到学生"):
+                            st.dataframe(pd.DataFrame({
+                                "文件": list(name_matched),
+                                "学生": [f"{sid} {id_map.get(sid, '未知')}" for sid in name_matched.values()],
+                            }), hide_index=True, use_container_width=True)
+                    ambiguous = res.get('ambiguous_files') or {}
+                    if ambiguous:
+                        with st.expander(f"❓ {len(ambiguous)} 个文件的姓名有歧义，未算作提交"):
+                            st.dataframe(pd.DataFrame({
+                                "文件": list(ambiguous),
+                                "可能的学生": ["、".join(f"{sid} {id_map.get(sid, '未知')}" for sid in ids)
+                                          for ids in ambiguous.values()],
+                            }), hide_index=True, use_container_width=True)
+
+                    # 压缩包内容不符合要求 / 无法检查
+                    rejected = res.get('rejected_files') or {}
+                    if rejected:
+                        with st.expander(f"📦 {len(rejected)} 个压缩包内容不符合要求，未算作提交"):
+                            st.dataframe(pd.DataFrame({"文件": list(rejected), "原因": list(rejected.values())}),
+                                         hide_index=True, use_container_width=True)
+                    archive_notes = res.get('archive_notes') or {}
+                    if archive_notes:
+                        with st.expander(f"ℹ️ {len(archive_notes)} 个压缩包未能检查内容，仍算作提交"):
+                            st.dataframe(pd.DataFrame({"文件": list(archive_notes),
+                                                       "说明": list(archive_notes.values())}),
+                                         hide_index=True, use_container_width=True)
+
+                    # 4. 内容相同的提交
+                    duplicates = st.session_state.duplicate_results.get(folder_name)
+                    if duplicates and duplicates['groups']:
+                        with st.expander(f"🧬 {len(duplicates['groups'])} 组内容相同的提交"):
+                            st.dataframe(pd.DataFrame({
+                                "学生": ["、".join(f"{sid} {id_map.get(sid, '未知')}" for sid in g['student_ids'])
+                                       for g in duplicates['groups']],
+                                "文件": ["\n".join(g['files']) for g in duplicates['groups']],
+                                "大小(字节)": [g['size'] for g in duplicates['groups']],
+                            }), hide_index=True, use_container_width=True)
+                    elif duplicates:
+                        st.caption(f"没有发现内容相同的提交（比较了 {duplicates['stats']['size_candidates']} 个"
+                                   f"大小相同的文件）")
+
+                    # 5. 增量检查情况
+                    cache_stats = res.get('cache_stats')
+                    if cache_stats:
+                        st.caption(f"共 {cache_stats['files']} 个文件：复用上次结果 {cache_stats['reused']} 个，"
+                                   f"重新解析 {cache_stats['parsed']} 个，已删除 {cache_stats['removed']} 个")
+
                 # --- c2: 缺交名单 (保持不变) ---
                 with c2:
                     st.markdown("##### 🫵 缺交学生名单")
-                    if res['missing_ids']:
-                        # 你的原始逻辑...
-                        missing_data = [{"学号": sid, "姓名": id_map.get(sid, "未知")} for sid in
-                                        sorted(res['missing_ids'])]
-                        st.dataframe(pd.DataFrame(missing_data), use_container_width=True, height=400)
+                    if res['missing_count']:
+                        show_missing_page(missing_table, f"folder_{i}", folders=[folder_name])
                     else:
                         st.success("🎉 全员已交！")
 
+    # Tab 3: 按时 / 迟交
+    with tabs[2]:
+        if not deadlines:
+            st.info("在上方「截止时间」中为作业设置截止时间后，这里会按文件修改时间统计按时 / 迟交情况。")
+        else:
+            late = report.late_analysis
+            st.bar_chart(late['summary'].set_index("作业文件夹")[["按时", "迟交", "已交", "未交"]])
+            st.dataframe(late['summary'], hide_index=True, use_container_width=True,
+                         column_config={"截止时间": st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm")})
+            statuses = st.multiselect("显示的状态", ["迟交", "按时", "已交"], default=["迟交"], key="late_statuses")
+            detail = late['detail']
+            detail = detail[detail["状态"].isin(statuses)]
+            st.caption(f"共 {len(detail)} 条（迟交时长从长到短排列）")
+            st.dataframe(detail, hide_index=True, use_container_width=True, height=400)
+
     # ------------------
     # 4.3 下载中心
     # ------------------
@@ -558,35 +729,43 @@ else:
 
     if not generated_files_list:
         st.info("没有生成任何名单文件。")
+    elif not st.session_state.get('downloads_ready'):
+        # 名单文件只在需要下载时才生成
+        st.caption(f"共 {len(generated_files_list)} 个名单文件可供下载。")
+        if st.button("🛠️- 生成下载文件", use_container_width=True):
+            st.session_state.downloads_ready = True
+            st.rerun()
     else:
         # 方式一：打包下载
         st.subheader("📦- 打包下载所有文件")
-        # 生成 ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for file_item in generated_files_list:
-                zip_file.writestr(file_item['filename'], file_item['data'])
-        st.download_button(
-            label="🚀- 下载全部文件 (.zip)",
-            data=zip_buffer.getvalue(),
-            file_name="作业检查结果_总和.zip",
-            mime="application/zip",
-            use_container_width=True,
-            type="primary"
-        )
+        export_format = st.radio("名单表格格式", EXPORT_FORMATS, horizontal=True,
+                                 help="学生很多时 csv 生成最快；parquet 需要服务器安装 pyarrow")
+        # 生成 ZIP（逐行写入临时文件，路径缓存在 report 中）
+        try:
+            with open(report.zip_path(export_format), 'rb') as zip_file:
+                st.download_button(
+                    label="🚀- 下载全部文件 (.zip)",
+                    data=zip_file,
+                    file_name=RESULTS_ZIP_FILENAME,
+                    mime="application/zip",
+                    use_container_width=True,
+                    type="primary"
+                )
+        except ValueError as e:
+            st.error(f"生成压缩包失败: {e}")
         # 方式二：单独下载
         st.subheader("📜- 单独下载指定文件")
         cols = st.columns(2)
 
         # 分离汇总文件和普通文件
-        summary_files = [f for f in generated_files_list if "汇总" in f['filename']]
-        other_files = [f for f in generated_files_list if "汇总" not in f['filename']]
+        summary_files = [f for f in generated_files_list if f['kind'] in ('summary', 'matrix')]
+        other_files = [f for f in generated_files_list if f['kind'] not in ('summary', 'matrix')]
 
         # 显示汇总文件
         for i, f in enumerate(summary_files):
             cols[0].download_button(
                 label=f"⬇️ {f['filename']}",
-                data=f['data'],
+                data=report.get_data(f),
                 file_name=f['filename'],
                 mime=f['mime'],
                 key=f"dl_sum_{i}"
@@ -597,11 +776,32 @@ else:
             col_idx = (i + len(summary_files)) % 2
             cols[col_idx].download_button(
                 label=f"⬇️ {f['filename']} ({f['folder']})",
-                data=f['data'],
+                data=report.get_data(f),
                 file_name=f['filename'],
                 mime=f['mime'],
                 key=f"dl_norm_{i}"
 
             )
 
-
+# ==========================================
+# 5. 性能面板
+# ==========================================
+if show_perf_panel:
+    with perf_panel:
+        for title, metrics in (("花名册与上传", st.session_state.setup_metrics),
+                               ("最近一次检查", st.session_state.check_metrics)):
+            if metrics is None:
+                continue
+            data = metrics.as_dict()
+            st.markdown(f"**{title}**")
+            if data['stages']:
+                st.dataframe(pd.DataFrame({"阶段": list(data['stages']), "耗时(秒)": list(data['stages'].values())}),
+                             hide_index=True, use_container_width=True)
+            if data['counters']:
+                st.dataframe(pd.DataFrame({"计数": list(data['counters']), "数值": list(data['counters'].values())}),
+                             hide_index=True, use_container_width=True)
+            if data['folders']:
+                st.dataframe(pd.DataFrame(data['folders']), hide_index=True, use_container_width=True)
+        if st.session_state.profile_text:
+            with st.expander("cProfile 结果（按累计耗时排序）"):
+                st.code(st.session_state.profile_text, language=None)